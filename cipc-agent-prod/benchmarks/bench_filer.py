@@ -0,0 +1,295 @@
+"""
+Filer Benchmark - Throughput and latency of EnhancedCIPCFiler against the mock portal
+Drives file_annual_returns_comprehensive at several concurrency levels and
+saves per-step percentiles, filings/minute and browser memory as JSON.
+Browser pool size and the portal rate limit scale with each level unless fixed
+by flag, and are recorded per level
+
+Usage:
+    python benchmarks/bench_filer.py --levels 1 10 50 --profile default
+    python benchmarks/bench_filer.py --levels 10 50 --pool-size 2 --rate-limit 2
+    python benchmarks/bench_filer.py --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+from datetime import datetime
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AGENT_DIR))
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Mock portal profiles: (latency, jitter, error rate, throttle rps)
+PROFILES = {
+    "fast": ["--latency", "0.02", "--latency-jitter", "0.01"],
+    "default": ["--latency", "0.2", "--latency-jitter", "0.1"],
+    "slow": ["--latency", "1.5", "--latency-jitter", "0.5"],
+    "flaky": ["--latency", "0.3", "--latency-jitter", "0.2", "--error-rate", "0.05"],
+    "throttled": ["--latency", "0.2", "--latency-jitter", "0.1", "--throttle-rps", "10"],
+}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 4)
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 4) if values else None
+    }
+
+
+def step_durations(progress) -> Dict[str, float]:
+    """Time spent in each WorkflowState, from consecutive progress entries"""
+    durations: Dict[str, float] = {}
+    for current, following in zip(progress, progress[1:]):
+        elapsed = (following.timestamp - current.timestamp).total_seconds()
+        durations[current.state.value] = durations.get(current.state.value, 0.0) + elapsed
+    return durations
+
+
+def chromium_rss_bytes() -> int:
+    """Total RSS of Chromium processes descended from this process (Linux /proc)"""
+    children: Dict[int, List[int]] = {}
+    names: Dict[int, str] = {}
+    for stat_path in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat_path.read_text().rsplit(")", 1)
+            pid = int(stat_path.parent.name)
+            names[pid] = fields[0].split("(", 1)[1]
+            children.setdefault(int(fields[1].split()[1]), []).append(pid)
+        except (OSError, IndexError, ValueError):
+            continue
+
+    total = 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        if "chrom" not in names.get(pid, "") and "headless_shell" not in names.get(pid, ""):
+            continue
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+async def sample_peak_rss(peak: Dict[str, int], stop: asyncio.Event, interval: float = 0.5) -> None:
+    while not stop.is_set():
+        peak["bytes"] = max(peak["bytes"], await asyncio.to_thread(chromium_rss_bytes))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def level_limits(concurrency: int, pool_size: int, rate_limit: float) -> Dict[str, Any]:
+    """Pool and rate limiter settings for a level; zero flags scale with concurrency so neither caps it"""
+    contexts_per_browser = int(os.getenv('BROWSER_CONTEXTS_PER_BROWSER', '4'))
+    rate = rate_limit or max(2.0, concurrency * 2.0)
+    return {
+        "pool_size": pool_size or max(1, math.ceil(concurrency / contexts_per_browser)),
+        "contexts_per_browser": contexts_per_browser,
+        "rate_limit": rate,
+        "rate_burst": max(4, concurrency) if not rate_limit else int(os.getenv('PORTAL_RATE_BURST', '4')),
+        "rate_max": max(10.0, rate)
+    }
+
+
+async def run_level(concurrency: int, filings: int, run_id: str, limits: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one concurrency level on a fresh filer"""
+    os.environ.update({
+        'PORTAL_CONCURRENCY': str(concurrency),
+        'BATCH_CONCURRENCY': str(concurrency),
+        'BROWSER_POOL_SIZE': str(limits["pool_size"]),
+        'BROWSER_CONTEXTS_PER_BROWSER': str(limits["contexts_per_browser"]),
+        'PORTAL_RATE_LIMIT': str(limits["rate_limit"]),
+        'PORTAL_RATE_BURST': str(limits["rate_burst"]),
+        'PORTAL_RATE_MAX': str(limits["rate_max"])
+    })
+
+    from enhanced_cipc_filer import EnhancedCIPCFiler
+    filer = EnhancedCIPCFiler()
+
+    per_step: Dict[str, List[float]] = {}
+    totals: List[float] = []
+    failures: List[str] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with slots:
+            started = time.perf_counter()
+            result, progress = await filer.file_annual_returns_comprehensive(
+                company_number=f"{2000 + concurrency % 100:04d}/{index:06d}/07",
+                company_name=f"Benchmark Company {run_id} {index}",
+                financial_year_end="2024-02-28",
+                contact_email="bench@example.com",
+                contact_phone="+27820000000",
+                director_details=[{"name": "Bench Director", "id": "8501011234567"}],
+                shareholder_details=[{"name": "Bench Holder", "shares": 100}]
+            )
+            totals.append(time.perf_counter() - started)
+            for step, seconds in step_durations(progress).items():
+                per_step.setdefault(step, []).append(seconds)
+            if not result.success:
+                failures.append(result.error_message or "unknown error")
+
+    await filer.browser_pool.start()
+    peak = {"bytes": 0}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_peak_rss(peak, stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(filings)))
+    wall = time.perf_counter() - started
+
+    stop.set()
+    await sampler
+    browsers = filer.browser_pool.size
+    await filer.close()
+
+    return {
+        "concurrency": concurrency,
+        "filings": filings,
+        "failures": len(failures),
+        "failure_samples": failures[:5],
+        "wall_seconds": round(wall, 3),
+        "filings_per_minute": round(filings / wall * 60, 2) if wall else None,
+        "filing_latency": summarize(totals),
+        "step_latency": {step: summarize(values) for step, values in sorted(per_step.items())},
+        "peak_chromium_rss_bytes": peak["bytes"],
+        "peak_rss_per_browser_bytes": peak["bytes"] // browsers if browsers else None,
+        "browsers": browsers,
+        "limits": limits,
+        "rate_limiter": filer.rate_limiters.stats()
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=AGENT_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline_path: Path) -> None:
+    """Print throughput and p95 deltas against an earlier results file"""
+    baseline = json.loads(baseline_path.read_text())
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\nCompared with {baseline_path.name} ({baseline.get('git_revision')}):")
+    for level in current["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before:
+            continue
+        throughput_delta = (level["filings_per_minute"] or 0) - (before["filings_per_minute"] or 0)
+        p95_delta = (level["filing_latency"]["p95"] or 0) - (before["filing_latency"]["p95"] or 0)
+        print(f"  c={level['concurrency']:>3}: filings/min {throughput_delta:+.2f}, filing p95 {p95_delta:+.3f}s")
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    work_dir = Path(tempfile.mkdtemp(prefix="cipc-bench-"))
+    portal = subprocess.Popen(
+        [sys.executable, str(AGENT_DIR / "mock_portal.py"), "--port", str(args.port), *PROFILES[args.profile]],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    # Point the filer (and its AISensy notifications) at the mock portal with a local CAPTCHA solver
+    os.environ.update({
+        'CIPC_URL': f"http://127.0.0.1:{args.port}",
+        'AISENSY_BASE_URL': f"http://127.0.0.1:{args.port}",
+        'AISENSY_API_KEY': "benchmark",
+        'CIPC_USERNAME': "benchmark",
+        'CIPC_PASSWORD': "benchmark",
+        'CAPTCHA_SOLVER': "fake",
+        'FAKE_CAPTCHA_DELAY': str(args.captcha_delay),
+        'CIPC_DATA_DIR': str(work_dir / "data"),
+        'HEADLESS': "true",
+        'HTTP_FAST_PATH': "true" if args.http_fast_path else "false"
+    })
+    os.chdir(work_dir)
+
+    try:
+        await asyncio.sleep(1.0)  # let the mock portal bind
+        levels = []
+        for concurrency in args.levels:
+            filings = args.filings or max(10, concurrency * 2)
+            limits = level_limits(concurrency, args.pool_size, args.rate_limit)
+            print(
+                f"Running {filings} filings at concurrency {concurrency} "
+                f"({limits['pool_size']} browsers, {limits['rate_limit']} req/s)..."
+            )
+            levels.append(await run_level(concurrency, filings, f"c{concurrency}", limits))
+            print(f"  {levels[-1]['filings_per_minute']} filings/min, p95 {levels[-1]['filing_latency']['p95']}s")
+    finally:
+        portal.terminate()
+        portal.wait(timeout=10)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "profile": args.profile,
+        "captcha_delay": args.captcha_delay,
+        "http_fast_path": args.http_fast_path,
+        "pool_size": args.pool_size or "auto",
+        "rate_limit": args.rate_limit or "auto",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "levels": levels
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark EnhancedCIPCFiler against the mock portal")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--filings", type=int, default=0, help="filings per level (default: 2x concurrency, min 10)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default")
+    parser.add_argument("--captcha-delay", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--http-fast-path", action="store_true", help="run plain form steps over HTTP")
+    parser.add_argument("--pool-size", type=int, default=0, help="browsers per level (default: enough for the concurrency)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="portal requests/s (default: 2x concurrency)")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.compare:
+        args.compare = args.compare.resolve()
+    output = (args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}_{git_revision()}_{args.profile}.json").resolve()
+
+    results = asyncio.run(run_benchmark(args))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
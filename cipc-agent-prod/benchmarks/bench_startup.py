@@ -0,0 +1,105 @@
+"""
+Startup Benchmark - Cold-start cost of importing and constructing EnhancedCIPCFiler
+Each sample runs in a fresh interpreter; reports import, construction and
+(optionally) warmup time plus which heavy dependencies were loaded
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --warmup --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+from pathlib import Path
+from datetime import datetime
+
+from bench_filer import AGENT_DIR, RESULTS_DIR, git_revision, summarize
+
+# Dependencies that should only load on first portal use
+HEAVY_MODULES = ("playwright", "twocaptcha", "aiohttp", "yarl", "PIL")
+
+SAMPLE_SCRIPT = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import enhanced_cipc_filer
+imported = time.perf_counter()
+filer = enhanced_cipc_filer.EnhancedCIPCFiler()
+constructed = time.perf_counter()
+warmup = None
+if {warmup!r}:
+    async def run():
+        await filer.warmup()
+        await filer.close()
+    asyncio.run(run())
+    warmup = time.perf_counter() - constructed
+print(json.dumps({{
+    "import_seconds": imported - started,
+    "init_seconds": constructed - imported,
+    "warmup_seconds": warmup,
+    "heavy_modules": sorted({{name.split('.')[0] for name in sys.modules}} & set({heavy!r}))
+}}))
+"""
+
+
+def run_sample(warmup: bool, work_dir: Path) -> Dict[str, Any]:
+    script = SAMPLE_SCRIPT.format(warmup=warmup, heavy=HEAVY_MODULES)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(AGENT_DIR), os.environ.get("PYTHONPATH")])),
+           "CIPC_DATA_DIR": str(work_dir / "data")}
+    output = subprocess.check_output(
+        [sys.executable, "-c", script], cwd=work_dir, env=env, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(current: Dict[str, Any], baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nCompared with {baseline_path.name} ({baseline.get('git_revision')}):")
+    for metric in ("import_seconds", "init_seconds", "warmup_seconds"):
+        now, before = current[metric]["p50"], baseline.get(metric, {}).get("p50")
+        if now is not None and before is not None:
+            print(f"  {metric}: p50 {now - before:+.4f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure filer import and construction time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", action="store_true", help="also time warmup() (launches browsers)")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="cipc-startup-"))
+    samples: List[Dict[str, Any]] = [run_sample(args.warmup, work_dir) for _ in range(args.runs)]
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "runs": args.runs,
+        "import_seconds": summarize([sample["import_seconds"] for sample in samples]),
+        "init_seconds": summarize([sample["init_seconds"] for sample in samples]),
+        "warmup_seconds": summarize([sample["warmup_seconds"] for sample in samples if sample["warmup_seconds"] is not None]),
+        "heavy_modules_loaded": samples[-1]["heavy_modules"]
+    }
+
+    print(f"import p50 {results['import_seconds']['p50']}s, init p50 {results['init_seconds']['p50']}s, "
+          f"heavy modules loaded: {results['heavy_modules_loaded'] or 'none'}")
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}_{git_revision()}_startup.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Browser Pool - Shared Chromium instances for CIPC filings
+Keeps a fixed number of warm browsers behind a single Playwright driver
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import Playwright, Browser, BrowserContext
+
+
+BrowserLauncher = Callable[["Playwright"], Awaitable["Browser"]]
+ContextFactory = Callable[["Browser"], Awaitable["BrowserContext"]]
+ContextFinalizer = Callable[["BrowserContext"], Awaitable[None]]
+
+
+class BrowserSessionLostError(Exception):
+    """A pooled page or browser died mid-workflow; the work can move to a fresh context"""
+
+
+@dataclass
+class PooledBrowser:
+    """A pooled browser and its usage counters"""
+    slot: int
+    browser: Browser
+    contexts_served: int = 0
+    active_contexts: int = 0
+    draining: bool = False
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser.is_connected()
+
+
+class BrowserPool:
+    """Fixed-size pool of warm browsers handing out fresh contexts"""
+
+    def __init__(
+        self,
+        launcher: BrowserLauncher,
+        context_factory: ContextFactory,
+        size: int = 2,
+        contexts_per_browser: int = 4,
+        recycle_after: int = 50,
+        context_finalizer: Optional[ContextFinalizer] = None,
+        health_interval: float = 0.0
+    ):
+        self.launcher = launcher
+        self.context_factory = context_factory
+        self.context_finalizer = context_finalizer  # runs before each context is closed
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.recycle_after = recycle_after
+        self.health_interval = health_interval  # seconds between background health checks; 0 disables them
+
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[Optional[PooledBrowser]] = [None] * size
+        self._slots = asyncio.Semaphore(size * contexts_per_browser)
+        self._lock = asyncio.Lock()
+        self._monitor: Optional[asyncio.Task] = None
+        # slot -> task relaunching it; launches run outside the lock so checkouts don't wait on Chromium
+        self._launching: Dict[int, asyncio.Task] = {}
+        self._started = False
+        self._closed = False
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.contexts_per_browser
+
+    @property
+    def active_contexts(self) -> int:
+        return sum(b.active_contexts for b in self._browsers if b)
+
+    @property
+    def active_browsers(self) -> int:
+        return sum(1 for b in self._browsers if b and b.healthy)
+
+    @property
+    def free_slots(self) -> int:
+        return self.capacity - self.active_contexts
+
+    async def start(self) -> None:
+        """Start the Playwright driver and launch all browsers; on failure nothing is left running"""
+        if self._started:
+            return
+
+        async with self._lock:
+            if self._started:
+                return
+            if self._closed:
+                raise Exception("Browser pool has been closed")
+
+            from playwright.async_api import async_playwright  # deferred: only needed once a browser is launched
+            self._playwright = await async_playwright().start()
+            try:
+                for slot in range(self.size):
+                    self._browsers[slot] = await self._launch(slot)
+            except BaseException:
+                await self._shutdown()
+                raise
+
+            if self.health_interval > 0:
+                self._monitor = asyncio.create_task(self._monitor_health())
+            self._started = True
+            logger.info(f"Browser pool started with {self.size} browsers ({self.capacity} context slots)")
+
+    async def close(self) -> None:
+        """Close all browsers and stop the Playwright driver"""
+        if self._monitor:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+
+        launches = list(self._launching.values())
+        for task in launches:
+            task.cancel()
+        await asyncio.gather(*launches, return_exceptions=True)
+
+        async with self._lock:
+            self._closed = True
+            await self._shutdown()
+            self._started = False
+            logger.info("Browser pool closed")
+
+    @asynccontextmanager
+    async def context(self):
+        """Acquire a fresh browser context from the pool"""
+        await self.start()
+
+        async with self._slots:
+            pooled = await self._checkout()
+            context = None
+
+            try:
+                context = await self.context_factory(pooled.browser)
+                yield context
+
+            finally:
+                if context:
+                    try:
+                        if self.context_finalizer:
+                            await self.context_finalizer(context)
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f"Browser context close failed on slot {pooled.slot}: {e}")
+                await self._checkin(pooled)
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Replace crashed browsers and report pool status"""
+        async with self._lock:
+            launches = self._schedule_relaunches() if self._started else []
+
+        results = await asyncio.gather(*launches, return_exceptions=True)
+        return {
+            "started": self._started,
+            "browsers": self.active_browsers,
+            "active_contexts": self.active_contexts,
+            "free_slots": self.free_slots,
+            "replaced": sum(1 for result in results if not isinstance(result, BaseException))
+        }
+
+    async def _monitor_health(self) -> None:
+        """Run health_check every health_interval so crashed idle browsers are relaunched before they are needed"""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                status = await self.health_check()
+                if status["replaced"]:
+                    logger.info(f"Browser pool health check relaunched {status['replaced']} browsers")
+            except Exception as e:
+                logger.warning(f"Browser pool health check failed: {e}")
+
+    async def _shutdown(self) -> None:
+        """Close launched browsers and stop the driver; callers hold the lock"""
+        for slot, pooled in enumerate(self._browsers):
+            if pooled:
+                await self._close_browser(pooled)
+                self._browsers[slot] = None
+
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"Playwright driver stop failed: {e}")
+            self._playwright = None
+
+    async def _checkout(self) -> PooledBrowser:
+        """Pick the least loaded healthy browser, waiting for a relaunch only when none is available"""
+        while True:
+            async with self._lock:
+                self._schedule_relaunches()
+
+                candidates = [
+                    b for b in self._browsers
+                    if b and b.healthy and not b.draining and b.active_contexts < self.contexts_per_browser
+                ]
+                if not candidates:
+                    # Every browser is draining or crashed with work on it; borrow any healthy one
+                    candidates = [b for b in self._browsers if b and b.healthy]
+                if candidates:
+                    pooled = min(candidates, key=lambda b: b.active_contexts)
+                    pooled.active_contexts += 1
+                    pooled.contexts_served += 1
+                    if pooled.contexts_served >= self.recycle_after:
+                        pooled.draining = True
+                    return pooled
+
+                launches = list(self._launching.values())
+
+            if not launches:
+                raise Exception("No healthy browsers available in pool")
+            done, _ = await asyncio.wait(launches, return_when=asyncio.FIRST_COMPLETED)
+            errors = [task.exception() for task in done if not task.cancelled() and task.exception()]
+            if len(errors) == len(launches):
+                raise Exception(f"No healthy browsers available in pool: {errors[0]}") from errors[0]
+
+    async def _checkin(self, pooled: PooledBrowser) -> None:
+        """Return a context slot and recycle the browser once it has drained"""
+        async with self._lock:
+            pooled.active_contexts -= 1
+
+            if pooled.active_contexts > 0 or self._browsers[pooled.slot] is not pooled:
+                return
+            if not pooled.draining and pooled.healthy:
+                return
+
+            reason = "recycling" if pooled.healthy else "crashed"
+            logger.info(f"Browser on slot {pooled.slot} {reason} after {pooled.contexts_served} contexts")
+            self._browsers[pooled.slot] = None
+            if not self._closed:
+                self._relaunch_later(pooled.slot, pooled)
+            else:
+                await self._close_browser(pooled)
+
+    def _schedule_relaunches(self) -> List[asyncio.Task]:
+        """Start relaunching empty slots and crashed idle browsers; callers hold the lock"""
+        for slot, pooled in enumerate(self._browsers):
+            if slot in self._launching:
+                continue
+            if pooled is None or (not pooled.healthy and pooled.active_contexts == 0):
+                if pooled:
+                    logger.warning(f"Browser on slot {slot} disconnected - relaunching")
+                self._browsers[slot] = None
+                self._relaunch_later(slot, pooled)
+        return list(self._launching.values())
+
+    def _relaunch_later(self, slot: int, old: Optional[PooledBrowser]) -> None:
+        task = asyncio.create_task(self._relaunch(slot, old))
+        # Failures surface to checkouts waiting on the task and are logged; nothing else awaits it
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._launching[slot] = task
+
+    async def _relaunch(self, slot: int, old: Optional[PooledBrowser]) -> None:
+        """Close the old browser and launch its replacement without the lock, then install it"""
+        try:
+            if old:
+                await self._close_browser(old)
+            pooled = await self._launch(slot)
+        except Exception as e:
+            logger.warning(f"Browser launch failed on slot {slot}: {e}")
+            raise
+        finally:
+            self._launching.pop(slot, None)
+
+        async with self._lock:
+            if self._closed:
+                await self._close_browser(pooled)
+            else:
+                self._browsers[slot] = pooled
+
+    async def _launch(self, slot: int) -> PooledBrowser:
+        browser = await self.launcher(self._playwright)
+        return PooledBrowser(slot=slot, browser=browser)
+
+    async def _close_browser(self, pooled: PooledBrowser) -> None:
+        try:
+            if pooled.healthy:
+                await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Browser close failed on slot {pooled.slot}: {e}")
@@ -0,0 +1,98 @@
+"""
+CAPTCHA Solver - Non-blocking CAPTCHA solving for the CIPC portal
+Runs the blocking 2Captcha client off the event loop with bounded concurrency
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+
+class FakeCaptchaSolver:
+    """Local stand-in for TwoCaptcha used in tests and against the mock portal"""
+
+    def __init__(self, code: str = "123456", delay: float = 0.5):
+        self.code = code
+        self.delay = delay
+        self.calls = 0
+
+    def normal(self, file: str, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        time.sleep(self.delay)
+        return {"captchaId": f"fake-{self.calls}", "code": self.code}
+
+
+class AsyncCaptchaSolver:
+    """Wraps a blocking solver with an executor, in-flight limit, timeout and counters"""
+
+    def __init__(
+        self,
+        solver: Any,
+        max_in_flight: int = 4,
+        timeout: float = 120.0,
+        cost_per_solve: float = 0.001
+    ):
+        self.solver = solver
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.cost_per_solve = cost_per_solve
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="captcha")
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+        self.solved = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.total_latency = 0.0
+        self.last_latency: Optional[float] = None
+
+    @property
+    def total_cost(self) -> float:
+        # 2Captcha bills every answered solve, including ones we later reject
+        return self.solved * self.cost_per_solve
+
+    async def solve(self, image: str, **params) -> str:
+        """Solve an image CAPTCHA without blocking the event loop"""
+        async with self._in_flight:
+            loop = asyncio.get_running_loop()
+            started = time.monotonic()
+
+            try:
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, partial(self.solver.normal, image, **params)),
+                    timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                # The worker thread keeps running until 2Captcha answers; its slot frees up then
+                self.timed_out += 1
+                self.failed += 1
+                raise Exception(f"CAPTCHA solve timed out after {self.timeout:.0f}s")
+            except Exception:
+                self.failed += 1
+                raise
+
+            latency = time.monotonic() - started
+            self.solved += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            logger.debug(f"CAPTCHA solved in {latency:.1f}s")
+
+            return result['code']
+
+    def stats(self) -> Dict[str, Any]:
+        """Solve counters, latency and spend"""
+        return {
+            "solved": self.solved,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "avg_latency": round(self.total_latency / self.solved, 3) if self.solved else None,
+            "last_latency": round(self.last_latency, 3) if self.last_latency is not None else None,
+            "total_cost": round(self.total_cost, 4)
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,119 @@
+"""
+Checkpoint Store - Durable workflow checkpoints for resumable filings
+Records each completed step so a failed filing resumes from its last good step;
+checkpoints of filings that never complete expire after a TTL
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+
+
+@dataclass
+class WorkflowCheckpoint:
+    """Completed steps and the data later steps need to resume"""
+    state: str = "pending"
+    completed_steps: List[str] = field(default_factory=list)
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def is_done(self, step: str) -> bool:
+        return step in self.completed_steps
+
+    def mark_done(self, step: str, state: str, **data) -> None:
+        if step not in self.completed_steps:
+            self.completed_steps.append(step)
+        self.state = state
+        self.data.update(data)
+
+    def drop_from(self, step: str) -> None:
+        """Forget a completed step and every step completed after it"""
+        if step in self.completed_steps:
+            del self.completed_steps[self.completed_steps.index(step):]
+
+
+class WorkflowCheckpointStore:
+    """SQLite-backed checkpoints keyed by filing (company number and financial year)"""
+
+    def __init__(self, db_path: Path, ttl_seconds: float = 7 * 24 * 3600):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def load(self, filing_key: str) -> Optional[WorkflowCheckpoint]:
+        return await asyncio.to_thread(self._load, filing_key)
+
+    async def save(self, filing_key: str, checkpoint: WorkflowCheckpoint) -> None:
+        await asyncio.to_thread(self._save, filing_key, checkpoint)
+
+    async def clear(self, filing_key: str) -> None:
+        await asyncio.to_thread(self._clear, filing_key)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_checkpoints (
+                    filing_key TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    completed_steps TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("DELETE FROM workflow_checkpoints WHERE updated_at < ?", (self._cutoff(),))
+            self._conn.commit()
+        return self._conn
+
+    def _cutoff(self) -> str:
+        return (datetime.now() - timedelta(seconds=self.ttl_seconds)).isoformat()
+
+    def _load(self, filing_key: str) -> Optional[WorkflowCheckpoint]:
+        with self._db_lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT state, completed_steps, data, updated_at FROM workflow_checkpoints WHERE filing_key = ?",
+                (filing_key,)
+            ).fetchone()
+            if row and row[3] < self._cutoff():
+                # Abandoned attempt: start the filing afresh
+                conn.execute("DELETE FROM workflow_checkpoints WHERE filing_key = ?", (filing_key,))
+                conn.commit()
+                row = None
+
+        if not row:
+            return None
+        return WorkflowCheckpoint(state=row[0], completed_steps=json.loads(row[1]), data=json.loads(row[2]))
+
+    def _save(self, filing_key: str, checkpoint: WorkflowCheckpoint) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO workflow_checkpoints (filing_key, state, completed_steps, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (filing_key, checkpoint.state, json.dumps(checkpoint.completed_steps),
+                 json.dumps(checkpoint.data, default=str), datetime.now().isoformat())
+            )
+            conn.commit()
+
+    def _clear(self, filing_key: str) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM workflow_checkpoints WHERE filing_key = ?", (filing_key,))
+            conn.commit()
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,282 @@
+"""
+Document Generator - Renders annual returns forms and schedules in a process pool
+AR01-AR04 forms and director/shareholder schedules are rendered to PDF off the
+event loop, cached by content hash and streamed page by page to disk
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from string import Template
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from dataclasses import dataclass
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+
+# Bump when template text or layout changes so cached documents are re-rendered
+TEMPLATE_VERSION = "1"
+
+FORM_TITLES = {
+    "AR01": "Annual Return - Private Company",
+    "AR02": "Annual Return - Personal Liability Company",
+    "AR03": "Annual Return - State-Owned Company",
+    "AR04": "Annual Return - Non-Profit Company"
+}
+
+# A4 in points, Helvetica 10pt
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 50
+FONT_SIZE = 10
+LEADING = 14
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+
+
+@dataclass
+class GeneratedDocument:
+    """A rendered document on disk"""
+    name: str
+    path: str
+    sha256: str
+    bytes: int
+    cached: bool
+
+
+# Template sources: (title, header lines, row line for schedules)
+TEMPLATE_SOURCES: Dict[str, Tuple[str, List[str], Optional[str]]] = {
+    "form": (
+        "CoR 30.1 - $form_title",
+        [
+            "Form type: $form_type",
+            "Company registration number: $company_number",
+            "Company name: $company_name",
+            "Financial year end: $financial_year_end",
+            "Filing date: $filing_date",
+            "",
+            "Contact email: $contact_email",
+            "Contact phone: $contact_phone",
+            "Business address: $business_address",
+            "Principal business activity: $business_activity",
+            "",
+            "Directors: $director_count",
+            "Shareholders: $shareholder_count"
+        ],
+        None
+    ),
+    "directors": (
+        "Director Schedule - $company_name ($company_number)",
+        ["Financial year end: $financial_year_end", "", "No.  Name / ID number"],
+        "$index.  $name  $id"
+    ),
+    "shareholders": (
+        "Shareholder Schedule - $company_name ($company_number)",
+        ["Financial year end: $financial_year_end", "", "No.  Name / Shares held"],
+        "$index.  $name  $shares"
+    )
+}
+
+# Documents per filing: (file name, template, rows key)
+DOCUMENTS = (
+    ("CoR_30.1_Form.pdf", "form", None),
+    ("Director_Schedules.pdf", "directors", "directors"),
+    ("Shareholder_Schedules.pdf", "shareholders", "shareholders")
+)
+
+# Compiled once per worker process by _init_worker
+_TEMPLATES: Dict[str, Tuple[Template, List[Template], Optional[Template]]] = {}
+
+
+def _compile_templates() -> Dict[str, Tuple[Template, List[Template], Optional[Template]]]:
+    return {
+        kind: (Template(title), [Template(line) for line in header], Template(row) if row else None)
+        for kind, (title, header, row) in TEMPLATE_SOURCES.items()
+    }
+
+
+def _init_worker() -> None:
+    global _TEMPLATES
+    _TEMPLATES = _compile_templates()
+
+
+def _pdf_text(line: str) -> bytes:
+    escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return escaped.encode("latin-1", "replace")
+
+
+def _document_lines(kind: str, data: Dict[str, Any]) -> Iterator[str]:
+    templates = _TEMPLATES or _compile_templates()
+    title, header, row = templates[kind]
+    values = {
+        **{key: value for key, value in data.items() if not isinstance(value, (list, dict))},
+        "form_title": FORM_TITLES.get(data.get("form_type", ""), "Annual Return"),
+        "director_count": len(data.get("directors") or []),
+        "shareholder_count": len(data.get("shareholders") or [])
+    }
+
+    yield title.safe_substitute(values)
+    yield ""
+    for line in header:
+        yield line.safe_substitute(values)
+
+    if row:
+        for index, entry in enumerate(data.get(kind) or [], start=1):
+            entry = entry if isinstance(entry, dict) else {"name": entry}
+            yield row.safe_substitute({"id": "", "shares": "", **entry, "index": index})
+
+
+def render_document(kind: str, data: Dict[str, Any], path: str) -> int:
+    """Render one document to path, writing each page as it is laid out; returns its size"""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+    offsets: Dict[int, int] = {}
+    page_ids: List[int] = []
+
+    with tmp_path.open("wb") as out:
+        def write_object(number: int, body: bytes) -> None:
+            offsets[number] = out.tell()
+            out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+        # Objects 1-3 are the catalog, page tree and font; pages and their content streams follow
+        next_id = 4
+        lines = _document_lines(kind, data)
+        while True:
+            page_lines = [line for _, line in zip(range(LINES_PER_PAGE), lines)]
+            if not page_lines and page_ids:
+                break
+
+            content = b"BT /F1 %d Tf %d TL %d %d Td\n" % (FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT - MARGIN)
+            content += b"".join(b"(" + _pdf_text(line) + b") Tj T*\n" for line in page_lines) + b"ET"
+
+            page_id, content_id = next_id, next_id + 1
+            next_id += 2
+            write_object(content_id, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+            write_object(page_id, (
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            ) % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+            page_ids.append(page_id)
+
+            if len(page_lines) < LINES_PER_PAGE:
+                break
+
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+        write_object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids))
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % next_id)
+        for number in range(1, next_id):
+            out.write(b"%010d 00000 n \n" % offsets[number])
+        out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, xref_offset))
+        size = out.tell()
+
+    os.replace(tmp_path, target)
+    return size
+
+
+class DocumentGenerator:
+    """Content-addressed PDF rendering on a lazily started process pool"""
+
+    def __init__(self, output_dir: Path, workers: Optional[int] = None):
+        self.output_dir = Path(output_dir)
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.rendered = 0
+        self.cache_hits = 0
+        self._pool: Optional["ProcessPoolExecutor"] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def content_key(kind: str, data: Dict[str, Any]) -> str:
+        canonical = json.dumps({"kind": kind, "template": TEMPLATE_VERSION, "data": data}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def documents_for(self, form_data: Dict[str, Any]) -> Iterable[Tuple[str, str]]:
+        """(file name, template) pairs a filing needs; the shareholder schedule only when there are shareholders"""
+        for name, kind, rows in DOCUMENTS:
+            if kind == "shareholders" and not form_data.get(rows):
+                continue
+            yield name, kind
+
+    async def generate(self, form_data: Dict[str, Any]) -> List[GeneratedDocument]:
+        """Render every document for a filing concurrently, reusing cached output"""
+        return list(await asyncio.gather(*(
+            self._generate_one(name, kind, form_data) for name, kind in self.documents_for(form_data)
+        )))
+
+    async def _generate_one(self, name: str, kind: str, form_data: Dict[str, Any]) -> GeneratedDocument:
+        key = self.content_key(kind, form_data)
+        path = self.output_dir / key[:2] / f"{key}.pdf"
+
+        cached_size = await asyncio.to_thread(self._cached_size, path)
+        if cached_size is not None:
+            self.cache_hits += 1
+            return GeneratedDocument(name, str(path), key, cached_size, cached=True)
+
+        # Identical documents requested concurrently share one render
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self._render(kind, form_data, path))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.rendered += 1
+
+        size = await asyncio.shield(in_flight)
+        return GeneratedDocument(name, str(path), key, size, cached=False)
+
+    async def _render(self, kind: str, form_data: Dict[str, Any], path: Path) -> int:
+        """Render in the pool; if a worker died and broke the pool, start a new one and retry once"""
+        for attempt in range(2):
+            pool = self._executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    pool, render_document, kind, form_data, str(path)
+                )
+            except BrokenProcessPool:
+                # Concurrent renders on the same broken pool replace it only once
+                if self._pool is pool:
+                    self._pool = None
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    logger.warning("Document generation pool broke; restarting it")
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _cached_size(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def _executor(self) -> "ProcessPoolExecutor":
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn keeps workers free of the parent's event loop and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+            logger.info(f"Document generation pool started with {self.workers} workers")
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "rendered": self.rendered, "cache_hits": self.cache_hits}
+
+    def shutdown(self) -> None:
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
@@ -3,24 +3,58 @@ Enhanced CIPC Annual Returns Filer - Spec Compliant Implementation
 Implements spec-agent-ar.md requirements with enterprise-grade automation
 """
 
+from __future__ import annotations
+
 import asyncio
+import hashlib
+import json
 import os
-from typing import Dict, Any, List, Optional, Tuple
+import socket
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Set, Tuple, Union, Iterable, AsyncIterable, AsyncIterator, Callable, Awaitable
 from pathlib import Path
 import time
-import re
-import json
+import random
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import asdict
 from enum import Enum
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from urllib.parse import urlencode
 
-from playwright.async_api import async_playwright, Page, BrowserContext, Browser, TimeoutError
 from loguru import logger
-from twocaptcha import TwoCaptcha
-import aiohttp
 
 from models import FilingResult, FilingStatus, CompanyInfo
+from browser_pool import BrowserPool, BrowserSessionLostError
+from filing_queue import FilingQueue, FilingRequest, model_to_dict
+from filing_import import FilingImporter, REGISTRATION_NUMBER_PATTERN, FILING_DEADLINE_DAYS
+from checkpoint_store import WorkflowCheckpoint, WorkflowCheckpointStore
+from submission_ledger import SubmissionLedger, LedgerEntry, ANNUAL_RETURN_FORM
+from session_cache import AuthSessionCache
+from verification_cache import CompanyVerificationCache
+from resource_blocking import ResourceBlocker, DEFAULT_BLOCKED_TYPES
+from evidence import EvidenceWriter
+from filing_diagnostics import FilingTracer
+from document_generator import DocumentGenerator
+from post_filing import PostFilingOutbox, PostFilingActions, OutboxDispatcher, AISensyNotifier
+from metrics import FilingMetrics
+from captcha_solver import AsyncCaptchaSolver, FakeCaptchaSolver
+from rate_limiter import RateLimiterRegistry, PortalThrottledError, THROTTLE_STATUSES
+from scheduler import PriorityPolicy, PriorityGate
+from progress_log import (
+    WorkflowProgress, ProgressLog, ProgressSink, JsonlProgressSink, SqliteProgressSink, WebSocketProgressSink
+)
+
+# Playwright and twocaptcha load on first portal use (see BrowserPool.start and captcha_solver)
+if TYPE_CHECKING:
+    from playwright.async_api import Playwright, Page, BrowserContext, Browser
+from portal_http import PortalHttpClient, PortalPage, PortalForm, BrowserRequiredError, PortalSessionExpiredError
+
+
+# Filing key ("company_number:financial_year_end") of the filing running in the current task
+current_filing_key: ContextVar[str] = ContextVar('current_filing_key', default="")
+
+# Shared by browser contexts and the HTTP fast path so the portal sees one client
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
 
 class WorkflowState(Enum):
@@ -36,50 +70,277 @@ class WorkflowState(Enum):
     FAILED = "failed"
 
 
-@dataclass
-class WorkflowProgress:
-    """Tracks filing workflow progress"""
-    state: WorkflowState
-    step_description: str
-    timestamp: datetime
-    metadata: Dict[str, Any] = None
-
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "state": self.state.value,
-            "step_description": self.step_description,
-            "timestamp": self.timestamp.isoformat(),
-            "metadata": self.metadata or {}
-        }
-
-
 class EnhancedCIPCFiler:
     """Enhanced CIPC Annual Returns filing per spec-agent-ar.md"""
 
     def __init__(self):
         # Core URLs and endpoints
-        self.cipc_url = "https://www.cipc.co.za"
+        self.cipc_url = os.getenv('CIPC_URL', "https://www.cipc.co.za").rstrip('/')
         self.annual_returns_url = f"{self.cipc_url}/filing/annual-returns/"
         self.company_search_url = f"{self.cipc_url}/search/company-search/"
 
         # CAPTCHA and automation settings
         self.captcha_api_key = os.getenv('TWOCAPTCHA_API_KEY', '')
-        self.captcha_solver = TwoCaptcha(self.captcha_api_key) if self.captcha_api_key else None
+        self._captcha_solver: Optional[AsyncCaptchaSolver] = None
+        self._captcha_solver_created = False
 
         # Browser settings
         self.headless = os.getenv('HEADLESS', 'true').lower() == 'true'
         self.screenshots_enabled = os.getenv('SCREENSHOTS_ENABLED', 'true').lower() == 'true'
-        self.screenshots_dir = Path("screenshots")
-        self.screenshots_dir.mkdir(exist_ok=True)
+        self.screenshots_dir = Path("screenshots")  # created by the evidence writer on first capture
+        self.screenshot_mode = os.getenv('SCREENSHOT_MODE', 'viewport')  # viewport, full or element
+        self.evidence_writer = EvidenceWriter(
+            self.screenshots_dir,
+            image_format=os.getenv('SCREENSHOT_FORMAT', 'jpeg'),
+            quality=int(os.getenv('SCREENSHOT_QUALITY', '70')),
+            max_total_bytes=int(os.getenv('EVIDENCE_MAX_MB', '500')) * 1024 * 1024,
+            max_age_seconds=float(os.getenv('EVIDENCE_MAX_AGE_DAYS', '30')) * 24 * 3600
+        )
+        # Screenshot captures still running per browser context; awaited before the context closes
+        self._evidence_captures: Dict[BrowserContext, Set[asyncio.Task]] = {}
+
+        # Opt-in Playwright traces for a sample of filings and for any filing slower than TRACE_SLOW_SECONDS
+        self.tracer = FilingTracer(
+            Path(os.getenv('TRACE_DIR', 'traces')),
+            sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', '0')),
+            slow_threshold=float(os.getenv('TRACE_SLOW_SECONDS', '0')),
+            max_trace_bytes=int(os.getenv('TRACE_MAX_MB', '50')) * 1024 * 1024,
+            max_total_bytes=int(os.getenv('TRACE_TOTAL_MB', '1000')) * 1024 * 1024,
+            max_age_seconds=float(os.getenv('TRACE_MAX_AGE_DAYS', '14')) * 24 * 3600,
+            keep_per_filing=int(os.getenv('TRACE_KEEP_PER_FILING', '3'))
+        )
+
+        # Abort images, fonts, media and trackers the workflow never reads
+        self.resource_blocker = None
+        if os.getenv('BLOCK_RESOURCES', 'true').lower() == 'true':
+            blocked_types = list(DEFAULT_BLOCKED_TYPES)
+            if os.getenv('BLOCK_STYLESHEETS', 'false').lower() == 'true':
+                blocked_types.append('stylesheet')
+            self.resource_blocker = ResourceBlocker(blocked_types=blocked_types)
+
+        # Local state (queues, caches, checkpoints)
+        self.data_dir = Path(os.getenv('CIPC_DATA_DIR', 'data'))
+
+        # CoR 30.1 forms and schedules, rendered in worker processes and cached by content
+        workers = os.getenv('DOCUMENT_WORKERS', '')
+        self.document_generator = DocumentGenerator(
+            self.data_dir / "documents", workers=int(workers) if workers else None
+        )
+
+        # Post-filing side effects: recorded in a durable outbox, drained in batches in the background
+        aisensy_api_key = os.getenv('AISENSY_API_KEY', '')
+        self.post_filing_outbox = PostFilingOutbox(
+            self.data_dir / "post_filing_outbox.db",
+            lease_seconds=float(os.getenv('POST_FILING_LEASE_SECONDS', '300'))
+        )
+        self.post_filing_actions = PostFilingActions(
+            self.post_filing_outbox,
+            self.data_dir / "reports",
+            notifier=AISensyNotifier(
+                aisensy_api_key,
+                base_url=os.getenv('AISENSY_BASE_URL', 'https://backend.aisensy.com'),
+                campaign=os.getenv('AISENSY_CAMPAIGN', 'filing_confirmation'),
+                timeout=float(os.getenv('AISENSY_TIMEOUT', '30'))
+            ) if aisensy_api_key else None
+        )
+        self.post_filing_dispatcher = OutboxDispatcher(
+            self.post_filing_outbox,
+            self.post_filing_actions.handlers(),
+            batch_size=int(os.getenv('POST_FILING_BATCH_SIZE', '100')),
+            max_attempts=int(os.getenv('POST_FILING_MAX_ATTEMPTS', '5'))
+        )
 
         # Timeouts and retry settings
         self.page_timeout = 60000  # 60 seconds
         self.element_timeout = 10000  # 10 seconds
+        self.captcha_wait_timeout = int(os.getenv('CAPTCHA_WAIT_MS', '2000'))  # grace for a late CAPTCHA image
         self.max_retries = 3
         self.retry_delay = 2  # seconds
+        self.checkpoint_ttl = float(os.getenv('CHECKPOINT_TTL_HOURS', '168')) * 3600
+        self.checkpoints = WorkflowCheckpointStore(self.data_dir / "workflow_checkpoints.db", self.checkpoint_ttl)
+
+        # One submission per company, financial year and form; duplicates get the recorded result.
+        # Both stores move into the queue's database when a shared queue is used (see _use_state_store)
+        self.submission_ledger = SubmissionLedger(self.data_dir / "submission_ledger.db")
+        self._filings_in_flight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+        # Navigation waits: load event to wait for, then the selector each step needs
+        self.navigation_wait_until = os.getenv('NAVIGATION_WAIT_UNTIL', 'domcontentloaded')
+        self.ready_selectors = {
+            "login": 'input[name="username"]',
+            "filing": 'select[name="filing_type"]',
+            "confirmation": '.confirmation'
+        }
+
+        # Company verification cache and lookup concurrency
+        self.verification_cache = CompanyVerificationCache(
+            self.data_dir / "company_verification.db",
+            max_entries=int(os.getenv('VERIFICATION_CACHE_SIZE', '10000'))
+        )
+        self.verification_concurrency = asyncio.Semaphore(int(os.getenv('VERIFICATION_CONCURRENCY', '5')))
+        self.verification_batch_size = int(os.getenv('VERIFICATION_BATCH_SIZE', '100'))
+        self._verifications_in_flight: Dict[str, asyncio.Future] = {}
 
         # Session management
         self.session_max_age = timedelta(hours=2)
+        self.session_cache = AuthSessionCache(self.data_dir / "cipc_session.json", self.session_max_age)
+
+        # Adaptive per-host throttling of portal navigation and submissions
+        self.rate_limiters = RateLimiterRegistry(
+            rate=float(os.getenv('PORTAL_RATE_LIMIT', '2.0')),
+            burst=int(os.getenv('PORTAL_RATE_BURST', '4')),
+            min_rate=float(os.getenv('PORTAL_RATE_MIN', '0.2')),
+            max_rate=float(os.getenv('PORTAL_RATE_MAX', '10.0')),
+            slow_threshold=float(os.getenv('PORTAL_SLOW_THRESHOLD', '8.0'))
+        )
+
+        # Keep-alive HTTP transport for plain form steps; the browser handles CAPTCHA and JavaScript pages
+        self.http_fast_path = os.getenv('HTTP_FAST_PATH', 'false').lower() == 'true'
+        self.portal_http = PortalHttpClient(
+            self.rate_limiters,
+            user_agent=USER_AGENT,
+            timeout=self.page_timeout / 1000,
+            pool_size=int(os.getenv('HTTP_POOL_SIZE', '20'))
+        )
+
+        # Deadline-aware ordering of queued filings and portal slots
+        self.scheduler = PriorityPolicy(
+            horizon_days=float(os.getenv('SCHEDULER_HORIZON_DAYS', '90')),
+            aging_seconds_per_point=float(os.getenv('SCHEDULER_AGING_SECONDS', '3600'))
+        )
+
+        # Queue leases: how long a claimed filing stays reserved without a heartbeat from its worker
+        self.lease_seconds = float(os.getenv('WORKER_LEASE_SECONDS', '300'))
+        self.worker_poll_interval = float(os.getenv('WORKER_POLL_INTERVAL', '2'))
+
+        # Per-stage concurrency limits for batch filing; portal slots go to the most urgent filing
+        self.batch_concurrency = int(os.getenv('BATCH_CONCURRENCY', '10'))
+        self.stage_limits = {
+            "preflight": asyncio.Semaphore(int(os.getenv('PREFLIGHT_CONCURRENCY', '50'))),
+            "preparation": asyncio.Semaphore(int(os.getenv('PREPARATION_CONCURRENCY', '20'))),
+            "portal": PriorityGate(int(os.getenv('PORTAL_CONCURRENCY', '3')))
+        }
+
+        # Browser pool shared by all filings on this filer
+        self.browser_pool = BrowserPool(
+            launcher=self._initialize_browser,
+            context_factory=self._create_browser_context,
+            context_finalizer=self._finalize_context,
+            size=int(os.getenv('BROWSER_POOL_SIZE', '2')),
+            contexts_per_browser=int(os.getenv('BROWSER_CONTEXTS_PER_BROWSER', '4')),
+            recycle_after=int(os.getenv('BROWSER_RECYCLE_AFTER', '50')),
+            health_interval=float(os.getenv('BROWSER_HEALTH_INTERVAL', '60'))
+        )
+
+        # Progress history per filing and streaming sinks (PROGRESS_JSONL, PROGRESS_DB, PROGRESS_WS_PORT)
+        self.progress_log_size = int(os.getenv('PROGRESS_LOG_SIZE', '256'))
+        self.progress_sinks = self._create_progress_sinks()
+
+        # Metrics (Prometheus text format via METRICS_PORT and/or METRICS_TEXTFILE)
+        self.metrics = FilingMetrics()
+        self.filings_in_progress = 0
+        self.batch_pending = 0
+        self._metrics_tasks: List[asyncio.Task] = []
+        self._metrics_runner = None
+        self.metrics.gauge("cipc_active_browsers", "Connected pooled browsers", lambda: self.browser_pool.active_browsers)
+        self.metrics.gauge("cipc_active_contexts", "Browser contexts in use", lambda: self.browser_pool.active_contexts)
+        self.metrics.gauge("cipc_free_context_slots", "Unused browser context slots", lambda: self.browser_pool.free_slots)
+        self.metrics.gauge("cipc_filings_in_progress", "Filings currently running", lambda: self.filings_in_progress)
+        self.metrics.gauge("cipc_batch_queue_depth", "Queued batch filings not yet claimed", lambda: self.batch_pending)
+        self.metrics.gauge("cipc_post_filing_events_processed", "Post-filing outbox events completed since start", lambda: self.post_filing_dispatcher.processed)
+        self.metrics.gauge("cipc_portal_slot_waiters", "Filings waiting for a portal slot", lambda: self.stage_limits["portal"].waiting)
+        self.metrics.gauge("cipc_portal_queue_depth", "Portal calls waiting on the rate limiter", lambda: sum(
+            stats["queue_depth"] for stats in self.rate_limiters.stats().values()
+        ))
+        self.metrics.gauge("cipc_portal_rate", "Current portal request rate (req/s), lowest across hosts", lambda: min(
+            (stats["rate"] for stats in self.rate_limiters.stats().values()), default=0
+        ))
+        if self.resource_blocker:
+            blocker = self.resource_blocker
+            self.metrics.gauge("cipc_browser_requests_seen", "Browser requests routed through the resource blocker since start", lambda: blocker.requests_seen)
+            self.metrics.gauge("cipc_browser_requests_blocked", "Browser requests blocked since start", lambda: blocker.requests_blocked)
+            self.metrics.gauge("cipc_browser_bytes_blocked_estimate", "Estimated response bytes avoided by blocking since start", lambda: blocker.estimated_bytes_blocked)
+
+    async def start_metrics_exporters(self) -> None:
+        """Start the configured metrics endpoint and textfile exporter (idempotent)"""
+        metrics_port = os.getenv('METRICS_PORT', '')
+        if metrics_port and not self._metrics_runner:
+            self._metrics_runner = await self.metrics.serve(port=int(metrics_port))
+
+        metrics_textfile = os.getenv('METRICS_TEXTFILE', '')
+        if metrics_textfile and not self._metrics_tasks:
+            self._metrics_tasks.append(asyncio.create_task(self.metrics.run_textfile_exporter(
+                Path(metrics_textfile), float(os.getenv('METRICS_INTERVAL', '15'))
+            )))
+
+    async def close(self) -> None:
+        """Release the browser pool and Playwright driver"""
+        for task in self._metrics_tasks:
+            task.cancel()
+        self._metrics_tasks = []
+        if self._metrics_runner:
+            await self._metrics_runner.cleanup()
+            self._metrics_runner = None
+
+        for sink in self.progress_sinks:
+            await sink.close()
+
+        await self.browser_pool.close()
+        await self.portal_http.close()
+        await self.evidence_writer.close()
+        await self.post_filing_dispatcher.close(float(os.getenv('POST_FILING_DRAIN_SECONDS', '10')))
+        if self.post_filing_actions.notifier:
+            await self.post_filing_actions.notifier.close()
+        await self.post_filing_outbox.close()
+        await self.submission_ledger.close()
+        await self.checkpoints.close()
+        await self.verification_cache.close()
+        self.document_generator.shutdown()
+        if self._captcha_solver:
+            self._captcha_solver.shutdown()
+
+    async def warmup(self) -> None:
+        """Pay cold-start costs up front: launch the browser pool and build the CAPTCHA solver"""
+        started = time.perf_counter()
+        await self.browser_pool.start()
+        _ = self.captcha_solver
+        logger.info(f"Filer warmed up in {time.perf_counter() - started:.2f}s")
+
+    @property
+    def captcha_solver(self) -> Optional[AsyncCaptchaSolver]:
+        """CAPTCHA solver, built on first use"""
+        if not self._captcha_solver_created:
+            self._captcha_solver = self._create_captcha_solver()
+            self._captcha_solver_created = True
+        return self._captcha_solver
+
+    def _create_progress_sinks(self) -> List[ProgressSink]:
+        """Sinks every filing's progress is streamed to"""
+        sinks: List[ProgressSink] = []
+        if os.getenv('PROGRESS_JSONL'):
+            sinks.append(JsonlProgressSink(Path(os.getenv('PROGRESS_JSONL'))))
+        if os.getenv('PROGRESS_DB'):
+            sinks.append(SqliteProgressSink(Path(os.getenv('PROGRESS_DB'))))
+        if os.getenv('PROGRESS_WS_PORT'):
+            sinks.append(WebSocketProgressSink(port=int(os.getenv('PROGRESS_WS_PORT'))))
+        return sinks
+
+    def _create_captcha_solver(self) -> Optional[AsyncCaptchaSolver]:
+        """Build the async CAPTCHA solver (CAPTCHA_SOLVER=fake for local testing)"""
+        if os.getenv('CAPTCHA_SOLVER', '2captcha').lower() == 'fake':
+            solver = FakeCaptchaSolver(delay=float(os.getenv('FAKE_CAPTCHA_DELAY', '0.5')))
+        elif self.captcha_api_key:
+            from twocaptcha import TwoCaptcha
+            solver = TwoCaptcha(self.captcha_api_key)
+        else:
+            return None
+
+        return AsyncCaptchaSolver(
+            solver,
+            max_in_flight=int(os.getenv('CAPTCHA_MAX_IN_FLIGHT', '4')),
+            timeout=float(os.getenv('CAPTCHA_TIMEOUT', '120')),
+            cost_per_solve=float(os.getenv('CAPTCHA_COST_PER_SOLVE', '0.001'))
+        )
 
     async def file_annual_returns_comprehensive(
         self,
@@ -91,57 +352,482 @@ class EnhancedCIPCFiler:
         director_details: List[Dict[str, Any]] = None,
         shareholder_details: List[Dict[str, Any]] = None,
         business_address: str = "",
-        business_activity: str = ""
-    ) -> Tuple[FilingResult, List[WorkflowProgress]]:
+        business_activity: str = "",
+        customer_tier: str = "standard",
+        progress_sinks: Iterable[ProgressSink] = ()
+    ) -> Tuple[FilingResult, ProgressLog]:
         """
         Comprehensive annual returns filing following spec-agent-ar.md workflow
-        Returns result and detailed progress tracking
+        Returns result and detailed progress tracking; progress_sinks (closed by the caller) stream it as it happens
         """
 
-        progress_log: List[WorkflowProgress] = []
+        filing_key = f"{company_number}:{financial_year_end}"
+        progress_log = ProgressLog(
+            filing_key, maxlen=self.progress_log_size, sinks=(*self.progress_sinks, *progress_sinks)
+        )
         session_start = datetime.now()
+        started_at = time.time()
+        checkpoint: Optional[WorkflowCheckpoint] = None
+        step_timer = self.metrics.step_timer()
 
         def log_progress(state: WorkflowState, description: str, metadata: Dict[str, Any] = None):
-            progress = WorkflowProgress(state, description, datetime.now(), metadata)
-            progress_log.append(progress)
-            logger.info(f"[{state.value}] {description}")
+            progress_log.append(WorkflowProgress(state, description, time.monotonic(), metadata))
+            step_timer.transition(state.value)
+            self.tracer.step(filing_key, state.value)
+            logger.info("[{}] {}", state.value, description)  # formatted only if INFO is enabled
+
+        # Already filed: answer from the ledger without touching the portal
+        ledger_key = self.submission_ledger.key(company_number, financial_year_end)
+        entry = await self.submission_ledger.get(ledger_key)
+        if entry and entry.state == SubmissionLedger.COMPLETED:
+            log_progress(WorkflowState.COMPLETED, "Annual returns already filed - returning the recorded result", {
+                "filing_reference": entry.result["reference"]
+            })
+            self.metrics.filings.inc("duplicate")
+            return self._recorded_result(entry, company_number), progress_log
+
+        # The same filing already running here: share its outcome
+        in_flight = self._filings_in_flight.get(ledger_key)
+        if in_flight:
+            log_progress(WorkflowState.PENDING, "Duplicate of a filing already in progress - waiting for its result")
+            self.metrics.filings.inc("duplicate")
+            return await asyncio.shield(in_flight), progress_log
+
+        outcome = asyncio.get_running_loop().create_future()
+        self._filings_in_flight[ledger_key] = outcome
+        filing_result: Optional[FilingResult] = None
+        filing_key_token = current_filing_key.set(filing_key)
+        self.filings_in_progress += 1
+        self.tracer.begin(filing_key)
 
         try:
             log_progress(WorkflowState.PENDING, "Starting comprehensive annual returns filing")
 
-            # Step 1: Pre-flight checks (verify-CRA-01)
-            await self._step_preflight_checks(company_number, financial_year_end, log_progress)
-
-            # Step 2: Company verification (verify-CRA-02)
-            company_info = await self._step_company_verification(company_number, log_progress)
-            if not company_info:
-                raise Exception("Company verification failed - company not found or invalid")
-
-            # Step 3: Document preparation (verify-CRA-03)
-            filing_package = await self._step_document_preparation(
-                company_info, financial_year_end, director_details, shareholder_details,
-                contact_email, contact_phone, business_address, business_activity, log_progress
-            )
-
-            # Steps 4-7: Portal interaction and filing (verify-CRA-04 through verify-CRA-07)
-            filing_result = await self._execute_portal_filing_workflow(
-                company_number, company_name, financial_year_end,
-                contact_email, contact_phone, filing_package, log_progress
+            checkpoint = await self.checkpoints.load(filing_key) or WorkflowCheckpoint()
+            inputs_hash = self._filing_inputs_hash(
+                company_name, financial_year_end, director_details, shareholder_details,
+                contact_email, contact_phone, business_address, business_activity
             )
+            if checkpoint.is_done("preparation") and checkpoint.data.get("inputs_hash") != inputs_hash:
+                if checkpoint.is_done("submission_started"):
+                    raise Exception(
+                        "Filing details changed after the submission started - "
+                        "check the CIPC portal and run reconcile_filing.py before refiling"
+                    )
+                # The prepared package no longer matches the request; prepare and pay against the new one
+                checkpoint.drop_from("preparation")
+                log_progress(WorkflowState.PENDING, "Filing details changed since the last attempt - preparing documents again")
+            if checkpoint.completed_steps:
+                log_progress(WorkflowState.PENDING, f"Resuming filing after step '{checkpoint.completed_steps[-1]}'", {
+                    "completed_steps": list(checkpoint.completed_steps)
+                })
+
+            entry = await self.submission_ledger.reserve(ledger_key, filing_key)
+            if entry.state == SubmissionLedger.COMPLETED:
+                filing_result = self._recorded_result(entry, company_number)
+                log_progress(WorkflowState.COMPLETED, "Annual returns already filed - returning the recorded result")
+                self.metrics.filings.inc("duplicate")
+                return filing_result, progress_log
+            if entry.state == SubmissionLedger.IN_FLIGHT and not checkpoint.is_done("submission_started"):
+                raise Exception(
+                    "Another worker is submitting this filing or its submission has no recorded outcome - "
+                    "check the CIPC portal and run reconcile_filing.py before refiling"
+                )
+
+            async with self.stage_limits["preflight"]:
+                # Step 1: Pre-flight checks (verify-CRA-01)
+                if not checkpoint.is_done("preflight"):
+                    await self._step_preflight_checks(company_number, financial_year_end, log_progress)
+                    await self._save_checkpoint(filing_key, checkpoint, "preflight", WorkflowState.VERIFICATION)
+
+                # Step 2: Company verification (verify-CRA-02)
+                if checkpoint.is_done("verification"):
+                    company_info = CompanyInfo(**checkpoint.data["company_info"])
+                else:
+                    company_info = await self._with_retries(
+                        "verification", WorkflowState.VERIFICATION,
+                        lambda: self._step_company_verification(company_number, log_progress), log_progress
+                    )
+                    if not company_info:
+                        raise Exception("Company verification failed - company not found or invalid")
+                    await self._save_checkpoint(
+                        filing_key, checkpoint, "verification", WorkflowState.VERIFICATION,
+                        company_info=model_to_dict(company_info)
+                    )
+
+            async with self.stage_limits["preparation"]:
+                # Step 3: Document preparation (verify-CRA-03)
+                if checkpoint.is_done("preparation"):
+                    filing_package = checkpoint.data["filing_package"]
+                else:
+                    filing_package = await self._with_retries("preparation", WorkflowState.PREPARATION, lambda: self._step_document_preparation(
+                        company_info, financial_year_end, director_details, shareholder_details,
+                        contact_email, contact_phone, business_address, business_activity, log_progress
+                    ), log_progress)
+                    await self._save_checkpoint(
+                        filing_key, checkpoint, "preparation", WorkflowState.PREPARATION,
+                        filing_package=filing_package, inputs_hash=inputs_hash
+                    )
+
+            # Portal slots go to the filing closest to (or furthest past) its deadline
+            retries = checkpoint.data.get("failed_attempts", 0)
+            portal_key = self.scheduler.key(financial_year_end, customer_tier, retries, enqueued_at=started_at)
+            async with self.stage_limits["portal"].slot(portal_key, filing_key):
+                # Steps 4-7: Portal interaction and filing (verify-CRA-04 through verify-CRA-07)
+                filing_result = await self._execute_portal_filing_workflow(
+                    company_number, company_name, financial_year_end,
+                    contact_email, contact_phone, filing_package, log_progress,
+                    filing_key=filing_key, checkpoint=checkpoint
+                )
 
             log_progress(WorkflowState.COMPLETED, "Annual returns filing completed successfully")
+            self.metrics.filings.inc("success")
+            await self.checkpoints.clear(filing_key)
             return filing_result, progress_log
 
         except Exception as e:
             error_msg = f"Filing failed at step {progress_log[-1].state.value if progress_log else 'unknown'}: {str(e)}"
             log_progress(WorkflowState.FAILED, error_msg, {"error": str(e)})
+            self.metrics.filings.inc("failure")
 
-            return FilingResult(
+            # Count failed attempts so a filing that keeps failing yields its priority
+            if checkpoint is not None:
+                checkpoint.data["failed_attempts"] = checkpoint.data.get("failed_attempts", 0) + 1
+                try:
+                    await self.checkpoints.save(filing_key, checkpoint)
+                except Exception as save_error:
+                    logger.warning(f"Could not record failed attempt for {filing_key}: {save_error}")
+
+            filing_result = FilingResult(
                 success=False,
                 error_message=error_msg,
                 company_number=company_number,
                 company_name=company_name
-            ), progress_log
+            )
+            return filing_result, progress_log
+
+        finally:
+            del self._filings_in_flight[ledger_key]
+            outcome.set_result(filing_result or FilingResult(
+                success=False,
+                error_message="Filing was cancelled before it completed",
+                company_number=company_number,
+                company_name=company_name
+            ))
+            self.filings_in_progress -= 1
+            current_filing_key.reset(filing_key_token)
+            try:
+                await self.tracer.finish(filing_key, "success" if filing_result and filing_result.success else "failure")
+            except Exception as e:
+                logger.warning(f"Could not write diagnostics for {filing_key}: {e}")
+
+    @staticmethod
+    def _filing_inputs_hash(*inputs: Any) -> str:
+        """Fingerprint of the caller's filing details, to tell whether a checkpointed package is stale"""
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _recorded_result(entry: LedgerEntry, company_number: str) -> FilingResult:
+        """FilingResult for a filing the ledger has already seen through to CIPC confirmation"""
+        return FilingResult(
+            success=True,
+            filing_reference=entry.result["reference"],
+            confirmation_number=entry.result["confirmation"],
+            submission_date=entry.result["submission_date"],
+            company_number=company_number,
+            company_name=entry.result.get("company_name", "")
+        )
+
+    async def file_annual_returns_batch(
+        self,
+        requests: Union[Iterable[FilingRequest], AsyncIterable[FilingRequest]],
+        queue_path: Optional[Path] = None
+    ) -> AsyncIterator[Tuple[FilingRequest, FilingResult, ProgressLog]]:
+        """
+        Batch annual returns filing through a persistent queue (verify-CRA-10)
+        Yields each filing's result and progress as soon as it finishes
+        """
+        if queue_path:
+            await self._use_state_store(queue_path)
+        queue = FilingQueue(queue_path or self.data_dir / "filing_queue.db", lease_seconds=self.lease_seconds)
+        await queue.open()
+        await self.start_metrics_exporters()
+        self.batch_pending = (await queue.counts()).get(FilingQueue.QUEUED, 0)
+
+        claimed_jobs: Dict[int, FilingRequest] = {}
+        results: asyncio.Queue = asyncio.Queue()
+        work_available = asyncio.Event()
+        feeding_done = asyncio.Event()
+        verifications: List[asyncio.Task] = []
+        unverified: List[str] = []
+
+        def verify_queued(force: bool = False) -> None:
+            # Look companies up in batches as they are queued; filings claimed
+            # meanwhile share these lookups or read the cache they fill
+            if unverified and (force or len(unverified) >= self.verification_batch_size):
+                verifications.append(asyncio.create_task(self.verify_many(list(unverified))))
+                unverified.clear()
+
+        async def enqueue(request: FilingRequest) -> None:
+            self.batch_pending += await queue.enqueue(request, self._queue_priority(request))
+            work_available.set()
+            unverified.append(request.company_number)
+            verify_queued()
+
+        async def feed():
+            try:
+                if isinstance(requests, AsyncIterable):
+                    async for request in requests:
+                        await enqueue(request)
+                else:
+                    for request in requests:
+                        await enqueue(request)
+                verify_queued(force=True)
+            finally:
+                feeding_done.set()
+                work_available.set()
+
+        async def work():
+            while True:
+                work_available.clear()
+                claimed = await queue.claim()
+                if not claimed:
+                    if feeding_done.is_set():
+                        return
+                    await work_available.wait()
+                    continue
+
+                job_id, request = claimed
+                # Claims may reclaim expired leases that were never counted as queued
+                self.batch_pending = (await queue.counts()).get(FilingQueue.QUEUED, 0)
+                claimed_jobs[job_id] = request
+                try:
+                    result, progress = await self.file_annual_returns_comprehensive(**request.to_kwargs())
+                    await queue.complete(job_id, result, [p.to_dict() for p in progress])
+                finally:
+                    claimed_jobs.pop(job_id, None)
+                await results.put((request, result, progress))
+
+        feeder = asyncio.create_task(feed())
+        workers = [asyncio.create_task(work()) for _ in range(self.batch_concurrency)]
+        all_done = asyncio.gather(feeder, *workers)
+        all_done.add_done_callback(lambda _: results.put_nowait(None))
+        heartbeat = asyncio.create_task(self._renew_leases(queue, claimed_jobs, lambda: self.batch_concurrency))
+
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    break
+                yield item
+
+            await all_done
+            logger.info(f"Batch filing finished: {await queue.counts()}")
+
+        finally:
+            for task in (feeder, heartbeat, *workers, *verifications):
+                task.cancel()
+            await asyncio.gather(feeder, heartbeat, *workers, *verifications, return_exceptions=True)
+            await queue.close()
+
+    async def run_worker(
+        self,
+        queue_path: Optional[Path] = None,
+        worker_id: Optional[str] = None,
+        stop: Optional[asyncio.Event] = None,
+        exit_when_idle: bool = False
+    ) -> Dict[str, int]:
+        """
+        Worker mode: lease filings from a queue shared with other worker processes
+        Claims as many filings as there are free browser slots, renews its leases
+        while they run and reclaims filings whose worker stopped heartbeating.
+        Runs until stop is set (or the queue is empty with exit_when_idle), then
+        finishes the filings it holds.
+        """
+        worker_id = worker_id or os.getenv('WORKER_ID') or f"{socket.gethostname()}:{os.getpid()}"
+        if queue_path:
+            await self._use_state_store(queue_path)
+        queue = FilingQueue(
+            queue_path or self.data_dir / "filing_queue.db", owner=worker_id, lease_seconds=self.lease_seconds
+        )
+        await queue.open()
+        await self.start_metrics_exporters()
+
+        stop = stop or asyncio.Event()
+        stopping = asyncio.create_task(stop.wait())
+        running: Dict[int, asyncio.Task] = {}
+        summary = {"done": 0, "failed": 0, "lost_leases": 0}
+
+        async def file(job_id: int, request: FilingRequest) -> None:
+            result, progress = await self.file_annual_returns_comprehensive(**request.to_kwargs())
+            # Successes are always recorded (or already were); a failure is dropped once the lease is lost
+            if await queue.complete(job_id, result, [p.to_dict() for p in progress]) or result.success:
+                summary["done" if result.success else "failed"] += 1
+            else:
+                summary["lost_leases"] += 1
+                logger.warning(f"Worker {worker_id} lost the lease on {request.filing_key}; failure not recorded")
+
+        heartbeat = asyncio.create_task(self._renew_leases(queue, running, lambda: self._worker_capacity(len(running))))
+        logger.info(f"Worker {worker_id} started with capacity {self.browser_pool.capacity}")
+
+        try:
+            while not stop.is_set():
+                for job_id in [job_id for job_id, task in running.items() if task.done()]:
+                    running.pop(job_id)
+
+                available = self._worker_capacity(len(running))
+                claimed = await queue.claim_many(available) if available > 0 else []
+                for job_id, request in claimed:
+                    running[job_id] = asyncio.create_task(file(job_id, request))
+
+                if exit_when_idle and not claimed and not running:
+                    break
+                await asyncio.wait(
+                    [stopping, *running.values()], timeout=self.worker_poll_interval,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+            if running:
+                logger.info(f"Worker {worker_id} stopping; finishing {len(running)} filings")
+                await asyncio.gather(*running.values(), return_exceptions=True)
+            return summary
+
+        finally:
+            # On cancellation, anything still held goes straight back to the queue
+            for task in (stopping, heartbeat, *running.values()):
+                task.cancel()
+            await asyncio.gather(stopping, heartbeat, *running.values(), return_exceptions=True)
+            await queue.release()
+            await queue.close()
+            logger.info(f"Worker {worker_id} stopped: {summary}")
+
+    async def _use_state_store(self, db_path: Path) -> None:
+        """
+        Keep checkpoints and the submission ledger in the queue's database, so a
+        filing reclaimed by another machine sees its submission_started marker
+        and in-flight ledger entry instead of submitting again
+        """
+        db_path = Path(db_path)
+        if self.submission_ledger.db_path == db_path:
+            return
+        await self.checkpoints.close()
+        await self.submission_ledger.close()
+        self.checkpoints = WorkflowCheckpointStore(db_path, self.checkpoint_ttl)
+        self.submission_ledger = SubmissionLedger(db_path)
+
+    def _worker_capacity(self, in_flight: int) -> int:
+        """Filings this worker can take on now, bounded by free browser context slots"""
+        return max(0, min(self.browser_pool.free_slots, self.browser_pool.capacity - in_flight))
+
+    async def _renew_leases(self, queue: FilingQueue, jobs: Dict[int, Any], capacity: Callable[[], int]) -> None:
+        """Heartbeat the queue every third of a lease so running filings are not reclaimed"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                held = set(await queue.heartbeat(list(jobs), capacity()))
+                lost = set(jobs) - held
+                if lost:
+                    logger.warning(f"Leases lost for queue jobs {sorted(lost)}; another worker may refile them")
+                self.batch_pending = (await queue.counts()).get(FilingQueue.QUEUED, 0)
+            except Exception as e:
+                logger.error(f"Lease heartbeat failed: {e}")
+
+    async def enqueue_import(
+        self,
+        path: Path,
+        rejects_path: Optional[Path] = None,
+        queue_path: Optional[Path] = None,
+        reject_overdue: bool = False
+    ) -> int:
+        """Stream a CSV/JSONL client file into the shared queue for worker mode; returns filings queued"""
+        importer = FilingImporter(
+            path,
+            rejects_path=rejects_path,
+            batch_size=int(os.getenv('IMPORT_BATCH_SIZE', '1000')),
+            reject_overdue=reject_overdue
+        )
+        queue = FilingQueue(queue_path or self.data_dir / "filing_queue.db", owner="importer")
+        await queue.open()
+        try:
+            queued = 0
+            async for request in importer.stream():
+                queued += await queue.enqueue(request, self._queue_priority(request))
+            logger.info(f"Queued {queued} filings from {path.name} for workers")
+            return queued
+        finally:
+            await queue.close()
+
+    async def reconcile_filing(
+        self,
+        company_number: str,
+        financial_year_end: str,
+        reference: Optional[str] = None,
+        confirmation: Optional[str] = None,
+        submission_date: Optional[str] = None,
+        queue_path: Optional[Path] = None
+    ) -> str:
+        """
+        Settle a filing whose submission has no recorded outcome, after checking the CIPC portal
+        With the portal's reference it is recorded as filed; without one it goes back
+        to pending and the next run resumes just before submission. Returns the ledger state.
+        queue_path selects the shared store used by workers on that queue.
+        """
+        if queue_path:
+            await self._use_state_store(queue_path)
+        filing_key = f"{company_number}:{financial_year_end}"
+        ledger_key = self.submission_ledger.key(company_number, financial_year_end)
+        checkpoint = await self.checkpoints.load(filing_key)
+
+        result = None
+        if reference:
+            company_info = (checkpoint.data.get("company_info") if checkpoint else None) or {}
+            result = {
+                "reference": reference,
+                "confirmation": confirmation or reference,
+                "submission_date": submission_date or datetime.now().isoformat(),
+                "company_name": company_info.get("name", "")
+            }
+
+        if not await self.submission_ledger.resolve(ledger_key, filing_key, result):
+            raise Exception(f"{filing_key} is already recorded as filed - nothing to reconcile")
+
+        if result:
+            await self.checkpoints.clear(filing_key)
+        elif checkpoint and checkpoint.is_done("submission_started"):
+            checkpoint.completed_steps.remove("submission_started")
+            await self.checkpoints.save(filing_key, checkpoint)
+
+        state = SubmissionLedger.COMPLETED if result else SubmissionLedger.PENDING
+        logger.info(f"Reconciled {filing_key}: {state}" + (f" (reference {reference})" if reference else ""))
+        return state
+
+    def _queue_priority(self, request: FilingRequest) -> float:
+        return self.scheduler.key(request.financial_year_end, request.customer_tier)
+
+    def scheduling_view(self) -> Dict[str, Any]:
+        """Portal slot usage and the filings waiting for one, in admission order"""
+        portal = self.stage_limits["portal"]
+        return {**portal.stats(), "waiters": portal.view()}
+
+    async def file_annual_returns_import(
+        self,
+        path: Path,
+        rejects_path: Optional[Path] = None,
+        queue_path: Optional[Path] = None,
+        reject_overdue: bool = False
+    ) -> AsyncIterator[Tuple[FilingRequest, FilingResult, ProgressLog]]:
+        """
+        Batch-file every valid row of a CSV/JSONL client file
+        Rows are streamed into the filing queue; rejects go to rejects_path
+        """
+        importer = FilingImporter(
+            path,
+            rejects_path=rejects_path,
+            batch_size=int(os.getenv('IMPORT_BATCH_SIZE', '1000')),
+            reject_overdue=reject_overdue
+        )
+        async for item in self.file_annual_returns_batch(importer.stream(), queue_path=queue_path):
+            yield item
 
     async def _step_preflight_checks(
         self,
@@ -153,13 +839,13 @@ class EnhancedCIPCFiler:
         log_progress(WorkflowState.VERIFICATION, "Performing pre-flight validation checks")
 
         # Validate company number format (YYYY/NNNNNN/NN)
-        if not re.match(r'^\d{4}/\d{6}/\d{2}$', company_number):
+        if not REGISTRATION_NUMBER_PATTERN.match(company_number):
             raise Exception(f"Invalid company registration number format: {company_number}")
 
         # Parse and validate financial year end
         try:
             fy_end_date = datetime.fromisoformat(financial_year_end)
-            filing_deadline = fy_end_date + timedelta(days=275)  # 9 months
+            filing_deadline = fy_end_date + timedelta(days=FILING_DEADLINE_DAYS)  # 9 months
 
             if datetime.now() > filing_deadline:
                 log_progress(WorkflowState.VERIFICATION, f"Warning: Filing deadline passed ({filing_deadline.date()})")
@@ -180,19 +866,130 @@ class EnhancedCIPCFiler:
         """Step 2: Company verification against CIPC (verify-CRA-02)"""
         log_progress(WorkflowState.VERIFICATION, "Verifying company details with CIPC")
 
-        # This would make an actual request to CIPC company search
-        # For now, return mock verified data
-        company_info = CompanyInfo(
-            registration_number=company_number,
-            name=f"Verified Company {company_number}",
-            status="Active",
-            incorporation_date="2021-03-15",
-            financial_year_end="2024-02-28"
-        )
+        cached = await self.verification_cache.get_many([company_number])
+        if company_number in cached:
+            company_info = cached[company_number]
+            source = "cache"
+        else:
+            company_info = await self._verify_uncached(company_number)
+            source = "cipc"
 
-        log_progress(WorkflowState.VERIFICATION, f"Company verified: {company_info.name}")
+        if company_info:
+            log_progress(WorkflowState.VERIFICATION, f"Company verified: {company_info.name}", {"source": source})
         return company_info
 
+    async def verify_many(self, company_numbers: Iterable[str]) -> Dict[str, Optional[CompanyInfo]]:
+        """
+        Verify a batch of companies, looking up each distinct uncached number once
+        and caching the lookups in one write; numbers whose lookup failed are left out
+        """
+        unique_numbers = list(dict.fromkeys(company_numbers))
+        results = await self.verification_cache.get_many(unique_numbers)
+
+        uncached = [number for number in unique_numbers if number not in results]
+        if uncached:
+            # Filings verifying these numbers meanwhile wait on our lookups until they are cached
+            shared = {number: self._verifications_in_flight[number] for number in uncached if number in self._verifications_in_flight}
+            loop = asyncio.get_running_loop()
+            owned = {number: loop.create_future() for number in uncached if number not in shared}
+            self._verifications_in_flight.update(owned)
+            lookups: List[Any] = []
+            try:
+                lookups = await asyncio.gather(
+                    *(self._lookup_limited(number) for number in owned),
+                    *(asyncio.shield(future) for future in shared.values()),
+                    return_exceptions=True
+                )
+                outcomes = dict(zip([*owned, *shared], lookups))
+                found = {number: info for number, info in outcomes.items() if not isinstance(info, BaseException)}
+                fresh = {number: found[number] for number in owned if number in found}
+                if fresh:
+                    await self.verification_cache.put_many(fresh)
+                results.update(found)
+                if len(found) < len(uncached):
+                    logger.warning(f"{len(uncached) - len(found)} company lookups failed; those filings verify individually")
+            finally:
+                for index, (number, future) in enumerate(owned.items()):
+                    del self._verifications_in_flight[number]
+                    if not lookups:
+                        future.cancel()
+                    elif isinstance(lookups[index], BaseException):
+                        future.set_exception(lookups[index])
+                        future.exception()  # retrieved, so an unawaited failure doesn't log a warning
+                    else:
+                        future.set_result(lookups[index])
+
+        logger.info(f"Verified {len(unique_numbers)} companies ({len(uncached)} CIPC lookups)")
+        return {number: results[number] for number in unique_numbers if number in results}
+
+    async def _lookup_limited(self, company_number: str) -> Optional[CompanyInfo]:
+        async with self.verification_concurrency:
+            return await self._lookup_company(company_number)
+
+    async def _verify_uncached(self, company_number: str) -> Optional[CompanyInfo]:
+        """Look a company up on CIPC, sharing the lookup with concurrent callers"""
+        in_flight = self._verifications_in_flight.get(company_number)
+        if in_flight:
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._verifications_in_flight[company_number] = future
+        try:
+            company_info = await self._lookup_limited(company_number)
+            await self.verification_cache.put(company_number, company_info)
+            future.set_result(company_info)
+            return company_info
+
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a lookup nobody else awaited doesn't log a warning
+            future.exception()
+            raise
+
+        finally:
+            del self._verifications_in_flight[company_number]
+
+    async def _lookup_company(self, company_number: str) -> Optional[CompanyInfo]:
+        """Search CIPC for a company; None when it is not registered"""
+        if not self.http_fast_path:
+            # This would make an actual request to CIPC company search
+            # For now, return mock verified data
+            return CompanyInfo(
+                registration_number=company_number,
+                name=f"Verified Company {company_number}",
+                status="Active",
+                incorporation_date="2021-03-15",
+                financial_year_end="2024-02-28"
+            )
+
+        search_url = f"{self.company_search_url}?{urlencode({'registration_number': company_number})}"
+        try:
+            page = await self._timed("http_company_search", self.portal_http.get(search_url))
+            page.ensure_plain()
+        except BrowserRequiredError as e:
+            self.metrics.http_fallbacks.inc("company_search")
+            logger.info(f"Company search for {company_number} needs the browser: {e}")
+            page = await self._timed("company_search", self._browser_fetch(search_url))
+
+        name = page.text("company-name")
+        if not name:
+            return None
+
+        return CompanyInfo(
+            registration_number=page.text("registration-number") or company_number,
+            name=name,
+            status=page.text("company-status") or "Unknown",
+            incorporation_date=page.text("incorporation-date") or "",
+            financial_year_end=page.text("financial-year-end") or ""
+        )
+
+    async def _browser_fetch(self, url: str) -> PortalPage:
+        """Render a page in a pooled browser context and parse it like an HTTP response"""
+        async with self.browser_pool.context() as context:
+            page = await context.new_page()
+            response = await self._portal_goto(page, url, wait_until=self.navigation_wait_until)
+            return PortalPage(page.url, response.status if response else 200, await page.content())
+
     async def _step_document_preparation(
         self,
         company_info: CompanyInfo,
@@ -220,17 +1017,21 @@ class EnhancedCIPCFiler:
             "business_activity": business_activity,
             "directors": director_details or [],
             "shareholders": shareholder_details or [],
-            "form_type": "AR01",  # Private company annual returns
+            "form_type": ANNUAL_RETURN_FORM,  # Private company annual returns
         }
 
-        # Generate PDF (would integrate with PDF generation library)
+        # Render PDFs in the document worker pool (cached for retries and re-filings)
+        documents = await self._timed("document_generation", self.document_generator.generate(filing_data))
         filing_package = {
             "form_data": filing_data,
-            "documents": ["CoR_30.1_Form.pdf", "Director_Schedules.pdf"],
+            "documents": [document.name for document in documents],
+            "artifacts": [asdict(document) for document in documents],
             "ready_for_filing": True
         }
 
-        log_progress(WorkflowState.PREPARATION, f"Documents prepared: {len(filing_package['documents'])} files")
+        log_progress(WorkflowState.PREPARATION, f"Documents prepared: {len(filing_package['documents'])} files", {
+            "cached": sum(document.cached for document in documents)
+        })
         return filing_package
 
     async def _execute_portal_filing_workflow(
@@ -241,123 +1042,426 @@ class EnhancedCIPCFiler:
         contact_email: str,
         contact_phone: str,
         filing_package: Dict[str, Any],
-        log_progress
+        log_progress,
+        filing_key: Optional[str] = None,
+        checkpoint: Optional[WorkflowCheckpoint] = None
     ) -> FilingResult:
         """Execute the complete portal filing workflow"""
-        browser = None
-        context = None
-
-        try:
-            # Initialize browser
-            browser = await self._initialize_browser()
-            context = await self._create_browser_context(browser)
-            page = await context.new_page()
+        filing_key = filing_key or f"{company_number}:{financial_year_end}"
+        checkpoint = checkpoint or WorkflowCheckpoint()
+
+        if checkpoint.is_done("submission"):
+            log_progress(WorkflowState.SUBMISSION, "Filing already submitted - skipping portal steps")
+        elif checkpoint.is_done("submission_started"):
+            raise Exception(
+                "Previous submission attempt has no recorded outcome - "
+                "check the CIPC portal and run reconcile_filing.py before refiling"
+            )
+        elif not (self.http_fast_path and await self._run_http_session(
+            company_number, company_name, financial_year_end, filing_key, checkpoint, log_progress
+        )):
+            # A crashed browser gets a fresh context, but once the submit button
+            # has been clicked the session is never replayed
+            await self._with_retries(
+                "portal session", WorkflowState.FILING,
+                lambda: self._run_portal_session(
+                    company_number, company_name, financial_year_end, filing_key, checkpoint, log_progress
+                ),
+                log_progress,
+                should_retry=lambda e: (
+                    isinstance(e, BrowserSessionLostError) and not checkpoint.is_done("submission_started")
+                )
+            )
 
-            # Step 4: Portal login (verify-CRA-04)
-            login_success = await self._portal_login(page, log_progress)
-            if not login_success:
-                raise Exception("Portal authentication failed")
+        submission_result = checkpoint.data["submission_result"]
+        await self.submission_ledger.complete(self.submission_ledger.key(company_number, financial_year_end), {
+            "reference": submission_result["reference"],
+            "confirmation": submission_result["confirmation"],
+            "submission_date": checkpoint.data["submission_date"],
+            "company_name": company_name
+        })
+
+        # Step 8: Post-filing actions (verify-CRA-08)
+        await self._post_filing_actions(filing_key, submission_result["reference"], {
+            "company_number": company_number,
+            "company_name": company_name,
+            "financial_year_end": financial_year_end,
+            "contact_email": contact_email,
+            "contact_phone": contact_phone,
+            "reference": submission_result["reference"],
+            "confirmation": submission_result["confirmation"],
+            "submission_date": checkpoint.data["submission_date"]
+        }, log_progress)
+
+        return FilingResult(
+            success=True,
+            filing_reference=submission_result["reference"],
+            confirmation_number=submission_result["confirmation"],
+            submission_date=checkpoint.data["submission_date"],
+            company_number=company_number,
+            company_name=company_name
+        )
 
-            # Step 5: Filing initiation (verify-CRA-05)
-            filing_started = await self._initiate_filing(
-                page, company_number, company_name, financial_year_end, log_progress
-            )
-            if not filing_started:
-                raise Exception("Could not initiate filing process")
+    async def _run_portal_session(
+        self,
+        company_number: str,
+        company_name: str,
+        financial_year_end: str,
+        filing_key: str,
+        checkpoint: WorkflowCheckpoint,
+        log_progress
+    ) -> None:
+        """Run portal steps 4-7 on one pooled browser context"""
+        async with self.browser_pool.context() as context:
+            page = await context.new_page()
+            page_alive = lambda e: not page.is_closed()
+
+            try:
+                # Step 4: Portal login (verify-CRA-04)
+                await self._with_retries("login", WorkflowState.FILING, lambda: self._require(
+                    self._timed("portal_login", self._portal_login(page, log_progress)),
+                    "Portal authentication failed"
+                ), log_progress, should_retry=page_alive)
+                await self.tracer.authenticated(context)
+
+                # Step 5: Filing initiation (verify-CRA-05)
+                await self._with_retries("initiation", WorkflowState.FILING, lambda: self._require(
+                    self._timed("initiate_filing", self._initiate_filing(
+                        page, company_number, company_name, financial_year_end, log_progress
+                    )),
+                    "Could not initiate filing process"
+                ), log_progress, should_retry=page_alive)
+
+            except Exception as e:
+                if page.is_closed():
+                    raise BrowserSessionLostError(f"Browser session lost: {str(e)}") from e
+                raise
 
             # Step 6: Payment processing (verify-CRA-06)
-            payment_completed = await self._process_filing_payment(page, log_progress)
-            if not payment_completed:
-                raise Exception("Payment processing failed")
+            if not checkpoint.is_done("payment"):
+                await self._require(self._process_filing_payment(page, log_progress), "Payment processing failed")
+                await self._save_checkpoint(filing_key, checkpoint, "payment", WorkflowState.PAYMENT)
 
             # Step 7: Final submission (verify-CRA-07)
-            submission_result = await self._submit_filing(page, log_progress)
+            await self._begin_submission(company_number, financial_year_end, filing_key, checkpoint)
+            submission_result = await self._timed("submit_filing", self._submit_filing(page, log_progress))
             if not submission_result["success"]:
                 raise Exception(f"Filing submission failed: {submission_result.get('error', 'Unknown error')}")
 
-            # Step 8: Post-filing actions (verify-CRA-08)
-            await self._post_filing_actions(submission_result["reference"], log_progress)
+            await self._save_checkpoint(
+                filing_key, checkpoint, "submission", WorkflowState.SUBMISSION,
+                submission_result=submission_result, submission_date=datetime.now().isoformat()
+            )
 
-            return FilingResult(
-                success=True,
-                filing_reference=submission_result["reference"],
-                confirmation_number=submission_result["confirmation"],
-                submission_date=datetime.now().isoformat(),
-                company_number=company_number,
-                company_name=company_name
+    async def _run_http_session(
+        self,
+        company_number: str,
+        company_name: str,
+        financial_year_end: str,
+        filing_key: str,
+        checkpoint: WorkflowCheckpoint,
+        log_progress
+    ) -> bool:
+        """Run portal steps 5-7 over keep-alive HTTP; False hands the filing to the browser"""
+        # Login has a CAPTCHA, so the fast path rides on a session the browser established
+        storage_state = self.session_cache.current()
+        if not storage_state:
+            return False
+
+        generation = self.session_cache.generation
+        await self.portal_http.use_session(storage_state, generation)
+
+        try:
+            # Step 5: Filing initiation (verify-CRA-05)
+            form_page, form = await self._with_retries("initiation", WorkflowState.FILING, lambda: self._timed(
+                "http_initiate_filing", self._http_initiate_filing(
+                    company_number, company_name, financial_year_end, log_progress
+                )
+            ), log_progress, should_retry=lambda e: not isinstance(e, BrowserRequiredError))
+
+        except BrowserRequiredError as e:
+            session_expired = isinstance(e, PortalSessionExpiredError)
+            if session_expired:
+                self.session_cache.invalidate(generation)
+            else:
+                await self._sync_http_cookies()
+            self.metrics.http_fallbacks.inc("initiation")
+            log_progress(WorkflowState.FILING, f"Falling back to the browser: {str(e)}", {
+                "transport": "http",
+                "session_expired": session_expired
+            })
+            return False
+
+        # Step 6: Payment processing (verify-CRA-06)
+        if not checkpoint.is_done("payment"):
+            await self._require(self._process_filing_payment(None, log_progress), "Payment processing failed")
+            await self._save_checkpoint(filing_key, checkpoint, "payment", WorkflowState.PAYMENT)
+
+        # Step 7: Final submission (verify-CRA-07) - never retried or handed to the browser once started
+        await self._begin_submission(company_number, financial_year_end, filing_key, checkpoint)
+        submission_result = await self._timed("http_submit_filing", self._http_submit_filing(
+            form_page, form, log_progress
+        ))
+        await self._sync_http_cookies()
+        if not submission_result["success"]:
+            raise Exception(f"Filing submission failed: {submission_result.get('error', 'Unknown error')}")
+
+        await self._save_checkpoint(
+            filing_key, checkpoint, "submission", WorkflowState.SUBMISSION,
+            submission_result=submission_result, submission_date=datetime.now().isoformat()
+        )
+        return True
+
+    async def _sync_http_cookies(self) -> None:
+        """Write cookies the portal set during HTTP steps back to the session cache the browser seeds from"""
+        try:
+            await self.session_cache.update_cookies(
+                self.portal_http.storage_cookies(), self.portal_http.session_generation
             )
+        except Exception as e:
+            logger.warning(f"Could not update cached CIPC session cookies: {e}")
 
+    async def _timed(self, operation: str, step: Awaitable[Any]) -> Any:
+        """Await a step, recording its latency in the operation histogram and the filing's timings"""
+        started = time.perf_counter()
+        try:
+            with self.metrics.time(operation):
+                return await step
         finally:
-            if context:
-                await context.close()
-            if browser:
-                await browser.close()
-
-    async def _initialize_browser(self) -> Browser:
-        """Initialize Playwright browser with optimal settings"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=self.headless,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-web-security',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-features=VizDisplayCompositor',
-                    '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                ]
-            )
-            return browser
+            self.tracer.operation(current_filing_key.get(), operation, time.perf_counter() - started)
+
+    async def _require(self, step: Awaitable[bool], error_message: str) -> None:
+        """Turn a step's False result into an exception so it can be retried"""
+        if not await step:
+            raise Exception(error_message)
+
+    async def _with_retries(
+        self,
+        step: str,
+        state: WorkflowState,
+        operation: Callable[[], Awaitable[Any]],
+        log_progress,
+        should_retry: Optional[Callable[[Exception], bool]] = None
+    ) -> Any:
+        """Run a workflow step with jittered exponential backoff between attempts"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await operation()
+
+            except Exception as e:
+                if attempt == self.max_retries or (should_retry and not should_retry(e)):
+                    raise
+
+                delay = self.retry_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                self.metrics.retries.inc(step)
+                log_progress(state, f"Retrying {step} in {delay:.1f}s after error: {str(e)}", {
+                    "step": step,
+                    "attempt": attempt,
+                    "delay": round(delay, 3)
+                })
+                await asyncio.sleep(delay)
+
+    async def _save_checkpoint(
+        self,
+        filing_key: str,
+        checkpoint: WorkflowCheckpoint,
+        step: str,
+        state: WorkflowState,
+        **data
+    ) -> None:
+        """Record a completed step so a later attempt can resume after it"""
+        checkpoint.mark_done(step, state.value, **data)
+        await self.checkpoints.save(filing_key, checkpoint)
+
+    async def _begin_submission(
+        self,
+        company_number: str,
+        financial_year_end: str,
+        filing_key: str,
+        checkpoint: WorkflowCheckpoint
+    ) -> None:
+        """Mark the filing in flight in the ledger and checkpoint it before the submit request goes out"""
+        if not await self.submission_ledger.begin(self.submission_ledger.key(company_number, financial_year_end), filing_key):
+            raise Exception("Filing is already submitted or being submitted by another worker - not submitting again")
+        await self._save_checkpoint(filing_key, checkpoint, "submission_started", WorkflowState.SUBMISSION)
+
+    async def _initialize_browser(self, playwright: Playwright) -> Browser:
+        """Launch a Playwright browser with optimal settings on the pool's driver"""
+        browser = await playwright.chromium.launch(
+            headless=self.headless,
+            args=[
+                '--no-sandbox',
+                '--disable-setuid-sandbox',
+                '--disable-dev-shm-usage',
+                '--disable-gpu',
+                '--disable-web-security',
+                '--disable-blink-features=AutomationControlled',
+                '--disable-features=VizDisplayCompositor',
+                f'--user-agent={USER_AGENT}'
+            ]
+        )
+        return browser
 
     async def _create_browser_context(self, browser: Browser) -> BrowserContext:
         """Create browser context with security and performance optimizations"""
         context = await browser.new_context(
             viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            user_agent=USER_AGENT,
             permissions=[],  # Block unnecessary permissions
             geolocation=None,
-            timezone_id='Africa/Johannesburg'
+            timezone_id='Africa/Johannesburg',
+            storage_state=self.session_cache.current()  # Seed with cached portal login
         )
 
         # Set longer timeouts for government site
         context.set_default_timeout(self.page_timeout)
         context.set_default_navigation_timeout(self.page_timeout)
 
+        # Skip non-essential resources; CAPTCHA images are always allowed
+        if self.resource_blocker:
+            await self.resource_blocker.install(context)
+
+        self.tracer.attach(context, current_filing_key.get())
         return context
 
+    async def _portal_goto(self, page: Page, url: str, **kwargs):
+        """Navigate to a portal page through the host's shared rate limiter"""
+        async with self.rate_limiters.for_url(url).throttle() as call:
+            response = await page.goto(url, **kwargs)
+            self._record_response(call, response)
+
+        if call.status in THROTTLE_STATUSES:
+            raise PortalThrottledError(url, call.status)
+
+        return response
+
+    async def _portal_click(self, page: Page, selector: str):
+        """
+        Click a control that posts to the portal through the shared rate limiter
+        Only the click and the portal's response are throttled; waiting for the
+        resulting page to render stays out of the limiter's latency feedback
+        """
+        async with self.rate_limiters.for_url(self.cipc_url).throttle() as call:
+            async with page.expect_navigation(wait_until='commit', timeout=self.page_timeout) as navigation:
+                await page.click(selector)
+            response = await navigation.value
+            self._record_response(call, response)
+
+        if call.status in THROTTLE_STATUSES:
+            raise PortalThrottledError(page.url, call.status)
+
+        return response
+
+    @staticmethod
+    def _record_response(call, response) -> None:
+        if response:
+            call.status = response.status
+            retry_after = response.headers.get('retry-after', '')
+            call.retry_after = float(retry_after) if retry_after.isdigit() else None
+
+    async def _navigate(
+        self,
+        page: Page,
+        url: str,
+        ready_selector: Optional[str],
+        state: WorkflowState,
+        log_progress
+    ):
+        """Navigate and wait only for what the next step needs, recording the wait"""
+        started = time.monotonic()
+        response = await self._portal_goto(page, url, wait_until=self.navigation_wait_until)
+        loaded = time.monotonic()
+
+        if ready_selector:
+            await page.wait_for_selector(ready_selector, state='visible', timeout=self.page_timeout)
+
+        ready = time.monotonic()
+        log_progress(state, f"Page ready: {url}", {
+            "wait_until": self.navigation_wait_until,
+            "ready_selector": ready_selector,
+            "load_seconds": round(loaded - started, 3),
+            "selector_seconds": round(ready - loaded, 3),
+            "wait_seconds": round(ready - started, 3)
+        })
+        return response
+
     async def _portal_login(self, page: Page, log_progress) -> bool:
         """Handle CIPC portal authentication (verify-CRA-04)"""
         log_progress(WorkflowState.FILING, "Authenticating with CIPC portal")
 
         try:
-            # Navigate to login page (this would be the actual CIPC login flow)
-            await page.goto(f"{self.cipc_url}/login", wait_until='networkidle')
-
             # Handle login steps (simplified for now)
             username = os.getenv('CIPC_USERNAME', '')
             password = os.getenv('CIPC_PASSWORD', '')
 
             if not username or not password:
+                await self._navigate(page, f"{self.cipc_url}/login", None, WorkflowState.FILING, log_progress)
                 log_progress(WorkflowState.FILING, "CIPC credentials not configured - using mock login")
                 return True
 
-            # Real login implementation would go here
-            await page.fill('input[name="username"]', username)
-            await page.fill('input[name="password"]', password)
-            await page.click('button[type="submit"]')
-
-            # Wait for successful login
-            await page.wait_for_url('**/dashboard**', timeout=30000)
+            # Reuse the cached session this context was seeded with
+            seen_generation = self.session_cache.generation
+            if self.session_cache.current():
+                if await self._probe_session(page):
+                    log_progress(WorkflowState.FILING, "Reusing cached CIPC portal session")
+                    return True
+                self.session_cache.invalidate(seen_generation)
+
+            async with self.session_cache.refresh_lock:
+                # Another filing may have refreshed the session while we waited
+                refreshed_state = self.session_cache.current()
+                if self.session_cache.generation != seen_generation and refreshed_state:
+                    await page.context.add_cookies(refreshed_state.get('cookies', []))
+                    if await self._probe_session(page):
+                        log_progress(WorkflowState.FILING, "Reusing refreshed CIPC portal session")
+                        return True
+
+                # Navigate to login page (this would be the actual CIPC login flow)
+                await self._navigate(
+                    page, f"{self.cipc_url}/login", self.ready_selectors["login"], WorkflowState.FILING, log_progress
+                )
+
+                # Solve any CAPTCHA while the credentials are being entered
+                captcha_task = await self._start_captcha_solve(page, log_progress)
+                try:
+                    await page.fill('input[name="username"]', username)
+                    await page.fill('input[name="password"]', password)
+
+                    if captcha_task and not await self._complete_captcha(page, captcha_task, log_progress):
+                        raise Exception("Login CAPTCHA could not be solved")
+                finally:
+                    if captcha_task:
+                        captcha_task.cancel()
+
+                # Submit credentials and wait for successful login
+                await self._portal_click(page, 'button[type="submit"]')
+                await page.wait_for_url('**/dashboard**', timeout=30000)
+
+                await self.session_cache.save(await page.context.storage_state())
 
             log_progress(WorkflowState.FILING, "Successfully logged into CIPC portal")
             return True
 
+        except PortalThrottledError:
+            raise
+
         except Exception as e:
             log_progress(WorkflowState.FILING, f"Portal login failed: {str(e)}")
             return False
 
+    async def _probe_session(self, page: Page) -> bool:
+        """Cheap check that the page's cookies still hold an authenticated session"""
+        try:
+            response = await self._portal_goto(page, f"{self.cipc_url}/dashboard", wait_until='domcontentloaded')
+            return '/login' not in page.url and (response is None or response.ok)
+
+        except PortalThrottledError:
+            raise
+
+        except Exception as e:
+            logger.debug(f"CIPC session probe failed: {e}")
+            return False
+
     async def _initiate_filing(
         self,
         page: Page,
@@ -371,24 +1475,65 @@ class EnhancedCIPCFiler:
 
         try:
             # Navigate to filing section
-            await page.goto(self.annual_returns_url, wait_until='networkidle')
+            await self._navigate(
+                page, self.annual_returns_url, self.ready_selectors["filing"], WorkflowState.FILING, log_progress
+            )
+
+            # Solve any CAPTCHA while the form is being filled
+            captcha_task = await self._start_captcha_solve(page, log_progress)
+            try:
+                # Select filing type and fill basic information
+                await page.select_option('select[name="filing_type"]', 'annual_returns')
 
-            # Select filing type and fill basic information
-            await page.select_option('select[name="filing_type"]', 'annual_returns')
+                # Fill company and filing details
+                await page.fill('input[name="company_registration"]', company_number)
+                await page.fill('input[name="company_name"]', company_name)
+                await page.fill('input[name="financial_year_end"]', financial_year_end.split('-')[0])
 
-            # Fill company and filing details
-            await page.fill('input[name="company_registration"]', company_number)
-            await page.fill('input[name="company_name"]', company_name)
-            await page.fill('input[name="financial_year_end"]', financial_year_end.split('-')[0])
+                if captcha_task and not await self._complete_captcha(page, captcha_task, log_progress):
+                    raise Exception("Filing CAPTCHA could not be solved")
+            finally:
+                if captcha_task:
+                    captcha_task.cancel()
 
             log_progress(WorkflowState.FILING, "Basic filing information entered")
             return True
 
+        except PortalThrottledError:
+            raise
+
         except Exception as e:
             log_progress(WorkflowState.FILING, f"Filing initiation failed: {str(e)}")
             return False
 
-    async def _process_filing_payment(self, page: Page, log_progress) -> bool:
+    async def _http_initiate_filing(
+        self,
+        company_number: str,
+        company_name: str,
+        financial_year_end: str,
+        log_progress
+    ) -> Tuple[PortalPage, PortalForm]:
+        """Fetch and fill the annual returns form over HTTP (verify-CRA-05)"""
+        log_progress(WorkflowState.FILING, "Initiating annual returns filing over HTTP")
+
+        page = await self.portal_http.get(self.annual_returns_url)
+        page.ensure_plain()
+
+        form = page.form_with("company_registration")
+        form.fill(
+            filing_type='annual_returns',
+            company_registration=company_number,
+            company_name=company_name,
+            financial_year_end=financial_year_end.split('-')[0]
+        )
+
+        log_progress(WorkflowState.FILING, "Basic filing information entered", {
+            "transport": "http",
+            "csrf_token": page.csrf_token is not None
+        })
+        return page, form
+
+    async def _process_filing_payment(self, page: Optional[Page], log_progress) -> bool:
         """Handle filing payment processing (verify-CRA-06)"""
         log_progress(WorkflowState.PAYMENT, "Processing filing payment")
 
@@ -407,20 +1552,73 @@ class EnhancedCIPCFiler:
         log_progress(WorkflowState.SUBMISSION, "Submitting annual returns filing")
 
         try:
-            # Submit the form
-            await page.click('button[type="submit"]')
-
-            # Wait for confirmation
-            await page.wait_for_selector('.confirmation', timeout=60000)
+            # Submit the form and wait for confirmation
+            await self._portal_click(page, 'button[type="submit"]')
+            wait_started = time.monotonic()
+            await page.wait_for_selector(self.ready_selectors["confirmation"], timeout=self.page_timeout)
+            confirmation_wait = time.monotonic() - wait_started
 
             # Extract reference numbers
             reference_element = await page.query_selector('.filing-reference')
             confirmation_element = await page.query_selector('.confirmation-number')
 
-            reference = await reference_element.inner_text() if reference_element else f"REF-{int(time.time())}"
+            # No reference means no proof of filing; the ledger keeps the filing in flight for reconciliation
+            if not reference_element:
+                raise Exception(f"No filing reference on confirmation page {page.url}")
+            reference = await reference_element.inner_text()
             confirmation = await confirmation_element.inner_text() if confirmation_element else reference
 
-            log_progress(WorkflowState.SUBMISSION, f"Filing submitted successfully - Reference: {reference}")
+            evidence_path = self._take_screenshot(
+                page, "confirmation", {"reference": reference, "confirmation": confirmation},
+                mode="element", selector=self.ready_selectors["confirmation"]
+            )
+
+            log_progress(WorkflowState.SUBMISSION, f"Filing submitted successfully - Reference: {reference}", {
+                "ready_selector": self.ready_selectors["confirmation"],
+                "wait_seconds": round(confirmation_wait, 3),
+                "evidence": evidence_path
+            })
+
+            return {
+                "success": True,
+                "reference": reference,
+                "confirmation": confirmation
+            }
+
+        except PortalThrottledError:
+            raise
+
+        except Exception as e:
+            evidence_path = self._take_screenshot(page, "submission_failed", {"error": str(e)})
+            log_progress(WorkflowState.SUBMISSION, f"Filing submission failed: {str(e)}", {"evidence": evidence_path})
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def _http_submit_filing(self, form_page: PortalPage, form: PortalForm, log_progress) -> Dict[str, Any]:
+        """Post the filled form and read the confirmation back over HTTP (verify-CRA-07)"""
+        log_progress(WorkflowState.SUBMISSION, "Submitting annual returns filing over HTTP")
+
+        try:
+            started = time.monotonic()
+            page = await self.portal_http.submit(form_page, form)
+            confirmation_wait = time.monotonic() - started
+
+            reference = page.text("filing-reference")
+            if not reference:
+                raise Exception(f"No filing reference on confirmation page {page.url}")
+            confirmation = page.text("confirmation-number") or reference
+
+            evidence_path = await self._save_page_evidence(
+                page, "confirmation", {"reference": reference, "confirmation": confirmation}
+            )
+
+            log_progress(WorkflowState.SUBMISSION, f"Filing submitted successfully - Reference: {reference}", {
+                "transport": "http",
+                "wait_seconds": round(confirmation_wait, 3),
+                "evidence": evidence_path
+            })
 
             return {
                 "success": True,
@@ -428,23 +1626,31 @@ class EnhancedCIPCFiler:
                 "confirmation": confirmation
             }
 
+        except PortalThrottledError:
+            raise
+
         except Exception as e:
-            log_progress(WorkflowState.SUBMISSION, f"Filing submission failed: {str(e)}")
+            log_progress(WorkflowState.SUBMISSION, f"Filing submission failed: {str(e)}", {"transport": "http"})
             return {
                 "success": False,
                 "error": str(e)
             }
 
-    async def _post_filing_actions(self, reference: str, log_progress) -> None:
-        """Execute post-filing actions (verify-CRA-08)"""
-        log_progress(WorkflowState.CONFIRMATION, "Executing post-filing actions")
+    async def _post_filing_actions(
+        self, filing_key: str, reference: str, payload: Dict[str, Any], log_progress
+    ) -> None:
+        """Queue post-filing actions (verify-CRA-08); the outbox workers carry them out"""
+        actions = self.post_filing_actions.actions
+        recorded = await self.post_filing_outbox.record(filing_key, reference, actions, payload)
 
-        # Send WhatsApp notification (would integrate with AISensy)
-        # Update database records
-        # Generate client report
-        # Schedule follow-ups
+        # WhatsApp notification, database records, client report and follow-ups run in batches
+        self.post_filing_dispatcher.start()
+        self.post_filing_dispatcher.notify()
 
-        log_progress(WorkflowState.CONFIRMATION, f"Post-filing actions completed for reference {reference}")
+        log_progress(WorkflowState.CONFIRMATION, f"Post-filing actions queued for reference {reference}", {
+            "actions": actions,
+            "already_queued": len(actions) - recorded
+        })
 
     async def _handle_captcha(self, page: Page, log_progress) -> bool:
         """Enhanced CAPTCHA handling with 2Captcha integration"""
@@ -452,79 +1658,166 @@ class EnhancedCIPCFiler:
             log_progress(WorkflowState.FILING, "CAPTCHA solver not configured")
             return False
 
+        solve_task = await self._start_captcha_solve(page, log_progress)
+        if not solve_task:
+            return True  # No CAPTCHA found
+
+        return await self._complete_captcha(page, solve_task, log_progress)
+
+    async def _start_captcha_solve(self, page: Page, log_progress) -> Optional[asyncio.Task]:
+        """Start solving the page's CAPTCHA in the background, if it has one"""
+        if not self.captcha_solver:
+            return None
+
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
         try:
-            # Find CAPTCHA image
-            captcha_img = await page.query_selector('img[src*="captcha"]')
+            # Pages wait only for domcontentloaded, so give a late CAPTCHA image a moment to attach
+            try:
+                captcha_img = await page.wait_for_selector(
+                    'img[src*="captcha"]', state="attached", timeout=self.captcha_wait_timeout
+                )
+            except PlaywrightTimeoutError:
+                return None
             if not captcha_img:
-                return True  # No CAPTCHA found
+                return None
 
             # Get CAPTCHA image data
             img_src = await captcha_img.get_attribute('src')
 
-            # Solve with 2Captcha
-            result = self.captcha_solver.normal(img_src, param='numeric')
+        except Exception as e:
+            log_progress(WorkflowState.FILING, f"CAPTCHA detection failed: {str(e)}")
+            return None
+
+        # Solve with 2Captcha off the event loop
+        log_progress(WorkflowState.FILING, "CAPTCHA detected - solving in background")
+        return asyncio.create_task(self._timed("captcha_solve", self.captcha_solver.solve(img_src, param='numeric')))
+
+    async def _complete_captcha(self, page: Page, solve_task: asyncio.Task, log_progress) -> bool:
+        """Wait for a background CAPTCHA solve and fill in the answer"""
+        try:
+            code = await solve_task
 
             # Fill the solution
             captcha_input = await page.query_selector('input[name*="captcha"]')
             if captcha_input:
-                await captcha_input.fill(result['code'])
+                await captcha_input.fill(code)
 
-            log_progress(WorkflowState.FILING, "CAPTCHA solved successfully")
+            log_progress(WorkflowState.FILING, "CAPTCHA solved successfully", self.captcha_solver.stats())
             return True
 
         except Exception as e:
             log_progress(WorkflowState.FILING, f"CAPTCHA solving failed: {str(e)}")
             return False
 
-    async def _take_screenshot(self, page: Page, filename: str, metadata: Dict[str, Any] = None) -> str:
-        """Enhanced screenshot with metadata"""
+    def _take_screenshot(
+        self,
+        page: Page,
+        filename: str,
+        metadata: Dict[str, Any] = None,
+        mode: Optional[str] = None,
+        selector: Optional[str] = None
+    ) -> str:
+        """Start capturing evidence off the submission path; returns the eventual path"""
         if not self.screenshots_enabled:
             return ""
 
+        mode = mode or self.screenshot_mode
+        filing_key = current_filing_key.get()
+        screenshot_path = self.evidence_writer.evidence_path(filing_key, filename)
+        capture = asyncio.create_task(self._capture_evidence(page, screenshot_path, mode, selector, {
+            "timestamp": datetime.now().isoformat(),
+            "filing_key": filing_key,
+            "filename": filename,
+            "mode": mode,
+            "selector": selector,
+            "url": page.url,
+            "metadata": metadata or {}
+        }))
+
+        # The page must stay open until the capture is taken; _finalize_context waits for it
+        captures = self._evidence_captures.setdefault(page.context, set())
+        captures.add(capture)
+        capture.add_done_callback(captures.discard)
+        return str(screenshot_path)
+
+    async def _capture_evidence(
+        self,
+        page: Page,
+        screenshot_path: Path,
+        mode: str,
+        selector: Optional[str],
+        metadata: Dict[str, Any]
+    ) -> None:
+        """Take the screenshot and hand it to the background writer"""
         try:
-            timestamp = int(time.time())
-            screenshot_path = self.screenshots_dir / f"{timestamp}_{filename}.png"
-            await page.screenshot(path=str(screenshot_path), full_page=True)
+            writer = self.evidence_writer
+            options: Dict[str, Any] = {"type": writer.capture_type}
+            if writer.capture_type == "jpeg":
+                options["quality"] = writer.quality
 
-            # Save metadata
-            metadata_path = screenshot_path.with_suffix('.json')
-            with open(metadata_path, 'w') as f:
-                json.dump({
-                    "timestamp": timestamp,
-                    "filename": filename,
-                    "metadata": metadata or {}
-                }, f, indent=2)
+            if mode == "element" and selector:
+                image = await page.locator(selector).first.screenshot(**options)
+            else:
+                image = await page.screenshot(full_page=(mode == "full"), **options)
 
-            return str(screenshot_path)
+            await writer.submit(screenshot_path, image, metadata)
 
         except Exception as e:
             logger.error(f"Screenshot failed: {e}")
+
+    async def _finalize_context(self, context: BrowserContext) -> None:
+        """Let pending evidence captures finish, then stop the context's trace"""
+        captures = self._evidence_captures.pop(context, None)
+        if captures:
+            await asyncio.gather(*captures, return_exceptions=True)
+        await self.tracer.detach(context)
+
+    async def _save_page_evidence(self, page: PortalPage, filename: str, metadata: Dict[str, Any] = None) -> str:
+        """Keep the HTML of a page fetched over HTTP as evidence; returns the eventual path"""
+        if not self.screenshots_enabled:
             return ""
 
-    @asynccontextmanager
-    async def managed_browser_session(self):
-        """Context manager for browser session with automatic cleanup"""
-        browser = None
-        context = None
+        filing_key = current_filing_key.get()
+        evidence_path = self.evidence_writer.evidence_path(filing_key, filename).with_suffix('.html')
+        await self.evidence_writer.submit(evidence_path, page.html.encode('utf-8'), {
+            "timestamp": datetime.now().isoformat(),
+            "filing_key": filing_key,
+            "filename": filename,
+            "mode": "html",
+            "url": page.url,
+            "metadata": metadata or {}
+        }, convert=False)
 
-        try:
-            browser = await self._initialize_browser()
-            context = await self._create_browser_context(browser)
-            yield browser, context
+        return str(evidence_path)
 
-        finally:
-            if context:
-                await context.close()
-            if browser:
-                await browser.close()
+    @asynccontextmanager
+    async def managed_browser_session(self):
+        """Context manager for a pooled browser session with automatic cleanup"""
+        async with self.browser_pool.context() as context:
+            yield context.browser, context
 
 
 # Convenience function for backward compatibility
 async def file_annual_returns_enhanced(*args, **kwargs) -> FilingResult:
     """Enhanced filing function for backward compatibility"""
     filer = EnhancedCIPCFiler()
-    result, _ = await filer.file_annual_returns_comprehensive(*args, **kwargs)
-    return result
+    try:
+        result, _ = await filer.file_annual_returns_comprehensive(*args, **kwargs)
+        return result
+    finally:
+        await filer.close()
+
+
+async def file_annual_returns_batch(
+    requests: Union[Iterable[FilingRequest], AsyncIterable[FilingRequest]]
+) -> List[FilingResult]:
+    """File a batch of annual returns on a single shared filer"""
+    filer = EnhancedCIPCFiler()
+    try:
+        return [result async for _, result, _ in filer.file_annual_returns_batch(requests)]
+    finally:
+        await filer.close()
 
 
 if __name__ == "__main__":
@@ -548,5 +1841,6 @@ if __name__ == "__main__":
             print(f"Error: {result.error_message}")
 
         print(f"Progress steps: {len(progress)}")
+        await filer.close()
 
     asyncio.run(test_filing())
@@ -0,0 +1,175 @@
+"""
+Evidence Pipeline - Off-loop screenshot and metadata storage for filings
+Encodes and writes captures on a background queue into per-filing directories
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Dict
+from pathlib import Path
+from dataclasses import dataclass
+
+from loguru import logger
+
+
+def prune_directory(root: Path, max_age_seconds: float, max_total_bytes: int) -> None:
+    """
+    Delete files under root older than max age, then oldest files until under the size cap
+    Files sharing a stem (a screenshot and its metadata JSON) are kept or deleted together
+    """
+    if not root.exists():
+        return
+
+    # stem -> [newest mtime, total size, paths]
+    groups: Dict[Path, list] = {}
+    for path in root.rglob('*'):
+        if not path.is_file():
+            continue
+        stat = path.stat()
+        group = groups.setdefault(path.with_suffix(''), [0.0, 0, []])
+        group[0] = max(group[0], stat.st_mtime)
+        group[1] += stat.st_size
+        group[2].append(path)
+
+    cutoff = time.time() - max_age_seconds
+    total = sum(size for mtime, size, _ in groups.values() if mtime >= cutoff)
+    for mtime, size, paths in sorted(groups.values(), key=lambda group: group[0]):
+        if mtime >= cutoff:
+            if total <= max_total_bytes:
+                break
+            total -= size
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    for directory in root.iterdir():
+        if directory.is_dir() and not any(directory.iterdir()):
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+@dataclass
+class EvidenceItem:
+    """A captured screenshot waiting to be written"""
+    path: Path
+    image: bytes
+    convert_to_webp: bool
+    quality: int
+    metadata: Dict[str, Any]
+
+
+class EvidenceWriter:
+    """Background writer for filing evidence with size- and age-based pruning"""
+
+    def __init__(
+        self,
+        root: Path,
+        image_format: str = "jpeg",
+        quality: int = 70,
+        max_total_bytes: int = 500 * 1024 * 1024,
+        max_age_seconds: float = 30 * 24 * 3600,
+        queue_size: int = 100,
+        workers: int = 2,
+        prune_every: int = 50
+    ):
+        self.root = Path(root)
+        self.image_format = image_format.lower()
+        self.quality = quality
+        self.max_total_bytes = max_total_bytes
+        self.max_age_seconds = max_age_seconds
+        self.prune_every = prune_every
+        self.worker_count = workers
+
+        if self.image_format == "webp" and not self._webp_available():
+            logger.warning("Pillow not installed - writing JPEG evidence instead of WebP")
+            self.image_format = "jpeg"
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = []
+        self._sequence = itertools.count(1)
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def capture_type(self) -> str:
+        """Playwright screenshot type; WebP is converted from a lossless PNG capture"""
+        return "png" if self.image_format in ("png", "webp") else "jpeg"
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def evidence_path(self, filing_id: str, name: str) -> Path:
+        """Collision-free file path inside the filing's evidence directory"""
+        safe_filing = re.sub(r'[^A-Za-z0-9_.-]+', '_', filing_id or "unassigned")
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+        extension = "jpg" if self.image_format == "jpeg" else self.image_format
+        filename = f"{next(self._sequence):05d}_{int(time.time())}_{safe_name}_{uuid.uuid4().hex[:8]}.{extension}"
+        return self.root / safe_filing / filename
+
+    async def submit(self, path: Path, image: bytes, metadata: Dict[str, Any], convert: bool = True) -> None:
+        """Queue a capture for writing; only waits if the writer is far behind
+
+        convert=False writes the bytes as-is (e.g. HTML captured by the HTTP fast path)
+        """
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._run()) for _ in range(self.worker_count)]
+
+        await self._queue.put(EvidenceItem(
+            path=path,
+            image=image,
+            convert_to_webp=convert and self.image_format == "webp",
+            quality=self.quality,
+            metadata=metadata
+        ))
+
+    async def close(self) -> None:
+        """Flush queued evidence and stop the writers"""
+        if self._workers:
+            await self._queue.join()
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await asyncio.to_thread(self._write, item)
+                self.written += 1
+                if self.written % self.prune_every == 0:
+                    await asyncio.to_thread(self.prune)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Evidence write failed for {item.path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, item: EvidenceItem) -> None:
+        image = item.image
+        if item.convert_to_webp:
+            from PIL import Image
+            buffer = io.BytesIO()
+            Image.open(io.BytesIO(image)).save(buffer, format="WEBP", quality=item.quality)
+            image = buffer.getvalue()
+
+        item.path.parent.mkdir(parents=True, exist_ok=True)
+        item.path.write_bytes(image)
+        item.path.with_suffix('.json').write_text(json.dumps(item.metadata, indent=2, default=str))
+
+    def prune(self) -> None:
+        """Delete evidence older than max age, then oldest files until under the size cap"""
+        prune_directory(self.root, self.max_age_seconds, self.max_total_bytes)
+
+    @staticmethod
+    def _webp_available() -> bool:
+        try:
+            import PIL  # noqa: F401
+            return True
+        except ImportError:
+            return False
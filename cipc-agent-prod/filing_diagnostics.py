@@ -0,0 +1,234 @@
+"""
+Filing Diagnostics - Sampled Playwright tracing and per-step timings for slow filings
+Traces a fraction of filings, or any filing once it runs past a latency threshold,
+and stores each trace with a step timing breakdown under size and age caps.
+Tracing starts only after portal login so credential entry is never recorded
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from datetime import datetime
+
+from loguru import logger
+
+from evidence import prune_directory
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext
+
+
+class FilingTimings:
+    """Step transitions and timed operations for one filing, relative to its start"""
+    __slots__ = ("filing_key", "started", "sampled", "traces", "steps", "operations", "state", "state_started")
+
+    def __init__(self, filing_key: str, sampled: bool):
+        self.filing_key = filing_key
+        self.started = time.monotonic()
+        self.sampled = sampled
+        self.traces: List[str] = []
+        self.steps: List[Tuple[str, float, float]] = []  # (state, offset, seconds)
+        self.operations: List[Tuple[str, float, float]] = []  # (operation, offset, seconds)
+        self.state: Optional[str] = None
+        self.state_started = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        now = self.elapsed
+        if self.state is not None:
+            self.steps.append((self.state, self.state_started, now - self.state_started))
+        self.state = state
+        self.state_started = now
+
+    def breakdown(self, outcome: str) -> Dict[str, Any]:
+        self.transition("finished")
+        per_step: Dict[str, float] = {}
+        for state, _, seconds in self.steps:
+            per_step[state] = per_step.get(state, 0.0) + seconds
+        return {
+            "filing_key": self.filing_key,
+            "outcome": outcome,
+            "sampled": self.sampled,
+            "total_seconds": round(self.elapsed, 3),
+            "seconds_per_step": {state: round(seconds, 3) for state, seconds in per_step.items()},
+            "steps": [
+                {"state": state, "offset": round(offset, 3), "seconds": round(seconds, 3)}
+                for state, offset, seconds in self.steps
+            ],
+            "operations": [
+                {"operation": name, "offset": round(offset, 3), "seconds": round(seconds, 3)}
+                for name, offset, seconds in self.operations
+            ],
+            "traces": self.traces
+        }
+
+
+class FilingTracer:
+    """Opt-in Playwright tracing on filer browser contexts; a no-op unless sampling or the slow threshold is set"""
+
+    def __init__(
+        self,
+        root: Path,
+        sample_rate: float = 0.0,
+        slow_threshold: float = 0.0,
+        max_trace_bytes: int = 50 * 1024 * 1024,
+        max_total_bytes: int = 1024 * 1024 * 1024,
+        max_age_seconds: float = 14 * 24 * 3600,
+        keep_per_filing: int = 3
+    ):
+        self.root = Path(root)
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_trace_bytes = max_trace_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_age_seconds = max_age_seconds
+        self.keep_per_filing = keep_per_filing
+        self.traces_written = 0
+        self.traces_dropped = 0
+        self._filings: Dict[str, FilingTimings] = {}
+        # context -> [filing key, trace reason or None, pending start timer, start task]
+        self._contexts: Dict[BrowserContext, list] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_threshold > 0
+
+    def begin(self, filing_key: str) -> None:
+        if self.enabled:
+            self._filings[filing_key] = FilingTimings(filing_key, random.random() < self.sample_rate)
+
+    def step(self, filing_key: str, state: str) -> None:
+        timings = self._filings.get(filing_key)
+        if timings:
+            timings.transition(state)
+
+    def operation(self, filing_key: str, name: str, seconds: float) -> None:
+        timings = self._filings.get(filing_key)
+        if timings:
+            timings.operations.append((name, timings.elapsed - seconds, seconds))
+
+    def attach(self, context: BrowserContext, filing_key: str) -> None:
+        """Associate a new context with its filing; nothing is traced until authenticated() is called"""
+        if filing_key in self._filings:
+            self._contexts[context] = [filing_key, None, None, None]
+
+    async def authenticated(self, context: BrowserContext) -> None:
+        """After portal login, trace now if the filing is sampled or already slow, else once it crosses the threshold"""
+        entry = self._contexts.get(context)
+        timings = self._filings.get(entry[0]) if entry else None
+        if not timings or entry[1] or entry[2] or entry[3]:
+            return
+
+        if timings.sampled:
+            await self._start(context, "sampled")
+        elif self.slow_threshold > 0:
+            remaining = self.slow_threshold - timings.elapsed
+            if remaining <= 0:
+                await self._start(context, "slow")
+            else:
+                entry[2] = asyncio.get_running_loop().call_later(remaining, self._start_later, context)
+
+    async def detach(self, context: BrowserContext) -> None:
+        """Stop and save the context's trace before the pool closes it"""
+        entry = self._contexts.pop(context, None)
+        if not entry:
+            return
+        filing_key, reason, timer, start_task = entry
+        if timer:
+            timer.cancel()
+        if start_task:
+            await asyncio.gather(start_task, return_exceptions=True)
+            reason = entry[1]
+        if not reason:
+            return
+
+        timings = self._filings.get(filing_key)
+        path = self._filing_dir(filing_key) / f"{datetime.now():%Y%m%d-%H%M%S}_{reason}_{id(context):x}.zip"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await context.tracing.stop(path=str(path))
+        except Exception as e:
+            logger.warning(f"Could not save trace for {filing_key}: {e}")
+            return
+
+        size = await asyncio.to_thread(lambda: path.stat().st_size)
+        if size > self.max_trace_bytes:
+            await asyncio.to_thread(path.unlink, True)
+            self.traces_dropped += 1
+            logger.warning(f"Dropped {size / 1024 / 1024:.1f} MB trace for {filing_key} (cap {self.max_trace_bytes // 1024 // 1024} MB)")
+            return
+
+        self.traces_written += 1
+        if timings:
+            timings.traces.append(path.name)
+        logger.info(f"Saved {reason} trace for {filing_key} to {path}")
+
+    async def finish(self, filing_key: str, outcome: str) -> Optional[Path]:
+        """Write the timing breakdown for traced or slow filings and rotate stored diagnostics"""
+        timings = self._filings.pop(filing_key, None)
+        if not timings:
+            return None
+        slow = self.slow_threshold > 0 and timings.elapsed >= self.slow_threshold
+        if not (timings.traces or timings.sampled or slow):
+            return None
+
+        breakdown = timings.breakdown(outcome)
+        path = self._filing_dir(filing_key) / f"{datetime.now():%Y%m%d-%H%M%S}_timings.json"
+        await asyncio.to_thread(self._write_timings, path, breakdown)
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "slow_threshold": self.slow_threshold,
+            "tracing": sum(1 for entry in self._contexts.values() if entry[1]),
+            "traces_written": self.traces_written,
+            "traces_dropped": self.traces_dropped
+        }
+
+    def _start_later(self, context: BrowserContext) -> None:
+        entry = self._contexts.get(context)
+        if entry:
+            entry[2] = None
+            entry[3] = asyncio.ensure_future(self._start(context, "slow"))
+
+    async def _start(self, context: BrowserContext, reason: str) -> None:
+        entry = self._contexts.get(context)
+        try:
+            await context.tracing.start(screenshots=True, snapshots=True)
+        except Exception as e:
+            logger.warning(f"Could not start tracing for {entry[0] if entry else 'context'}: {e}")
+            return
+        if entry:
+            entry[1] = reason
+            logger.info(f"Tracing {entry[0]} ({reason})")
+
+    def _filing_dir(self, filing_key: str) -> Path:
+        return self.root / re.sub(r'[^A-Za-z0-9_.-]+', '_', filing_key)
+
+    def _write_timings(self, path: Path, breakdown: Dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(breakdown, indent=2))
+        self._rotate(path.parent)
+        self.prune()
+
+    def _rotate(self, directory: Path) -> None:
+        """Keep the newest keep_per_filing traces and timing files for a filing"""
+        for pattern in ("*.zip", "*_timings.json"):
+            for old in sorted(directory.glob(pattern), reverse=True)[self.keep_per_filing:]:
+                old.unlink(missing_ok=True)
+
+    def prune(self) -> None:
+        """Delete diagnostics older than max age, then oldest files until under the size cap"""
+        prune_directory(self.root, self.max_age_seconds, self.max_total_bytes)
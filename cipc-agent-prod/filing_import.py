@@ -0,0 +1,194 @@
+"""
+Filing Import - Streaming CSV/JSONL importer for bulk annual returns filings
+Reads client spreadsheets lazily, validates them in batches, drops duplicate
+filings and writes rejected rows to a side file
+"""
+
+import asyncio
+import csv
+import json
+import re
+from itertools import islice
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, AsyncIterator
+from pathlib import Path
+from datetime import date, timedelta
+from dataclasses import dataclass, asdict
+
+from loguru import logger
+
+from filing_queue import FilingRequest
+
+
+# CIPC registration number (YYYY/NNNNNN/NN)
+REGISTRATION_NUMBER_PATTERN = re.compile(r'^\d{4}/\d{6}/\d{2}$')
+
+# Annual returns are due within 9 months of the financial year end
+FILING_DEADLINE_DAYS = 275
+
+REQUIRED_FIELDS = ("company_number", "company_name", "financial_year_end", "contact_email", "contact_phone")
+
+# CSV cells holding JSON lists
+JSON_FIELDS = ("director_details", "shareholder_details")
+
+
+@lru_cache(maxsize=4096)
+def parse_financial_year_end(value: str) -> Optional[date]:
+    """ISO date, or None; year ends repeat heavily across a client list"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+@dataclass
+class ImportReject:
+    """A row that could not be queued for filing"""
+    line: int
+    reason: str
+    record: Dict[str, Any]
+
+
+class FilingImporter:
+    """Streams FilingRequests from a CSV or JSONL file in validated batches"""
+
+    def __init__(
+        self,
+        path: Path,
+        rejects_path: Optional[Path] = None,
+        batch_size: int = 1000,
+        reject_overdue: bool = False,
+        today: Optional[date] = None
+    ):
+        self.path = Path(path)
+        self.rejects_path = Path(rejects_path) if rejects_path else self.path.with_name(f"{self.path.stem}.rejects.jsonl")
+        self.batch_size = batch_size
+        self.reject_overdue = reject_overdue
+        self.today = today or date.today()
+        self.format = "csv" if self.path.suffix.lower() == ".csv" else "jsonl"
+
+        self._seen: Set[str] = set()  # filing keys already imported
+        self.stats = {"read": 0, "valid": 0, "rejected": 0, "duplicates": 0, "overdue": 0}
+
+    async def stream(self) -> AsyncIterator[FilingRequest]:
+        """Yield valid requests; reading and validation run off the event loop one batch at a time"""
+        rows = self._rows()
+        try:
+            with self.rejects_path.open('w', encoding='utf-8') as rejects_file:
+                while True:
+                    batch = await asyncio.to_thread(lambda: list(islice(rows, self.batch_size)))
+                    if not batch:
+                        break
+
+                    valid, rejects = await asyncio.to_thread(self.validate_batch, batch)
+                    if rejects:
+                        await asyncio.to_thread(self._write_rejects, rejects_file, rejects)
+
+                    for request in valid:
+                        yield request
+        finally:
+            rows.close()
+
+        logger.info(f"Imported {self.path.name}: {self.stats} (rejects in {self.rejects_path})")
+
+    def validate_batch(self, batch: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[FilingRequest], List[ImportReject]]:
+        """Validate a batch column by column, then dedupe against everything already imported"""
+        self.stats["read"] += len(batch)
+        lines = [line for line, _ in batch]
+        records = [record for _, record in batch]
+        reasons: List[Optional[str]] = [None] * len(batch)
+
+        def reject_where(failed: List[bool], reason: str) -> None:
+            for index, is_failed in enumerate(failed):
+                if is_failed and reasons[index] is None:
+                    reasons[index] = reason
+
+        for index, record in enumerate(records):
+            if "_error" in record:
+                reasons[index] = record["_error"]
+
+        for name in REQUIRED_FIELDS:
+            reject_where([not str(record.get(name) or "").strip() for record in records], f"Missing {name}")
+
+        numbers = [str(record.get("company_number") or "").strip() for record in records]
+        reject_where(
+            [REGISTRATION_NUMBER_PATTERN.match(number) is None for number in numbers],
+            "Invalid company registration number format"
+        )
+
+        year_ends = [parse_financial_year_end(str(record.get("financial_year_end") or "").strip()) for record in records]
+        reject_where([year_end is None for year_end in year_ends], "Invalid financial year end date")
+        reject_where(
+            [year_end is not None and year_end > self.today for year_end in year_ends],
+            "Financial year has not ended"
+        )
+
+        earliest_on_time = self.today - timedelta(days=FILING_DEADLINE_DAYS)
+        overdue = [year_end is not None and year_end < earliest_on_time for year_end in year_ends]
+        if self.reject_overdue:
+            reject_where(overdue, f"Filing deadline passed ({FILING_DEADLINE_DAYS} days after year end)")
+
+        valid: List[FilingRequest] = []
+        rejects: List[ImportReject] = []
+        for line, record, number, year_end, is_overdue, reason in zip(
+            lines, records, numbers, year_ends, overdue, reasons
+        ):
+            if reason is None:
+                filing_key = f"{number}:{year_end.isoformat()}"
+                if filing_key in self._seen:
+                    self.stats["duplicates"] += 1
+                    reason = f"Duplicate filing {filing_key}"
+                else:
+                    try:
+                        request = self._to_request(record, number, year_end)
+                    except ValueError as e:
+                        reason = str(e)
+
+            if reason is not None:
+                rejects.append(ImportReject(line=line, reason=reason, record=record))
+                continue
+
+            self._seen.add(filing_key)
+            self.stats["overdue"] += is_overdue
+            valid.append(request)
+
+        self.stats["valid"] += len(valid)
+        self.stats["rejected"] += len(rejects)
+        return valid, rejects
+
+    def _rows(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(line number, raw record) pairs, read lazily"""
+        with self.path.open(newline='' if self.format == "csv" else None, encoding='utf-8-sig') as source:
+            if self.format == "csv":
+                reader = csv.DictReader(source)
+                for record in reader:
+                    yield reader.line_num, record
+                return
+
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = {"_raw": line.rstrip("\n"), "_error": f"Invalid JSON: {e.msg}"}
+                yield line_number, record if isinstance(record, dict) else {"_raw": record, "_error": "Not an object"}
+
+    @staticmethod
+    def _to_request(record: Dict[str, Any], company_number: str, year_end: date) -> FilingRequest:
+        values = {name: value for name, value in record.items() if value not in (None, "")}
+        for name in JSON_FIELDS:
+            if isinstance(values.get(name), str):
+                try:
+                    values[name] = json.loads(values[name])
+                except json.JSONDecodeError:
+                    raise ValueError(f"Invalid JSON in {name}")
+
+        values.update(company_number=company_number, financial_year_end=year_end.isoformat())
+        return FilingRequest.from_dict(values)
+
+    @staticmethod
+    def _write_rejects(rejects_file, rejects: List[ImportReject]) -> None:
+        for reject in rejects:
+            rejects_file.write(json.dumps(asdict(reject), default=str) + "\n")
+        rejects_file.flush()
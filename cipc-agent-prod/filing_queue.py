@@ -0,0 +1,285 @@
+"""
+Filing Queue - Persistent SQLite-backed queue for batch annual returns filings
+Survives restarts so queued and interrupted filings resume where they left off;
+claims are time-limited leases so several worker processes can share one queue
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, field, asdict, is_dataclass
+
+
+@dataclass
+class FilingRequest:
+    """A single annual returns filing request"""
+    company_number: str
+    company_name: str
+    financial_year_end: str
+    contact_email: str
+    contact_phone: str
+    director_details: List[Dict[str, Any]] = field(default_factory=list)
+    shareholder_details: List[Dict[str, Any]] = field(default_factory=list)
+    business_address: str = ""
+    business_activity: str = ""
+    customer_tier: str = "standard"
+
+    @property
+    def filing_key(self) -> str:
+        return f"{self.company_number}:{self.financial_year_end}"
+
+    def to_kwargs(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FilingRequest":
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+def model_to_dict(model: Any) -> Dict[str, Any]:
+    """Serialize a models.py object regardless of how the model is declared"""
+    if hasattr(model, 'model_dump'):
+        return model.model_dump()
+    if hasattr(model, 'dict'):
+        return model.dict()
+    if is_dataclass(model):
+        return asdict(model)
+    return dict(vars(model))
+
+
+class FilingQueue:
+    """SQLite-backed filing queue; all blocking I/O runs off the event loop"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, db_path: Path, owner: str = "local", lease_seconds: float = 300.0):
+        self.db_path = Path(db_path)
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def open(self) -> None:
+        """Open the store and return this owner's interrupted filings to the queue"""
+        await asyncio.to_thread(self._open)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+    async def enqueue(self, request: FilingRequest, priority: float = 0.0) -> bool:
+        """Queue a filing; failed filings with the same key are retried
+
+        priority is a static sort key (lower is claimed first), e.g. PriorityPolicy.key()
+        """
+        return await asyncio.to_thread(self._enqueue, request, priority)
+
+    async def claim(self) -> Optional[Tuple[int, FilingRequest]]:
+        """Claim the queued filing with the lowest priority key, oldest first on ties"""
+        claimed = await asyncio.to_thread(self._claim, 1)
+        return claimed[0] if claimed else None
+
+    async def claim_many(self, limit: int) -> List[Tuple[int, FilingRequest]]:
+        """Lease up to limit filings, including running ones whose lease has expired"""
+        return await asyncio.to_thread(self._claim, limit)
+
+    async def heartbeat(self, job_ids: List[int], capacity: int) -> List[int]:
+        """Extend this owner's leases and advertise its capacity; returns the job ids still held"""
+        return await asyncio.to_thread(self._heartbeat, job_ids, capacity)
+
+    async def release(self) -> None:
+        """Return this owner's running filings to the queue and deregister it"""
+        await asyncio.to_thread(self._release)
+
+    async def workers(self) -> List[Dict[str, Any]]:
+        """Workers whose last heartbeat is within one lease period"""
+        return await asyncio.to_thread(self._workers)
+
+    async def view(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Queued filings in the order they will be claimed"""
+        return await asyncio.to_thread(self._view, limit)
+
+    async def complete(self, job_id: int, result: Any, progress: List[Dict[str, Any]]) -> bool:
+        """Store the outcome of a claimed filing; False if it was not recorded
+
+        A success is recorded whoever holds the lease, since the filing was made;
+        a failure only while this owner still holds it
+        """
+        return await asyncio.to_thread(self._complete, job_id, model_to_dict(result), progress)
+
+    async def counts(self) -> Dict[str, int]:
+        """Number of filings per queue status"""
+        return await asyncio.to_thread(self._counts)
+
+    def _open(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS filing_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filing_key TEXT NOT NULL UNIQUE,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                progress TEXT,
+                priority REAL NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS filing_workers (
+                owner TEXT PRIMARY KEY,
+                capacity INTEGER NOT NULL,
+                in_flight INTEGER NOT NULL,
+                heartbeat_at REAL NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(filing_queue)")}
+        for column, definition in (
+            ("priority", "REAL NOT NULL DEFAULT 0"),
+            ("lease_owner", "TEXT"),
+            ("lease_expires_at", "REAL")
+        ):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE filing_queue ADD COLUMN {column} {definition}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_filing_queue_status ON filing_queue (status, id)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_filing_queue_priority ON filing_queue (status, priority, id)"
+        )
+        # Other owners' running filings are left to their leases
+        self._conn.execute(
+            "UPDATE filing_queue SET status = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE status = ? AND (lease_owner IS NULL OR lease_owner = ?)",
+            (self.QUEUED, datetime.now().isoformat(), self.RUNNING, self.owner)
+        )
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    def _enqueue(self, request: FilingRequest, priority: float) -> bool:
+        now = datetime.now().isoformat()
+        with self._db_lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO filing_queue (filing_key, request, status, priority, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (filing_key) DO UPDATE SET
+                    request = excluded.request, status = excluded.status,
+                    priority = excluded.priority, updated_at = excluded.updated_at
+                WHERE filing_queue.status = ?
+                """,
+                (request.filing_key, json.dumps(request.to_kwargs()), self.QUEUED, priority, now, now, self.FAILED)
+            )
+        return cursor.rowcount > 0
+
+    def _claim(self, limit: int) -> List[Tuple[int, FilingRequest]]:
+        now = time.time()
+        with self._db_lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent claimers never pick the same rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, request, status FROM filing_queue "
+                    "WHERE status = ? OR (status = ? AND lease_expires_at < ?) "
+                    "ORDER BY priority, id LIMIT ?",
+                    (self.QUEUED, self.RUNNING, now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE filing_queue SET status = ?, lease_owner = ?, lease_expires_at = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    [(self.RUNNING, self.owner, now + self.lease_seconds, datetime.now().isoformat(), row[0])
+                     for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return [(job_id, FilingRequest.from_dict(json.loads(request))) for job_id, request, _ in rows]
+
+    def _heartbeat(self, job_ids: List[int], capacity: int) -> List[int]:
+        now = time.time()
+        with self._db_lock:
+            self._conn.executemany(
+                "UPDATE filing_queue SET lease_expires_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                [(now + self.lease_seconds, job_id, self.RUNNING, self.owner) for job_id in job_ids]
+            )
+            self._conn.execute(
+                "INSERT INTO filing_workers (owner, capacity, in_flight, heartbeat_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (owner) DO UPDATE SET capacity = excluded.capacity, in_flight = excluded.in_flight, "
+                "heartbeat_at = excluded.heartbeat_at",
+                (self.owner, capacity, len(job_ids), now)
+            )
+            held = self._conn.execute(
+                "SELECT id FROM filing_queue WHERE status = ? AND lease_owner = ?", (self.RUNNING, self.owner)
+            ).fetchall()
+        return [row[0] for row in held]
+
+    def _release(self) -> None:
+        with self._db_lock:
+            self._conn.execute(
+                "UPDATE filing_queue SET status = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_owner = ?",
+                (self.QUEUED, datetime.now().isoformat(), self.RUNNING, self.owner)
+            )
+            self._conn.execute("DELETE FROM filing_workers WHERE owner = ?", (self.owner,))
+
+    def _workers(self) -> List[Dict[str, Any]]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT owner, capacity, in_flight, heartbeat_at FROM filing_workers "
+                "WHERE heartbeat_at >= ? ORDER BY owner",
+                (time.time() - self.lease_seconds,)
+            ).fetchall()
+        return [
+            {"owner": owner, "capacity": capacity, "in_flight": in_flight, "heartbeat_at": heartbeat_at}
+            for owner, capacity, in_flight, heartbeat_at in rows
+        ]
+
+    def _complete(self, job_id: int, result: Dict[str, Any], progress: List[Dict[str, Any]]) -> bool:
+        succeeded = bool(result.get("success"))
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "UPDATE filing_queue SET status = ?, result = ?, progress = ?, lease_owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND "
+                + ("status != ?" if succeeded else "lease_owner = ?"),
+                (self.DONE if succeeded else self.FAILED, json.dumps(result, default=str),
+                 json.dumps(progress, default=str), datetime.now().isoformat(), job_id,
+                 self.DONE if succeeded else self.owner)
+            )
+        return cursor.rowcount > 0
+
+    def _view(self, limit: int) -> List[Dict[str, Any]]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, filing_key, request, priority, created_at FROM filing_queue "
+                "WHERE status = ? ORDER BY priority, id LIMIT ?",
+                (self.QUEUED, limit)
+            ).fetchall()
+        return [
+            {
+                "id": job_id,
+                "filing_key": filing_key,
+                "customer_tier": json.loads(request).get("customer_tier", "standard"),
+                "priority": priority,
+                "created_at": created_at
+            }
+            for job_id, filing_key, request, priority, created_at in rows
+        ]
+
+    def _counts(self) -> Dict[str, int]:
+        with self._db_lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM filing_queue GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
@@ -0,0 +1,86 @@
+"""
+Filing Worker - Runs EnhancedCIPCFiler in worker mode across several processes
+Each process leases filings from the shared queue up to its free browser slots;
+start it on as many machines as the queue store can serve
+
+Usage:
+    python filing_worker.py --processes 4
+    python filing_worker.py --enqueue clients.csv --processes 2 --exit-when-idle
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import socket
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+
+async def run_worker(queue_path: Optional[Path], worker_id: str, exit_when_idle: bool) -> None:
+    from enhanced_cipc_filer import EnhancedCIPCFiler
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    filer = EnhancedCIPCFiler()
+    try:
+        await filer.run_worker(queue_path, worker_id=worker_id, stop=stop, exit_when_idle=exit_when_idle)
+    finally:
+        await filer.close()
+
+
+def worker_process(queue_path: Optional[Path], worker_id: str, exit_when_idle: bool) -> None:
+    asyncio.run(run_worker(queue_path, worker_id, exit_when_idle))
+
+
+async def enqueue(path: Path, queue_path: Optional[Path], reject_overdue: bool) -> None:
+    from enhanced_cipc_filer import EnhancedCIPCFiler
+
+    filer = EnhancedCIPCFiler()
+    try:
+        await filer.enqueue_import(path, queue_path=queue_path, reject_overdue=reject_overdue)
+    finally:
+        await filer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run filing workers against a shared queue")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--queue", type=Path, default=None, help="queue database (default CIPC_DATA_DIR/filing_queue.db)")
+    parser.add_argument("--enqueue", type=Path, default=None, help="CSV/JSONL client file to queue before starting")
+    parser.add_argument("--reject-overdue", action="store_true")
+    parser.add_argument("--exit-when-idle", action="store_true", help="stop once the queue has nothing to claim")
+    args = parser.parse_args()
+
+    if args.enqueue:
+        asyncio.run(enqueue(args.enqueue, args.queue, args.reject_overdue))
+
+    # spawn gives every worker its own interpreter, event loop and Playwright driver
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    processes = [
+        context.Process(
+            target=worker_process,
+            args=(args.queue, f"{host}:{index}", args.exit_when_idle),
+            name=f"filing-worker-{index}"
+        )
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {len(processes)} filing worker processes")
+
+    # Ctrl-C reaches the whole process group; SIGTERM is forwarded so workers finish their filings
+    signal.signal(signal.SIGTERM, lambda *_: [process.terminate() for process in processes])
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
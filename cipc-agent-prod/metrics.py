@@ -0,0 +1,204 @@
+"""
+Filing Metrics - Low-overhead Prometheus-style instrumentation for the filer
+Step latency histograms, outcome counters, gauges and text exposition
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from pathlib import Path
+from contextlib import contextmanager
+
+from loguru import logger
+
+
+# Filing steps run from sub-second checks to multi-minute portal waits
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for values, count in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with labels"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labels, values, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += counts[-1]
+            bucket_labels = _format_labels(self.labels, values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time value read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            logger.debug(f"Gauge {self.name} unavailable: {e}")
+            return []
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class StepTimer:
+    """Turns a filing's WorkflowState transitions into step latencies and outcomes"""
+    __slots__ = ("metrics", "state", "started")
+
+    def __init__(self, metrics: "FilingMetrics"):
+        self.metrics = metrics
+        self.state: Optional[str] = None
+        self.started = 0.0
+
+    def transition(self, state: str) -> None:
+        if state == self.state:
+            return
+
+        now = time.perf_counter()
+        if self.state is not None:
+            outcome = "failure" if state == "failed" else "success"
+            self.metrics.step_duration.observe(now - self.started, self.state)
+            self.metrics.step_outcomes.inc(self.state, outcome)
+
+        self.state = state
+        self.started = now
+
+
+class FilingMetrics:
+    """Metrics registry for one filer process"""
+
+    def __init__(self):
+        self.step_duration = Histogram(
+            "cipc_step_duration_seconds", "Time spent in each workflow state", labels=("step",)
+        )
+        self.step_outcomes = Counter(
+            "cipc_step_total", "Workflow state exits by outcome", labels=("step", "outcome")
+        )
+        self.operation_duration = Histogram(
+            "cipc_operation_duration_seconds", "Latency of individual portal operations", labels=("operation",)
+        )
+        self.retries = Counter("cipc_step_retries_total", "Step retries after transient errors", labels=("step",))
+        self.filings = Counter("cipc_filings_total", "Completed filing workflows by outcome", labels=("outcome",))
+        self.http_fallbacks = Counter(
+            "cipc_http_fallbacks_total", "HTTP fast-path steps handed back to the browser", labels=("step",)
+        )
+        self.gauges: List[Gauge] = []
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        self.gauges.append(Gauge(name, help_text, read))
+
+    def step_timer(self) -> StepTimer:
+        return StepTimer(self)
+
+    @contextmanager
+    def time(self, operation: str):
+        """Time a block into the operation histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.operation_duration.observe(time.perf_counter() - started, operation)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in (
+            self.step_duration, self.step_outcomes, self.operation_duration,
+            self.retries, self.filings, self.http_fallbacks
+        ):
+            lines.extend(metric.render())
+        for gauge in self.gauges:
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """Atomically write metrics for the node_exporter textfile collector"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(self.render())
+        os.replace(tmp_path, path)
+
+    async def run_textfile_exporter(self, path: Path, interval: float = 15.0) -> None:
+        """Rewrite the textfile on an interval until cancelled"""
+        while True:
+            await asyncio.to_thread(self.write_textfile, path)
+            await asyncio.sleep(interval)
+
+    async def serve(self, host: str = "0.0.0.0", port: int = 9108):
+        """Expose /metrics over HTTP; returns the aiohttp runner for cleanup"""
+        from aiohttp import web
+
+        async def handle_metrics(request):
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+        return runner
@@ -0,0 +1,235 @@
+"""
+Mock CIPC Portal - Local stand-in for cipc.co.za used by benchmarks and load tests
+Serves login, annual returns form, confirmation and CAPTCHA pages with the
+selectors EnhancedCIPCFiler expects, under configurable latency, error and
+throttling profiles, plus a stub of the AISensy campaign API for post-filing
+notifications
+"""
+
+import argparse
+import asyncio
+import base64
+import random
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Set
+
+from aiohttp import web
+from loguru import logger
+
+
+# 1x1 PNG served as the CAPTCHA image
+CAPTCHA_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+SESSION_COOKIE = "cipc_session"
+
+
+@dataclass
+class PortalProfile:
+    """Behaviour knobs for the mock portal"""
+    latency: float = 0.2            # mean response latency in seconds
+    latency_jitter: float = 0.1     # uniform +/- jitter in seconds
+    error_rate: float = 0.0         # fraction of requests answered with HTTP 500
+    throttle_rps: float = 0.0       # requests/second before HTTP 429 (0 disables)
+    captcha: bool = True            # show a CAPTCHA on the login page
+
+
+class MockCIPCPortal:
+    """aiohttp application emulating the CIPC filing flow"""
+
+    def __init__(self, profile: PortalProfile):
+        self.profile = profile
+        self.sessions: Set[str] = set()
+        self.recent_requests: Deque[float] = deque()
+        self.filings = 0
+        self.throttled = 0
+        self.errors = 0
+        self.notifications = 0
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._behaviour_middleware])
+        app.router.add_get("/login", self.login_page)
+        app.router.add_post("/login", self.login_submit)
+        app.router.add_get("/dashboard", self.dashboard)
+        app.router.add_get("/captcha/image.png", self.captcha_image)
+        app.router.add_get("/filing/annual-returns/", self.annual_returns_form)
+        app.router.add_post("/filing/annual-returns/submit", self.annual_returns_submit)
+        app.router.add_get("/search/company-search/", self.company_search)
+        app.router.add_post("/campaign/t1/api/v2", self.aisensy_campaign)
+        app.router.add_get("/mock/stats", self.stats)
+        return app
+
+    @web.middleware
+    async def _behaviour_middleware(self, request: web.Request, handler):
+        if request.path == "/mock/stats":
+            return await handler(request)
+
+        profile = self.profile
+        if profile.throttle_rps > 0:
+            now = time.monotonic()
+            self.recent_requests.append(now)
+            while self.recent_requests and self.recent_requests[0] < now - 1.0:
+                self.recent_requests.popleft()
+            if len(self.recent_requests) > profile.throttle_rps:
+                self.throttled += 1
+                return web.Response(status=429, text="Too Many Requests", headers={"Retry-After": "1"})
+
+        delay = profile.latency + random.uniform(-profile.latency_jitter, profile.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if profile.error_rate and random.random() < profile.error_rate:
+            self.errors += 1
+            return web.Response(status=500, text="Internal Server Error")
+
+        return await handler(request)
+
+    def _authenticated(self, request: web.Request) -> bool:
+        return request.cookies.get(SESSION_COOKIE) in self.sessions
+
+    async def login_page(self, request: web.Request) -> web.Response:
+        captcha = (
+            '<img src="/captcha/image.png" alt="captcha">'
+            '<input name="captcha_code" type="text">'
+        ) if self.profile.captcha else ""
+        return self._html("Login", f"""
+            <form method="post" action="/login">
+              <input name="username" type="text">
+              <input name="password" type="password">
+              {captcha}
+              <button type="submit">Log in</button>
+            </form>
+        """)
+
+    async def login_submit(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if not form.get("username") or not form.get("password"):
+            raise web.HTTPFound("/login")
+        if self.profile.captcha and not form.get("captcha_code"):
+            raise web.HTTPFound("/login")
+
+        token = secrets.token_hex(16)
+        self.sessions.add(token)
+        response = web.HTTPFound("/dashboard")
+        response.set_cookie(SESSION_COOKIE, token, httponly=True)
+        raise response
+
+    async def dashboard(self, request: web.Request) -> web.Response:
+        if not self._authenticated(request):
+            raise web.HTTPFound("/login")
+        return self._html("Dashboard", '<div class="dashboard">Welcome</div>')
+
+    async def captcha_image(self, request: web.Request) -> web.Response:
+        return web.Response(body=CAPTCHA_PNG, content_type="image/png")
+
+    async def annual_returns_form(self, request: web.Request) -> web.Response:
+        return self._html("Annual Returns", f"""
+            <form method="post" action="/filing/annual-returns/submit">
+              <input type="hidden" name="csrf_token" value="{secrets.token_hex(8)}">
+              <select name="filing_type">
+                <option value="">Select</option>
+                <option value="annual_returns">Annual Returns</option>
+              </select>
+              <input name="company_registration" type="text">
+              <input name="company_name" type="text">
+              <input name="financial_year_end" type="text">
+              <button type="submit">Submit filing</button>
+            </form>
+        """)
+
+    async def annual_returns_submit(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get("filing_type") != "annual_returns" or not form.get("company_registration"):
+            return self._html("Annual Returns", '<div class="error">Incomplete filing</div>', status=400)
+
+        self.filings += 1
+        reference = f"AR{int(time.time())}{self.filings:06d}"
+        return self._html("Confirmation", f"""
+            <div class="confirmation">
+              <span class="filing-reference">{reference}</span>
+              <span class="confirmation-number">CN-{self.filings:06d}</span>
+              <span class="company-registration">{form.get("company_registration")}</span>
+            </div>
+        """)
+
+    async def company_search(self, request: web.Request) -> web.Response:
+        number = request.query.get("registration_number", "")
+        if not number:
+            return self._html("Company Search", '<form method="get"><input name="registration_number"></form>')
+        return self._html("Company Search", f"""
+            <table class="company-results">
+              <tr class="company-result">
+                <td class="registration-number">{number}</td>
+                <td class="company-name">Mock Company {number}</td>
+                <td class="company-status">Active</td>
+                <td class="incorporation-date">2021-03-15</td>
+                <td class="financial-year-end">2024-02-28</td>
+              </tr>
+            </table>
+        """)
+
+    async def aisensy_campaign(self, request: web.Request) -> web.Response:
+        try:
+            message = await request.json()
+        except ValueError:
+            return web.json_response({"errorMessage": "Invalid JSON"}, status=400)
+        if not message.get("apiKey") or not message.get("campaignName") or not message.get("destination"):
+            return web.json_response({"errorMessage": "apiKey, campaignName and destination are required"}, status=400)
+
+        self.notifications += 1
+        return web.json_response({"success": "true", "submitted_message_id": f"MSG-{self.notifications:06d}"})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "filings": self.filings,
+            "notifications": self.notifications,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "sessions": len(self.sessions)
+        })
+
+    @staticmethod
+    def _html(title: str, body: str, status: int = 200) -> web.Response:
+        return web.Response(
+            text=f"<!doctype html><html><head><title>{title}</title></head><body>{body}</body></html>",
+            content_type="text/html",
+            status=status
+        )
+
+
+async def start_mock_portal(profile: PortalProfile, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+    """Start the mock portal in the current event loop; call runner.cleanup() to stop"""
+    runner = web.AppRunner(MockCIPCPortal(profile).build_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Mock CIPC portal listening on http://{host}:{port}")
+    return runner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local mock CIPC portal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--latency-jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rps", type=float, default=0.0)
+    parser.add_argument("--no-captcha", action="store_true")
+    args = parser.parse_args()
+
+    profile = PortalProfile(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        throttle_rps=args.throttle_rps,
+        captcha=not args.no_captcha
+    )
+    web.run_app(MockCIPCPortal(profile).build_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Portal HTTP Client - Keep-alive HTTP transport for plain CIPC form steps
+Runs company search, filing initiation and confirmation read-back over a pooled
+aiohttp session that shares the browser's cookies (one cookie jar per login
+generation over a common connection pool). Pages that need a CAPTCHA or
+JavaScript raise BrowserRequiredError so the caller can fall back to Playwright
+"""
+
+from __future__ import annotations
+
+from http.cookies import SimpleCookie
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlsplit
+
+from rate_limiter import RateLimiterRegistry, PortalThrottledError, THROTTLE_STATUSES
+
+# aiohttp and yarl are imported on first use so importing the filer doesn't load the HTTP stack
+if TYPE_CHECKING:
+    import aiohttp
+
+
+# Hidden form fields and meta tags commonly used for CSRF tokens
+CSRF_FIELD_NAMES = ("csrf_token", "csrfmiddlewaretoken", "_csrf", "__RequestVerificationToken", "authenticity_token")
+CSRF_META_NAMES = ("csrf-token", "csrf_token", "_csrf")
+
+# Elements without a closing tag
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+}
+
+
+class BrowserRequiredError(Exception):
+    """The page needs a CAPTCHA, JavaScript or a fresh login and must be handled in Playwright"""
+
+
+class PortalSessionExpiredError(BrowserRequiredError):
+    """The portal redirected to its login page"""
+
+
+@dataclass
+class PortalForm:
+    """A form's action and the field values a browser would submit"""
+    action: str
+    method: str = "get"
+    fields: Dict[str, str] = field(default_factory=dict)
+    options: Dict[str, List[str]] = field(default_factory=dict)
+
+    def fill(self, **values: str) -> None:
+        """Set field values, refusing fields or options the form does not offer"""
+        for name, value in values.items():
+            if name not in self.fields:
+                raise BrowserRequiredError(f"Form field '{name}' not found - page may be rendered by JavaScript")
+            if name in self.options and value not in self.options[name]:
+                raise BrowserRequiredError(f"Option '{value}' not offered for '{name}'")
+            self.fields[name] = value
+
+    @property
+    def csrf_token(self) -> Optional[str]:
+        for name in CSRF_FIELD_NAMES:
+            if self.fields.get(name):
+                return self.fields[name]
+        return None
+
+
+class _PageParser(HTMLParser):
+    """Collects forms, text by CSS class and CAPTCHA markers in one pass"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms: List[PortalForm] = []
+        self.texts: Dict[str, List[str]] = {}
+        self.meta: Dict[str, str] = {}
+        self.has_captcha = False
+        self._open: List[tuple] = []  # (tag, classes, text chunks)
+        self._form: Optional[PortalForm] = None
+        self._select: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        markers = " ".join(attrs.get(name, "") for name in ("src", "name", "id", "class")).lower()
+        if "captcha" in markers:
+            self.has_captcha = True
+
+        name = attrs.get("name", "")
+        if tag == "form":
+            self._form = PortalForm(action=attrs.get("action", ""), method=attrs.get("method", "get").lower())
+            self.forms.append(self._form)
+        elif tag == "meta" and name:
+            self.meta[name.lower()] = attrs.get("content", "")
+        elif self._form is not None and name:
+            if tag == "input":
+                input_type = attrs.get("type", "text").lower()
+                if input_type not in ("checkbox", "radio", "submit", "button", "image") or "checked" in attrs:
+                    self._form.fields[name] = attrs.get("value", "")
+            elif tag == "textarea":
+                self._form.fields[name] = ""
+            elif tag == "select":
+                self._select = name
+                self._form.fields[name] = ""
+                self._form.options[name] = []
+        if tag == "option" and self._form is not None and self._select:
+            options = self._form.options[self._select]
+            value = attrs.get("value", "")
+            # Browsers submit the selected option, or the first one when none is marked
+            if not options or "selected" in attrs:
+                self._form.fields[self._select] = value
+            options.append(value)
+
+        if tag not in VOID_TAGS:
+            classes = attrs.get("class", "").split()
+            self._open.append((tag, classes, [] if classes else None))
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag == "select":
+            self._select = None
+
+        if not any(open_tag == tag for open_tag, _, _ in self._open):
+            return
+        while self._open:
+            open_tag, classes, chunks = self._open.pop()
+            if chunks is not None:
+                text = " ".join("".join(chunks).split())
+                for class_name in classes:
+                    self.texts.setdefault(class_name, []).append(text)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        for _, _, chunks in self._open:
+            if chunks is not None:
+                chunks.append(data)
+
+
+class PortalPage:
+    """A fetched portal page, parsed for forms and class-tagged text"""
+
+    def __init__(self, url: str, status: int, html: str):
+        self.url = url
+        self.status = status
+        self.html = html
+
+        parser = _PageParser()
+        parser.feed(html)
+        parser.close()
+        self.forms = parser.forms
+        self.meta = parser.meta
+        self.has_captcha = parser.has_captcha
+        self._texts = parser.texts
+
+    @property
+    def requires_login(self) -> bool:
+        """The portal redirected to its login page (session missing or expired)"""
+        return urlsplit(self.url).path.rstrip('/').endswith('/login')
+
+    @property
+    def csrf_token(self) -> Optional[str]:
+        for name in CSRF_META_NAMES:
+            if self.meta.get(name):
+                return self.meta[name]
+        for form in self.forms:
+            if form.csrf_token:
+                return form.csrf_token
+        return None
+
+    def text(self, class_name: str) -> Optional[str]:
+        """Text of the first element with the class, like page.inner_text('.class')"""
+        texts = self._texts.get(class_name)
+        return texts[0] if texts else None
+
+    def form_with(self, field_name: str) -> PortalForm:
+        """The form containing a field; its absence means the form is built by JavaScript"""
+        for form in self.forms:
+            if field_name in form.fields:
+                return form
+        raise BrowserRequiredError(f"No form with '{field_name}' on {self.url} - page may be rendered by JavaScript")
+
+    def ensure_plain(self) -> None:
+        """Raise if the page can't be completed without a browser"""
+        if self.requires_login:
+            raise PortalSessionExpiredError(f"Portal session expired ({self.url})")
+        if self.has_captcha:
+            raise BrowserRequiredError(f"CAPTCHA on {self.url}")
+
+
+class PortalHttpClient:
+    """Pooled keep-alive HTTP session for the portal, throttled like browser navigation"""
+
+    def __init__(
+        self,
+        rate_limiters: RateLimiterRegistry,
+        user_agent: str,
+        timeout: float = 60.0,
+        pool_size: int = 20,
+        keepalive_timeout: float = 30.0
+    ):
+        self.rate_limiters = rate_limiters
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.session_generation: Optional[int] = None  # AuthSessionCache generation whose cookies are loaded
+        self.requests = 0
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Requests in flight per session; sessions of older generations close once theirs finish
+        self._in_flight: Dict[aiohttp.ClientSession, int] = {}
+
+    def _client(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = self._new_session()
+        return self._session
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        import aiohttp
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+        return aiohttp.ClientSession(
+            connector=self._connector,
+            connector_owner=False,
+            # unsafe allows cookies for IP hosts (local mock portal, staging)
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": self.user_agent}
+        )
+
+    async def use_session(self, storage_state: Dict[str, Any], generation: int) -> None:
+        """
+        Load cookies from a Playwright storage_state, once per session generation
+        A new generation gets its own jar; requests still running on the previous
+        one finish with its cookies before it is closed
+        """
+        if generation == self.session_generation:
+            return
+
+        from yarl import URL
+
+        previous = self._session
+        self._session = self._new_session()
+        jar = self._session.cookie_jar
+        for cookie in storage_state.get("cookies", []):
+            domain = cookie.get("domain", "").lstrip(".")
+            if not domain:
+                continue
+            morsel = SimpleCookie()
+            morsel[cookie["name"]] = cookie["value"]
+            morsel[cookie["name"]]["domain"] = domain
+            morsel[cookie["name"]]["path"] = cookie.get("path", "/")
+            scheme = "https" if cookie.get("secure") else "http"
+            jar.update_cookies(morsel, response_url=URL(f"{scheme}://{domain}/"))
+
+        self.session_generation = generation
+        if previous and not self._in_flight.get(previous):
+            await previous.close()
+
+    def storage_cookies(self) -> List[Dict[str, Any]]:
+        """Cookies of the current generation's jar in Playwright's add_cookies/storage_state format"""
+        if self._session is None:
+            return []
+        return [
+            {
+                "name": morsel.key,
+                "value": morsel.value,
+                "domain": morsel["domain"],
+                "path": morsel["path"] or "/",
+                "expires": -1,
+                "httpOnly": bool(morsel["httponly"]),
+                "secure": bool(morsel["secure"]),
+                "sameSite": "Lax"
+            }
+            for morsel in self._session.cookie_jar
+        ]
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        data: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> PortalPage:
+        """Send a request through the host's rate limiter and parse the resulting page"""
+        session = self._client()
+        self._in_flight[session] = self._in_flight.get(session, 0) + 1
+        try:
+            async with self.rate_limiters.for_url(url).throttle() as call:
+                async with session.request(method, url, data=data, headers=headers) as response:
+                    call.status = response.status
+                    retry_after = response.headers.get('Retry-After', '')
+                    call.retry_after = float(retry_after) if retry_after.isdigit() else None
+                    html = await response.text()
+                    final_url = str(response.url)
+        finally:
+            self._in_flight[session] -= 1
+            if not self._in_flight[session]:
+                del self._in_flight[session]
+                if session is not self._session:
+                    await session.close()
+
+        self.requests += 1
+        if call.status in THROTTLE_STATUSES:
+            raise PortalThrottledError(url, call.status)
+        if call.status >= 400:
+            raise Exception(f"Portal returned HTTP {call.status} for {url}")
+
+        return PortalPage(final_url, call.status, html)
+
+    async def get(self, url: str) -> PortalPage:
+        return await self.request("GET", url)
+
+    async def submit(self, page: PortalPage, form: PortalForm) -> PortalPage:
+        """Submit a form the way the browser would, echoing any CSRF token as a header"""
+        action = urljoin(page.url, form.action or page.url)
+        headers = {"Referer": page.url}
+        if page.csrf_token:
+            headers["X-CSRF-Token"] = page.csrf_token
+
+        if form.method == "post":
+            return await self.request("POST", action, data=form.fields, headers=headers)
+
+        from yarl import URL
+        return await self.request("GET", str(URL(action).update_query(form.fields)), headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "pool_size": self.pool_size,
+            "open": bool(self._session and not self._session.closed),
+            "session_generation": self.session_generation
+        }
+
+    async def close(self) -> None:
+        for session in {self._session, *self._in_flight}:
+            if session and not session.closed:
+                await session.close()
+        self._in_flight.clear()
+        self._session = None
+        if self._connector and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
+        self.session_generation = None
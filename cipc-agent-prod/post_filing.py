@@ -0,0 +1,480 @@
+"""
+Post-Filing Outbox - Durable, batched side effects after a successful filing
+The filer records one outbox event per action and returns; background workers
+drain events in batches (bulk DB writes, reports, follow-ups and pooled
+AISensy WhatsApp notifications) with retries and deduplication
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+from pathlib import Path
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass
+
+from loguru import logger
+
+from filing_import import FILING_DEADLINE_DAYS
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+NOTIFY_WHATSAPP = "notify_whatsapp"
+UPDATE_RECORDS = "update_records"
+CLIENT_REPORT = "client_report"
+SCHEDULE_FOLLOW_UP = "schedule_follow_up"
+
+# Remind clients this many days before next year's filing deadline
+FOLLOW_UP_LEAD_DAYS = 30
+
+
+@dataclass
+class OutboxEvent:
+    """One pending side effect of a completed filing"""
+    id: int
+    action: str
+    filing_key: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+# Handlers return {event id: error message} for the events that failed
+BatchHandler = Callable[[List[OutboxEvent]], Awaitable[Dict[int, str]]]
+
+
+class PostFilingOutbox:
+    """SQLite outbox plus the filing records and follow-ups its handlers write
+
+    Claimed events are leased to one owner; several processes can drain the same
+    outbox and only events whose lease has expired are taken over
+    """
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, db_path: Path, owner: Optional[str] = None, lease_seconds: float = 300.0):
+        self.db_path = Path(db_path)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def record(self, filing_key: str, reference: str, actions: List[str], payload: Dict[str, Any]) -> int:
+        """Durably queue the actions for a filing; repeats for the same reference are ignored"""
+        return await asyncio.to_thread(self._record, filing_key, reference, actions, payload)
+
+    async def claim(self, action: str, limit: int) -> List[OutboxEvent]:
+        """Lease up to limit due events for an action, including processing ones whose lease has expired"""
+        return await asyncio.to_thread(self._claim, action, limit)
+
+    async def finish(self, events: List[OutboxEvent], errors: Dict[int, str], max_attempts: int, retry_delay: float) -> None:
+        """Mark a handled batch done, scheduled for retry, or failed; events whose lease was lost are left alone"""
+        await asyncio.to_thread(self._finish, events, errors, max_attempts, retry_delay)
+
+    async def next_due(self, action: Optional[str] = None) -> Optional[float]:
+        """Epoch time the next event (for one action, or any) falls due or its lease expires, if any"""
+        return await asyncio.to_thread(self._next_due, action)
+
+    async def counts(self) -> Dict[str, int]:
+        return await asyncio.to_thread(self._counts)
+
+    async def upsert_filing_records(self, rows: List[tuple]) -> None:
+        await asyncio.to_thread(self._executemany, """
+            INSERT INTO filing_records
+                (filing_key, company_number, company_name, financial_year_end, reference, confirmation, submitted_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (filing_key) DO UPDATE SET
+                reference = excluded.reference, confirmation = excluded.confirmation,
+                submitted_at = excluded.submitted_at, updated_at = excluded.updated_at
+        """, rows)
+
+    async def insert_follow_ups(self, rows: List[tuple]) -> None:
+        await asyncio.to_thread(self._executemany, """
+            INSERT OR IGNORE INTO follow_ups (filing_key, kind, due_date, contact_phone, contact_email, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS post_filing_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_key TEXT NOT NULL UNIQUE,
+                    action TEXT NOT NULL,
+                    filing_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_outbox_due ON post_filing_outbox (status, action, next_attempt_at);
+                CREATE TABLE IF NOT EXISTS filing_records (
+                    filing_key TEXT PRIMARY KEY,
+                    company_number TEXT NOT NULL,
+                    company_name TEXT NOT NULL,
+                    financial_year_end TEXT NOT NULL,
+                    reference TEXT NOT NULL,
+                    confirmation TEXT,
+                    submitted_at TEXT,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS follow_ups (
+                    filing_key TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    due_date TEXT NOT NULL,
+                    contact_phone TEXT,
+                    contact_email TEXT,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (filing_key, kind)
+                );
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(post_filing_outbox)")}
+            for column, definition in (("lease_owner", "TEXT"), ("lease_expires_at", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE post_filing_outbox ADD COLUMN {column} {definition}")
+            self._conn.commit()
+        return self._conn
+
+    def _record(self, filing_key: str, reference: str, actions: List[str], payload: Dict[str, Any]) -> int:
+        now = datetime.now().isoformat()
+        rows = [
+            (f"{action}:{reference}", action, filing_key, json.dumps(payload, default=str), self.PENDING, time.time(), now, now)
+            for action in actions
+        ]
+        with self._db_lock:
+            conn = self._connect()
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO post_filing_outbox "
+                "(event_key, action, filing_key, payload, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        return cursor.rowcount
+
+    def _claim(self, action: str, limit: int) -> List[OutboxEvent]:
+        now = time.time()
+        with self._db_lock:
+            conn = self._connect()
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent claimers never pick the same events
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Processing events of a crashed owner (or from before leases) become due once the lease expires
+                rows = conn.execute(
+                    "SELECT id, action, filing_key, payload, attempts FROM post_filing_outbox "
+                    "WHERE action = ? AND ((status = ? AND next_attempt_at <= ?) "
+                    "OR (status = ? AND COALESCE(lease_expires_at, 0) < ?)) "
+                    "ORDER BY next_attempt_at, id LIMIT ?",
+                    (action, self.PENDING, now, self.PROCESSING, now, limit)
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE post_filing_outbox SET status = ?, lease_owner = ?, lease_expires_at = ? WHERE id = ?",
+                    [(self.PROCESSING, self.owner, now + self.lease_seconds, row[0]) for row in rows]
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return [OutboxEvent(row[0], row[1], row[2], json.loads(row[3]), row[4]) for row in rows]
+
+    def _finish(self, events: List[OutboxEvent], errors: Dict[int, str], max_attempts: int, retry_delay: float) -> None:
+        now = datetime.now().isoformat()
+        updates = []
+        for event in events:
+            error = errors.get(event.id)
+            attempts = event.attempts + 1
+            if error is None:
+                updates.append((self.DONE, attempts, time.time(), None, now, event.id, self.owner))
+            elif attempts >= max_attempts:
+                updates.append((self.FAILED, attempts, time.time(), error, now, event.id, self.owner))
+            else:
+                delay = retry_delay * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+                updates.append((self.PENDING, attempts, time.time() + delay, error, now, event.id, self.owner))
+
+        with self._db_lock:
+            conn = self._connect()
+            conn.executemany(
+                "UPDATE post_filing_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                "updated_at = ?, lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+                updates
+            )
+            conn.commit()
+
+    def _next_due(self, action: Optional[str]) -> Optional[float]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE COALESCE(lease_expires_at, 0) END) "
+                "FROM post_filing_outbox WHERE status IN (?, ?) AND action = COALESCE(?, action)",
+                (self.PENDING, self.PENDING, self.PROCESSING, action)
+            ).fetchone()
+        return row[0]
+
+    def _counts(self) -> Dict[str, int]:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT action, status, COUNT(*) FROM post_filing_outbox GROUP BY action, status"
+            ).fetchall()
+        return {f"{action}:{status}": count for action, status, count in rows}
+
+    def _executemany(self, sql: str, rows: List[tuple]) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.executemany(sql, rows)
+            conn.commit()
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+
+class AISensyNotifier:
+    """WhatsApp filing confirmations through the AISensy campaign API on a pooled session"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://backend.aisensy.com",
+        campaign: str = "filing_confirmation",
+        timeout: float = 30.0,
+        max_concurrency: int = 10
+    ):
+        self.api_key = api_key
+        self.endpoint = f"{base_url.rstrip('/')}/campaign/t1/api/v2"
+        self.campaign = campaign
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.sent = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _client(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def send_batch(self, events: List[OutboxEvent]) -> Dict[int, str]:
+        """Send one message per event concurrently over the shared connection pool"""
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(event: OutboxEvent) -> Optional[str]:
+            payload = event.payload
+            destination = re.sub(r'[^\d]', '', payload.get("contact_phone") or "")
+            if not destination:
+                return None  # nothing to send; not worth retrying
+
+            async with slots:
+                try:
+                    async with self._client().post(self.endpoint, json={
+                        "apiKey": self.api_key,
+                        "campaignName": self.campaign,
+                        "destination": destination,
+                        "userName": payload.get("company_name", ""),
+                        "templateParams": [
+                            payload.get("company_name", ""),
+                            payload.get("reference", ""),
+                            payload.get("financial_year_end", "")
+                        ]
+                    }) as response:
+                        if response.status >= 400:
+                            return f"AISensy returned HTTP {response.status}"
+                except Exception as e:
+                    return f"AISensy request failed: {e}"
+
+            self.sent += 1
+            return None
+
+        results = await asyncio.gather(*(send(event) for event in events))
+        return {event.id: error for event, error in zip(events, results) if error}
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class PostFilingActions:
+    """Batch handlers for each outbox action"""
+
+    def __init__(self, outbox: PostFilingOutbox, reports_dir: Path, notifier: Optional[AISensyNotifier] = None):
+        self.outbox = outbox
+        self.reports_dir = Path(reports_dir)
+        self.notifier = notifier
+
+    @property
+    def actions(self) -> List[str]:
+        actions = [UPDATE_RECORDS, CLIENT_REPORT, SCHEDULE_FOLLOW_UP]
+        if self.notifier:
+            actions.insert(0, NOTIFY_WHATSAPP)
+        return actions
+
+    def handlers(self) -> Dict[str, BatchHandler]:
+        handlers: Dict[str, BatchHandler] = {
+            UPDATE_RECORDS: self.update_records,
+            CLIENT_REPORT: self.build_reports,
+            SCHEDULE_FOLLOW_UP: self.schedule_follow_ups
+        }
+        if self.notifier:
+            handlers[NOTIFY_WHATSAPP] = self.notifier.send_batch
+        return handlers
+
+    async def update_records(self, events: List[OutboxEvent]) -> Dict[int, str]:
+        now = datetime.now().isoformat()
+        await self.outbox.upsert_filing_records([
+            (event.filing_key, event.payload["company_number"], event.payload["company_name"],
+             event.payload["financial_year_end"], event.payload["reference"], event.payload.get("confirmation"),
+             event.payload.get("submission_date"), now)
+            for event in events
+        ])
+        return {}
+
+    async def schedule_follow_ups(self, events: List[OutboxEvent]) -> Dict[int, str]:
+        rows, errors = [], {}
+        now = datetime.now().isoformat()
+        for event in events:
+            try:
+                year_end = date.fromisoformat(event.payload["financial_year_end"])
+            except (KeyError, ValueError) as e:
+                errors[event.id] = f"Invalid financial year end: {e}"
+                continue
+            next_year_end = date(year_end.year + 1, year_end.month, min(year_end.day, 28 if year_end.month == 2 else 31))
+            due = next_year_end + timedelta(days=FILING_DEADLINE_DAYS - FOLLOW_UP_LEAD_DAYS)
+            rows.append((event.filing_key, "next_annual_return", due.isoformat(),
+                         event.payload.get("contact_phone"), event.payload.get("contact_email"), now))
+        if rows:
+            await self.outbox.insert_follow_ups(rows)
+        return errors
+
+    async def build_reports(self, events: List[OutboxEvent]) -> Dict[int, str]:
+        await asyncio.to_thread(self._write_reports, events)
+        return {}
+
+    def _write_reports(self, events: List[OutboxEvent]) -> None:
+        self.reports_dir.mkdir(parents=True, exist_ok=True)
+        for event in events:
+            safe_key = re.sub(r'[^A-Za-z0-9_.-]+', '_', event.filing_key)
+            report_path = self.reports_dir / f"{safe_key}.json"
+            tmp_path = report_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps({
+                "filing_key": event.filing_key,
+                "generated_at": datetime.now().isoformat(),
+                **event.payload
+            }, indent=2, default=str))
+            tmp_path.replace(report_path)
+
+
+class OutboxDispatcher:
+    """One background drain worker per action, woken on new events"""
+
+    def __init__(
+        self,
+        outbox: PostFilingOutbox,
+        handlers: Dict[str, BatchHandler],
+        batch_size: int = 100,
+        batch_window: float = 0.5,
+        poll_interval: float = 30.0,
+        max_attempts: int = 5,
+        retry_delay: float = 10.0
+    ):
+        self.outbox = outbox
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.processed = 0
+        self._busy = 0  # workers handling a claimed batch
+        self._wake: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the drain workers if they aren't running"""
+        if self._workers:
+            return
+        for action in self.handlers:
+            self._wake[action] = asyncio.Event()
+            self._wake[action].set()  # drain anything left from a previous run
+            self._workers.append(asyncio.create_task(self._run(action)))
+
+    def notify(self) -> None:
+        for wake in self._wake.values():
+            wake.set()
+
+    async def drain(self, timeout: float) -> None:
+        """Wait for due events and claimed batches to be handled, up to timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            next_due = await self.outbox.next_due()
+            if not self._busy and (next_due is None or next_due > time.time()):
+                return
+            self.notify()
+            await asyncio.sleep(min(self.batch_window, max(0.0, deadline - time.monotonic())))
+
+    async def close(self, drain_timeout: float = 10.0) -> None:
+        """Flush due events, then stop; anything left stays in the outbox for the next run"""
+        if self._workers:
+            await self.drain(drain_timeout)
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    async def _run(self, action: str) -> None:
+        handler = self.handlers[action]
+        wake = self._wake[action]
+        timeout = self.poll_interval
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+            await asyncio.sleep(self.batch_window)  # let events from concurrent filings collect
+
+            self._busy += 1
+            try:
+                while True:
+                    events = await self.outbox.claim(action, self.batch_size)
+                    if not events:
+                        break
+                    try:
+                        errors = await handler(events)
+                    except Exception as e:
+                        errors = {event.id: str(e) for event in events}
+
+                    await self.outbox.finish(events, errors, self.max_attempts, self.retry_delay)
+                    self.processed += len(events) - len(errors)
+                    if errors:
+                        logger.warning(f"Post-filing {action}: {len(errors)} of {len(events)} events failed; will retry")
+            finally:
+                self._busy -= 1
+
+            # Sleep until the next retry falls due, or the poll interval
+            next_due = await self.outbox.next_due(action)
+            timeout = self.poll_interval if next_due is None else min(self.poll_interval, max(0.0, next_due - time.time()))
@@ -0,0 +1,281 @@
+"""
+Progress Log - Compact per-filing progress records with streaming sinks
+Bounded ring buffer of slotted records; sinks (JSONL, SQLite, websocket,
+callback) receive events in batches on background tasks
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from datetime import datetime
+
+from loguru import logger
+
+
+# Records keep a monotonic clock; wall time is derived only when asked for
+_WALL_ANCHOR = time.time()
+_MONOTONIC_ANCHOR = time.monotonic()
+
+
+def wall_time(monotonic: float) -> datetime:
+    return datetime.fromtimestamp(_WALL_ANCHOR + (monotonic - _MONOTONIC_ANCHOR))
+
+
+class WorkflowProgress:
+    """Tracks filing workflow progress"""
+    __slots__ = ("state", "step_description", "monotonic", "metadata")
+
+    def __init__(self, state, step_description: str, monotonic: float, metadata: Optional[Dict[str, Any]] = None):
+        self.state = state  # WorkflowState member, shared rather than copied per record
+        self.step_description = step_description
+        self.monotonic = monotonic
+        self.metadata = metadata
+
+    @property
+    def timestamp(self) -> datetime:
+        return wall_time(self.monotonic)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "step_description": self.step_description,
+            "timestamp": self.timestamp.isoformat(),
+            "metadata": self.metadata or {}
+        }
+
+    def __repr__(self) -> str:
+        return f"WorkflowProgress({self.state.value!r}, {self.step_description!r})"
+
+
+ProgressEvent = Tuple[str, WorkflowProgress]  # (filing_key, record)
+
+
+class ProgressSink(ABC):
+    """Receives progress events off the hot path; subclasses implement write()"""
+
+    def __init__(self, queue_size: int = 10000, batch_size: int = 200):
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def offer(self, filing_key: str, record: WorkflowProgress) -> None:
+        """Queue an event without waiting; drops it if the sink is far behind"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait((filing_key, record))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def open(self) -> None:
+        """Called once before the first write"""
+
+    @abstractmethod
+    async def write(self, events: List[ProgressEvent]) -> None:
+        """Persist or deliver one batch of events"""
+
+    async def _close(self) -> None:
+        """Release resources after the queue is drained"""
+
+    async def close(self) -> None:
+        """Flush queued events and stop"""
+        if self._task:
+            await self._queue.join()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._close()
+
+    async def _run(self) -> None:
+        try:
+            await self.open()
+        except Exception as e:
+            logger.error(f"{type(self).__name__} could not start: {e}")
+
+        while True:
+            events = [await self._queue.get()]
+            while len(events) < self.batch_size and not self._queue.empty():
+                events.append(self._queue.get_nowait())
+            try:
+                await self.write(events)
+            except Exception as e:
+                logger.error(f"{type(self).__name__} failed to write {len(events)} progress events: {e}")
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+
+class JsonlProgressSink(ProgressSink):
+    """Appends events to a JSON Lines file"""
+
+    def __init__(self, path: Path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+
+    async def write(self, events: List[ProgressEvent]) -> None:
+        lines = "".join(
+            json.dumps({"filing_key": filing_key, **record.to_dict()}, default=str) + "\n"
+            for filing_key, record in events
+        )
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('a', encoding='utf-8') as output:
+            output.write(lines)
+
+
+class SqliteProgressSink(ProgressSink):
+    """Stores events in a filing_progress table, one transaction per batch"""
+
+    def __init__(self, db_path: Path, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def write(self, events: List[ProgressEvent]) -> None:
+        rows = [
+            (filing_key, record.state.value, record.step_description, record.timestamp.isoformat(),
+             json.dumps(record.metadata, default=str) if record.metadata else None)
+            for filing_key, record in events
+        ]
+        await asyncio.to_thread(self._insert, rows)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS filing_progress (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filing_key TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    step_description TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    metadata TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_filing_progress_key ON filing_progress (filing_key, id)")
+        return self._conn
+
+    def _insert(self, rows: List[tuple]) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO filing_progress (filing_key, state, step_description, timestamp, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+    async def _close(self) -> None:
+        with self._db_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+
+class WebSocketProgressSink(ProgressSink):
+    """Broadcasts event batches to dashboard clients connected to ws://host:port/progress"""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 9109, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self._clients = set()
+        self._runner = None
+
+    async def open(self) -> None:
+        from aiohttp import web
+
+        async def handle_progress(request):
+            socket = web.WebSocketResponse(heartbeat=30)
+            await socket.prepare(request)
+            self._clients.add(socket)
+            try:
+                async for _ in socket:
+                    pass  # dashboard clients only listen
+            finally:
+                self._clients.discard(socket)
+            return socket
+
+        app = web.Application()
+        app.router.add_get("/progress", handle_progress)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Progress stream available at ws://{self.host}:{self.port}/progress")
+
+    async def write(self, events: List[ProgressEvent]) -> None:
+        if not self._clients:
+            return
+        message = json.dumps(
+            [{"filing_key": filing_key, **record.to_dict()} for filing_key, record in events], default=str
+        )
+        for socket in list(self._clients):
+            try:
+                await socket.send_str(message)
+            except Exception:
+                self._clients.discard(socket)
+
+    async def _close(self) -> None:
+        for socket in list(self._clients):
+            await socket.close()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class CallbackProgressSink(ProgressSink):
+    """Streams events to a caller-supplied coroutine, e.g. to push them onto a UI queue"""
+
+    def __init__(self, callback: Callable[[str, WorkflowProgress], Awaitable[None]], **kwargs):
+        super().__init__(**kwargs)
+        self.callback = callback
+
+    async def write(self, events: List[ProgressEvent]) -> None:
+        for filing_key, record in events:
+            await self.callback(filing_key, record)
+
+
+class ProgressLog:
+    """Bounded per-filing progress history that fans records out to sinks"""
+
+    def __init__(self, filing_key: str, maxlen: int = 256, sinks: Iterable[ProgressSink] = ()):
+        self.filing_key = filing_key
+        self.sinks = tuple(sinks)
+        self.dropped = 0  # oldest records evicted from the ring buffer
+        self._records: Deque[WorkflowProgress] = deque(maxlen=maxlen)
+
+    def append(self, record: WorkflowProgress) -> None:
+        if len(self._records) == self._records.maxlen:
+            self.dropped += 1
+        self._records.append(record)
+        for sink in self.sinks:
+            sink.offer(self.filing_key, record)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[WorkflowProgress]:
+        return iter(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._records)[index]
+        return self._records[index]
+
+    def __bool__(self) -> bool:
+        return bool(self._records)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [record.to_dict() for record in self._records]
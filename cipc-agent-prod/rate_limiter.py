@@ -0,0 +1,166 @@
+"""
+Rate Limiter - Adaptive per-host token buckets for CIPC portal traffic
+Backs off on throttling responses and slow navigations, ramps up on recovery
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+
+# HTTP statuses the portal uses to signal overload
+THROTTLE_STATUSES = {429, 503}
+
+
+class PortalThrottledError(Exception):
+    """The CIPC portal rejected a request because we are sending too many"""
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"CIPC portal throttled request to {url} (HTTP {status})")
+        self.url = url
+        self.status = status
+
+
+class ThrottledCall:
+    """Outcome of a rate-limited call, filled in by the caller"""
+    __slots__ = ("status", "retry_after")
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.retry_after: Optional[float] = None
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to portal health (AIMD)"""
+
+    def __init__(
+        self,
+        host: str,
+        rate: float = 2.0,
+        burst: int = 4,
+        min_rate: float = 0.2,
+        max_rate: float = 10.0,
+        slow_threshold: float = 8.0,
+        backoff_factor: float = 0.5,
+        recovery_step: float = 0.1,
+        cooldown: float = 30.0
+    ):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.slow_threshold = slow_threshold
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step
+        self.cooldown = cooldown
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._lock = asyncio.Lock()
+
+        self.latency_ewma: Optional[float] = None
+        self.requests = 0
+        self.throttled = 0
+        self.slow = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    async def acquire(self) -> None:
+        """Wait for a token; waiters are served in arrival order"""
+        self._waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+        finally:
+            self._waiting -= 1
+
+    @asynccontextmanager
+    async def throttle(self):
+        """Rate-limit one portal call and feed its outcome back into the limiter"""
+        await self.acquire()
+        call = ThrottledCall()
+        started = time.monotonic()
+
+        try:
+            yield call
+        finally:
+            self.record(call.status, time.monotonic() - started, call.retry_after)
+
+    def record(self, status: Optional[int], latency: float, retry_after: Optional[float] = None) -> None:
+        """Adapt the rate to a completed call"""
+        self.requests += 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+        if status in THROTTLE_STATUSES:
+            self.throttled += 1
+            self._set_rate(self.rate * self.backoff_factor)
+            self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or self.cooldown))
+            self._tokens = 0.0
+            logger.warning(f"CIPC portal throttled ({status}) - rate for {self.host} reduced to {self.rate:.2f}/s")
+
+        elif latency > self.slow_threshold:
+            self.slow += 1
+            self._set_rate(self.rate * (1 + self.backoff_factor) / 2)
+            logger.info(f"Slow portal response ({latency:.1f}s) - rate for {self.host} reduced to {self.rate:.2f}/s")
+
+        elif self.latency_ewma < self.slow_threshold / 2:
+            self._set_rate(self.rate + self.recovery_step)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limiter state for tuning and dashboards"""
+        return {
+            "host": self.host,
+            "rate": round(self.rate, 3),
+            "tokens": round(self._tokens, 3),
+            "queue_depth": self.queue_depth,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "slow": self.slow
+        }
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _set_rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+
+
+class RateLimiterRegistry:
+    """One shared adaptive limiter per portal host"""
+
+    def __init__(self, **limiter_settings):
+        self.limiter_settings = limiter_settings
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+    def for_url(self, url: str) -> AdaptiveRateLimiter:
+        host = urlparse(url).netloc or url
+        if host not in self._limiters:
+            self._limiters[host] = AdaptiveRateLimiter(host, **self.limiter_settings)
+        return self._limiters[host]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {host: limiter.stats() for host, limiter in self._limiters.items()}
@@ -0,0 +1,57 @@
+"""
+Reconcile Filing - Settle a submission that has no recorded outcome
+Check the CIPC portal first: pass the filing reference if the annual return was
+filed, or omit it to let the next run submit again
+
+Usage:
+    python reconcile_filing.py 2021/123456/07 2024-02-28 --reference AR123456 --confirmation CN-1
+    python reconcile_filing.py 2021/123456/07 2024-02-28
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+
+async def reconcile(
+    company_number: str,
+    financial_year_end: str,
+    reference: Optional[str],
+    confirmation: Optional[str],
+    submission_date: Optional[str],
+    queue_path: Optional[Path]
+) -> str:
+    from enhanced_cipc_filer import EnhancedCIPCFiler
+
+    filer = EnhancedCIPCFiler()
+    try:
+        return await filer.reconcile_filing(
+            company_number, financial_year_end,
+            reference=reference, confirmation=confirmation, submission_date=submission_date,
+            queue_path=queue_path
+        )
+    finally:
+        await filer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Settle a filing whose CIPC submission has no recorded outcome")
+    parser.add_argument("company_number")
+    parser.add_argument("financial_year_end")
+    parser.add_argument("--reference", default=None, help="CIPC filing reference, if the portal shows it was filed")
+    parser.add_argument("--confirmation", default=None)
+    parser.add_argument("--submission-date", default=None)
+    parser.add_argument("--queue", type=Path, default=None, help="shared queue database the workers use")
+    args = parser.parse_args()
+
+    state = asyncio.run(reconcile(
+        args.company_number, args.financial_year_end, args.reference, args.confirmation, args.submission_date, args.queue
+    ))
+    logger.info(f"{args.company_number} {args.financial_year_end} is now {state}")
+
+
+if __name__ == "__main__":
+    main()
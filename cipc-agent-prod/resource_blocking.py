@@ -0,0 +1,105 @@
+"""
+Resource Blocking - Request interception profile for CIPC browser contexts
+Aborts non-essential downloads and trackers while keeping CAPTCHAs and form assets
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable
+from urllib.parse import urlparse
+from collections import Counter
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Route
+
+
+# Resource types the filing workflow never needs
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+
+# Analytics and third-party tags served alongside the CIPC site
+DEFAULT_TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "newrelic.com",
+    "nr-data.net",
+    "youtube.com",
+    "twitter.com",
+    "linkedin.com",
+)
+
+# URLs that must always load, e.g. CAPTCHA images matched by img[src*="captcha"]
+DEFAULT_ALLOW_PATTERNS = ("captcha",)
+
+# Typical transfer sizes used to estimate bandwidth saved (aborted requests have no body)
+ESTIMATED_BYTES_BY_TYPE = {
+    "image": 30_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 20_000,
+    "script": 50_000,
+}
+
+
+class ResourceBlocker:
+    """Context-level routing profile with shared block counters"""
+
+    def __init__(
+        self,
+        blocked_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+        tracker_domains: Iterable[str] = DEFAULT_TRACKER_DOMAINS,
+        allow_patterns: Iterable[str] = DEFAULT_ALLOW_PATTERNS
+    ):
+        self.blocked_types = frozenset(blocked_types)
+        self.tracker_domains = tuple(tracker_domains)
+        self.allow_patterns = tuple(p.lower() for p in allow_patterns)
+
+        self.requests_seen = 0
+        self.requests_blocked = 0
+        self.estimated_bytes_blocked = 0
+        self.blocked_by_type: Counter = Counter()
+        self.blocked_by_domain: Counter = Counter()
+
+    async def install(self, context: BrowserContext) -> None:
+        """Route every request made by the context through this profile"""
+        await context.route("**/*", self._route)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        lowered = url.lower()
+        if any(pattern in lowered for pattern in self.allow_patterns):
+            return False
+
+        if resource_type in self.blocked_types:
+            return True
+
+        host = urlparse(lowered).hostname or ""
+        return any(host == domain or host.endswith("." + domain) for domain in self.tracker_domains)
+
+    async def _route(self, route: Route) -> None:
+        request = route.request
+        self.requests_seen += 1
+
+        if not self.should_block(request.url, request.resource_type):
+            await route.continue_()
+            return
+
+        self.requests_blocked += 1
+        self.estimated_bytes_blocked += ESTIMATED_BYTES_BY_TYPE.get(request.resource_type, 10_000)
+        self.blocked_by_type[request.resource_type] += 1
+        self.blocked_by_domain[urlparse(request.url).hostname or ""] += 1
+        await route.abort("blockedbyclient")
+
+    def stats(self) -> Dict[str, Any]:
+        """Request and byte counters across all contexts using this profile"""
+        return {
+            "requests_seen": self.requests_seen,
+            "requests_blocked": self.requests_blocked,
+            "estimated_bytes_blocked": self.estimated_bytes_blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "top_blocked_domains": dict(self.blocked_by_domain.most_common(10))
+        }
@@ -0,0 +1,141 @@
+"""
+Filing Scheduler - Deadline-aware priorities for queued filings
+Orders filings by days to the filing deadline, customer tier and retry count,
+with aging so low-priority work is never starved
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+from datetime import date, timedelta
+from contextlib import asynccontextmanager
+
+from filing_import import FILING_DEADLINE_DAYS
+
+
+# Urgency points per customer tier (one point is one day closer to the deadline)
+DEFAULT_TIER_POINTS = {
+    "standard": 0.0,
+    "priority": 14.0,
+    "enterprise": 30.0
+}
+
+
+class PriorityPolicy:
+    """
+    Turns deadline, tier and retries into a static heap key (lower runs first)
+
+    key = enqueued_at - points * aging_seconds_per_point, so a filing that has
+    waited aging_seconds_per_point seconds longer is worth one more point.
+    Keys never change after enqueue, so the same ordering works in a heap and
+    in a SQLite ORDER BY.
+    """
+
+    def __init__(
+        self,
+        horizon_days: float = 90.0,
+        overdue_weight: float = 2.0,
+        retry_penalty: float = 5.0,
+        aging_seconds_per_point: float = 3600.0,
+        tier_points: Optional[Dict[str, float]] = None
+    ):
+        self.horizon_days = horizon_days
+        self.overdue_weight = overdue_weight
+        self.retry_penalty = retry_penalty
+        self.aging_seconds_per_point = aging_seconds_per_point
+        self.tier_points = tier_points or DEFAULT_TIER_POINTS
+
+    @staticmethod
+    def days_remaining(financial_year_end: str, today: Optional[date] = None) -> Optional[int]:
+        """Days until the filing deadline; negative once it has passed"""
+        try:
+            deadline = date.fromisoformat(financial_year_end) + timedelta(days=FILING_DEADLINE_DAYS)
+        except ValueError:
+            return None
+        return (deadline - (today or date.today())).days
+
+    def points(self, financial_year_end: str, customer_tier: str = "standard", retries: int = 0) -> float:
+        """
+        Urgency points: one per day inside the horizon, overdue_weight per day
+        past the deadline (penalties keep accruing), plus the tier's points and
+        minus retry_penalty per failed attempt so a failing filing can't crowd
+        out the rest
+        """
+        days = self.days_remaining(financial_year_end)
+        if days is None:
+            urgency = 0.0
+        elif days < 0:
+            urgency = self.horizon_days + self.overdue_weight * -days
+        else:
+            urgency = max(0.0, self.horizon_days - days)
+
+        return urgency + self.tier_points.get(customer_tier, 0.0) - self.retry_penalty * retries
+
+    def key(
+        self,
+        financial_year_end: str,
+        customer_tier: str = "standard",
+        retries: int = 0,
+        enqueued_at: Optional[float] = None
+    ) -> float:
+        enqueued_at = time.time() if enqueued_at is None else enqueued_at
+        return enqueued_at - self.points(financial_year_end, customer_tier, retries) * self.aging_seconds_per_point
+
+
+class PriorityGate:
+    """Concurrency limit that admits waiters lowest key first instead of FIFO"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self._waiters: List[list] = []  # [key, seq, future, label, waiting_since]
+        self._sequence = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for entry in self._waiters if not entry[2].done())
+
+    async def acquire(self, key: float, label: str = "") -> None:
+        if self.in_use < self.capacity and not self.waiting:
+            self.in_use += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [key, next(self._sequence), future, label, time.monotonic()])
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just as we were cancelled - pass the slot on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_use -= 1
+        while self._waiters and self.in_use < self.capacity:
+            _, _, future, _, _ = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_use += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, key: float, label: str = ""):
+        await self.acquire(key, label)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def view(self) -> List[Dict[str, Any]]:
+        """Waiters in the order they will be admitted"""
+        now = time.monotonic()
+        return [
+            {"label": label, "key": round(key, 3), "waited_seconds": round(now - since, 3)}
+            for key, _, future, label, since in sorted(self._waiters)
+            if not future.done()
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "in_use": self.in_use, "waiting": self.waiting}
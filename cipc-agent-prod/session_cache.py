@@ -0,0 +1,107 @@
+"""
+Session Cache - Reusable CIPC portal login state
+Persists Playwright storage_state so filings skip the username/password login
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+
+class AuthSessionCache:
+    """Authenticated portal session shared by every context on a filer"""
+
+    def __init__(self, path: Path, max_age: timedelta):
+        self.path = Path(path)
+        self.max_age = max_age
+
+        # Held while logging in so concurrent filings share one refresh
+        self.refresh_lock = asyncio.Lock()
+        self.generation = 0
+
+        self._state: Optional[Dict[str, Any]] = None
+        self._saved_at: Optional[datetime] = None
+        self._loaded = False
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """Cached storage state, or None when missing or older than max_age"""
+        if not self._loaded:
+            self._load()
+
+        if self._state is None or self._saved_at is None:
+            return None
+        if datetime.now() - self._saved_at > self.max_age:
+            return None
+        return self._state
+
+    async def save(self, storage_state: Dict[str, Any]) -> None:
+        """Store a freshly authenticated session"""
+        self._state = storage_state
+        self._saved_at = datetime.now()
+        self._loaded = True
+        self.generation += 1
+        await asyncio.to_thread(self._write)
+
+    async def update_cookies(self, cookies: List[Dict[str, Any]], generation: int) -> bool:
+        """
+        Merge cookies the portal set over HTTP into the cached session, so new
+        browser contexts see them; ignored if the session has since been replaced
+        """
+        if generation != self.generation or self.current() is None or not cookies:
+            return False
+
+        def cookie_key(cookie: Dict[str, Any]) -> tuple:
+            return cookie["name"], cookie.get("domain", "").lstrip("."), cookie.get("path", "/")
+
+        merged = {cookie_key(cookie): cookie for cookie in self._state.get("cookies", [])}
+        changed = False
+        for cookie in cookies:
+            known = merged.get(cookie_key(cookie))
+            if known is None or known.get("value") != cookie["value"]:
+                # Keep the browser's attributes (domain form, expiry) for cookies it already had
+                merged[cookie_key(cookie)] = {**(known or cookie), "value": cookie["value"]}
+                changed = True
+        if not changed:
+            return False
+
+        self._state = {**self._state, "cookies": list(merged.values())}
+        await asyncio.to_thread(self._write)
+        return True
+
+    def invalidate(self, generation: int) -> None:
+        """Drop the cached session if it is still the one a probe rejected"""
+        if generation == self.generation and self._state is not None:
+            logger.info("Cached CIPC session rejected by portal - forcing re-login")
+            self._state = None
+            self._saved_at = None
+            self.generation += 1
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._state = data["storage_state"]
+            self._saved_at = datetime.fromisoformat(data["saved_at"])
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable CIPC session cache {self.path}: {e}")
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+
+        # Session cookies are credentials - keep them owner-readable only
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                "saved_at": self._saved_at.isoformat(),
+                "storage_state": self._state
+            }, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,195 @@
+"""
+Submission Ledger - Idempotency index of annual returns submitted to CIPC
+One entry per company, financial year end and form type moving from pending to
+in-flight to completed, so duplicate requests never reach the portal twice
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+
+
+# CoR 30.1 annual return for a private company
+ANNUAL_RETURN_FORM = "AR01"
+
+LedgerKey = Tuple[str, str, str]  # (company number, financial year end, form type)
+
+
+@dataclass
+class LedgerEntry:
+    """Submission state of one filing"""
+    state: str
+    filing_key: str
+    result: Optional[Dict[str, Any]] = None
+    updated_at: str = ""
+
+
+class SubmissionLedger:
+    """SQLite ledger with an in-memory index; completed entries are answered without touching the store"""
+
+    PENDING = "pending"
+    IN_FLIGHT = "in_flight"
+    COMPLETED = "completed"
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._index: Dict[LedgerKey, LedgerEntry] = {}
+
+    @staticmethod
+    def key(company_number: str, financial_year_end: str, form_type: str = ANNUAL_RETURN_FORM) -> LedgerKey:
+        return company_number.strip().upper(), financial_year_end.strip(), form_type
+
+    async def get(self, key: LedgerKey) -> Optional[LedgerEntry]:
+        """Current entry; completed entries come from the index, others are re-read as another process may have moved them on"""
+        entry = self._index.get(key)
+        if entry and entry.state == self.COMPLETED:
+            return entry
+        return await asyncio.to_thread(self._get, key)
+
+    async def reserve(self, key: LedgerKey, filing_key: str) -> LedgerEntry:
+        """Record a pending filing, or return the entry that already exists"""
+        return await asyncio.to_thread(self._reserve, key, filing_key)
+
+    async def begin(self, key: LedgerKey, filing_key: str) -> bool:
+        """Move the entry to in-flight just before submitting; False if it was already submitted or in flight"""
+        return await asyncio.to_thread(self._begin, key, filing_key)
+
+    async def complete(self, key: LedgerKey, result: Dict[str, Any]) -> None:
+        """Record the portal's confirmation for a submitted filing"""
+        await asyncio.to_thread(self._set, key, self.COMPLETED, result)
+
+    async def resolve(self, key: LedgerKey, filing_key: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Settle an entry after checking the portal: completed with its result, or
+        back to pending if nothing was filed; False if it is already completed
+        """
+        return await asyncio.to_thread(self._resolve, key, filing_key, result)
+
+    async def counts(self) -> Dict[str, int]:
+        return await asyncio.to_thread(self._counts)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS submission_ledger (
+                    company_number TEXT NOT NULL,
+                    financial_year_end TEXT NOT NULL,
+                    form_type TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    filing_key TEXT NOT NULL,
+                    result TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (company_number, financial_year_end, form_type)
+                )
+            """)
+            self._conn.commit()
+            for row in self._conn.execute(
+                "SELECT company_number, financial_year_end, form_type, state, filing_key, result, updated_at "
+                "FROM submission_ledger"
+            ):
+                self._index[row[:3]] = self._entry(row[3:])
+        return self._conn
+
+    @staticmethod
+    def _entry(row: tuple) -> LedgerEntry:
+        state, filing_key, result, updated_at = row
+        return LedgerEntry(state, filing_key, json.loads(result) if result else None, updated_at)
+
+    def _read(self, conn: sqlite3.Connection, key: LedgerKey) -> Optional[LedgerEntry]:
+        row = conn.execute(
+            "SELECT state, filing_key, result, updated_at FROM submission_ledger "
+            "WHERE company_number = ? AND financial_year_end = ? AND form_type = ?",
+            key
+        ).fetchone()
+        if not row:
+            self._index.pop(key, None)
+            return None
+        entry = self._index[key] = self._entry(row)
+        return entry
+
+    def _get(self, key: LedgerKey) -> Optional[LedgerEntry]:
+        with self._db_lock:
+            return self._read(self._connect(), key)
+
+    def _insert_pending(self, conn: sqlite3.Connection, key: LedgerKey, filing_key: str, now: str) -> None:
+        conn.execute(
+            "INSERT OR IGNORE INTO submission_ledger "
+            "(company_number, financial_year_end, form_type, state, filing_key, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, self.PENDING, filing_key, now, now)
+        )
+
+    def _reserve(self, key: LedgerKey, filing_key: str) -> LedgerEntry:
+        now = datetime.now().isoformat()
+        with self._db_lock:
+            conn = self._connect()
+            self._insert_pending(conn, key, filing_key, now)
+            conn.commit()
+            return self._read(conn, key)
+
+    def _begin(self, key: LedgerKey, filing_key: str) -> bool:
+        now = datetime.now().isoformat()
+        with self._db_lock:
+            conn = self._connect()
+            self._insert_pending(conn, key, filing_key, now)
+            cursor = conn.execute(
+                "UPDATE submission_ledger SET state = ?, filing_key = ?, updated_at = ? "
+                "WHERE company_number = ? AND financial_year_end = ? AND form_type = ? AND state = ?",
+                (self.IN_FLIGHT, filing_key, now, *key, self.PENDING)
+            )
+            conn.commit()
+            self._read(conn, key)
+        return cursor.rowcount > 0
+
+    def _resolve(self, key: LedgerKey, filing_key: str, result: Optional[Dict[str, Any]]) -> bool:
+        now = datetime.now().isoformat()
+        with self._db_lock:
+            conn = self._connect()
+            self._insert_pending(conn, key, filing_key, now)
+            cursor = conn.execute(
+                "UPDATE submission_ledger SET state = ?, result = ?, updated_at = ? "
+                "WHERE company_number = ? AND financial_year_end = ? AND form_type = ? AND state != ?",
+                (self.COMPLETED if result else self.PENDING, json.dumps(result, default=str) if result else None,
+                 now, *key, self.COMPLETED)
+            )
+            conn.commit()
+            self._read(conn, key)
+        return cursor.rowcount > 0
+
+    def _set(self, key: LedgerKey, state: str, result: Optional[Dict[str, Any]]) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE submission_ledger SET state = ?, result = ?, updated_at = ? "
+                "WHERE company_number = ? AND financial_year_end = ? AND form_type = ?",
+                (state, json.dumps(result, default=str) if result else None, datetime.now().isoformat(), *key)
+            )
+            conn.commit()
+            self._read(conn, key)
+
+    def _counts(self) -> Dict[str, int]:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT state, COUNT(*) FROM submission_ledger GROUP BY state"
+            ).fetchall()
+        return {state: count for state, count in rows}
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
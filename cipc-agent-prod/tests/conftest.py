@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The agent modules are run as scripts from cipc-agent-prod, not installed as a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
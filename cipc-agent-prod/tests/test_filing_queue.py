@@ -0,0 +1,88 @@
+"""Lease handling of the shared filing queue"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from filing_queue import FilingQueue, FilingRequest
+
+
+def request(index: int) -> FilingRequest:
+    return FilingRequest(f"2021/{index:06d}/07", f"Company {index}", "2024-02-28", "a@b.co.za", "+27821234567")
+
+
+@pytest.fixture
+def queues(tmp_path):
+    """Two owners on one queue; a's leases expire almost immediately"""
+    async def open_queues():
+        a = FilingQueue(tmp_path / "queue.db", owner="a", lease_seconds=0.5)
+        b = FilingQueue(tmp_path / "queue.db", owner="b", lease_seconds=60)
+        await a.open()
+        await b.open()
+        for index in range(3):
+            await a.enqueue(request(index))
+        return a, b
+
+    a, b = asyncio.run(open_queues())
+    yield a, b
+    asyncio.run(a.close())
+    asyncio.run(b.close())
+
+
+def test_claim_many_reclaims_expired_leases(queues):
+    a, b = queues
+
+    async def run():
+        claimed = await a.claim_many(2)
+        unclaimed = await b.claim_many(5)
+        await asyncio.sleep(0.6)
+        return claimed, unclaimed, await b.claim_many(5)
+
+    claimed, unclaimed, reclaimed = asyncio.run(run())
+    assert len(unclaimed) == 1
+    assert sorted(job_id for job_id, _ in reclaimed) == sorted(job_id for job_id, _ in claimed)
+
+
+def test_live_leases_are_not_reclaimed(queues):
+    a, b = queues
+
+    async def run():
+        held = await b.claim_many(2)
+        return held, await a.claim_many(5)
+
+    held, rest = asyncio.run(run())
+    assert len(held) == 2 and len(rest) == 1
+    assert not {job_id for job_id, _ in held} & {job_id for job_id, _ in rest}
+
+
+def test_stale_owner_failure_is_not_recorded(queues):
+    a, b = queues
+
+    async def run():
+        (job_id, _), = await a.claim_many(1)
+        await asyncio.sleep(0.6)
+        assert [job for job, _ in await b.claim_many(1)] == [job_id]
+        recorded = await a.complete(job_id, SimpleNamespace(success=False, error_message="timeout"), [])
+        return recorded, await b.heartbeat([job_id], 1), await a.counts()
+
+    recorded, held_by_b, counts = asyncio.run(run())
+    assert not recorded
+    assert held_by_b and counts.get("failed", 0) == 0
+
+
+def test_stale_owner_success_is_recorded_once(queues):
+    a, b = queues
+
+    async def run():
+        (job_id, _), = await a.claim_many(1)
+        await asyncio.sleep(0.6)
+        await b.claim_many(1)
+        first = await a.complete(job_id, SimpleNamespace(success=True), [])
+        again = await b.complete(job_id, SimpleNamespace(success=True), [])
+        failed_later = await b.complete(job_id, SimpleNamespace(success=False), [])
+        return first, again, failed_later, await a.counts()
+
+    first, again, failed_later, counts = asyncio.run(run())
+    assert first and not again and not failed_later
+    assert counts["done"] == 1
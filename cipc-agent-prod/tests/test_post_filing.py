@@ -0,0 +1,73 @@
+"""Leased claims on the post-filing outbox"""
+
+import asyncio
+
+import pytest
+
+from post_filing import NOTIFY_WHATSAPP, PostFilingOutbox
+
+
+@pytest.fixture
+def outboxes(tmp_path):
+    """Two owners on one outbox with ten queued notifications; a's leases expire quickly"""
+    a = PostFilingOutbox(tmp_path / "outbox.db", owner="a", lease_seconds=0.5)
+    b = PostFilingOutbox(tmp_path / "outbox.db", owner="b", lease_seconds=60)
+
+    async def record():
+        for index in range(10):
+            await a.record(f"filing-{index}", f"AR{index}", [NOTIFY_WHATSAPP], {"index": index})
+
+    asyncio.run(record())
+    yield a, b
+    asyncio.run(a.close())
+    asyncio.run(b.close())
+
+
+def ids(events):
+    return sorted(event.id for event in events)
+
+
+def test_live_claims_are_not_taken_over(outboxes):
+    a, b = outboxes
+
+    async def run():
+        held = await a.claim(NOTIFY_WHATSAPP, 4)
+        # A process opening the outbox later must not reset the events a is working on
+        late = PostFilingOutbox(b.db_path, owner="c")
+        rest = await late.claim(NOTIFY_WHATSAPP, 100)
+        await late.close()
+        return held, rest
+
+    held, rest = asyncio.run(run())
+    assert len(held) == 4 and len(rest) == 6
+    assert not set(ids(held)) & set(ids(rest))
+
+
+def test_expired_claims_are_taken_over(outboxes):
+    a, b = outboxes
+
+    async def run():
+        held = await a.claim(NOTIFY_WHATSAPP, 4)
+        await b.claim(NOTIFY_WHATSAPP, 6)
+        await asyncio.sleep(0.6)
+        return held, await b.claim(NOTIFY_WHATSAPP, 100)
+
+    held, taken = asyncio.run(run())
+    assert ids(taken) == ids(held)
+
+
+def test_finish_from_a_stale_owner_is_ignored(outboxes):
+    a, b = outboxes
+
+    async def run():
+        held = await a.claim(NOTIFY_WHATSAPP, 2)
+        await asyncio.sleep(0.6)
+        taken = await b.claim(NOTIFY_WHATSAPP, 2)
+        await a.finish(held, {}, max_attempts=5, retry_delay=1)
+        stale = await a.counts()
+        await b.finish(taken, {}, max_attempts=5, retry_delay=1)
+        return stale, await b.counts()
+
+    stale, final = asyncio.run(run())
+    assert f"{NOTIFY_WHATSAPP}:done" not in stale
+    assert final[f"{NOTIFY_WHATSAPP}:done"] == 2
@@ -0,0 +1,205 @@
+"""Submission ledger transitions and the filer's duplicate-submission guards"""
+
+import asyncio
+
+import pytest
+
+from submission_ledger import SubmissionLedger
+
+KEY = SubmissionLedger.key("2021/123456/07", "2024-02-28")
+FILING_KEY = "2021/123456/07:2024-02-28"
+RESULT = {"reference": "AR1", "confirmation": "CN-1", "submission_date": "2024-06-01T10:00:00", "company_name": "Acme"}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = SubmissionLedger(tmp_path / "ledger.db")
+    yield ledger
+    asyncio.run(ledger.close())
+
+
+def test_begin_only_moves_a_pending_entry_in_flight(ledger):
+    async def run():
+        await ledger.reserve(KEY, FILING_KEY)
+        assert await ledger.begin(KEY, FILING_KEY)
+        assert not await ledger.begin(KEY, FILING_KEY)
+        return await ledger.get(KEY)
+
+    assert asyncio.run(run()).state == SubmissionLedger.IN_FLIGHT
+
+
+def test_resolve_refuses_completed_entries(ledger):
+    async def run():
+        await ledger.begin(KEY, FILING_KEY)
+        await ledger.complete(KEY, RESULT)
+        assert not await ledger.resolve(KEY, FILING_KEY)
+        assert not await ledger.resolve(KEY, FILING_KEY, {**RESULT, "reference": "AR2"})
+        return await ledger.get(KEY)
+
+    entry = asyncio.run(run())
+    assert entry.state == SubmissionLedger.COMPLETED
+    assert entry.result["reference"] == "AR1"
+
+
+def test_resolve_returns_an_in_flight_entry_to_pending(ledger):
+    async def run():
+        await ledger.begin(KEY, FILING_KEY)
+        assert await ledger.resolve(KEY, FILING_KEY)
+        return await ledger.get(KEY)
+
+    assert asyncio.run(run()).state == SubmissionLedger.PENDING
+
+
+def test_completed_entries_are_seen_by_another_process(ledger, tmp_path):
+    async def run():
+        await ledger.begin(KEY, FILING_KEY)
+        other = SubmissionLedger(tmp_path / "ledger.db")
+        assert (await other.get(KEY)).state == SubmissionLedger.IN_FLIGHT
+        await ledger.complete(KEY, RESULT)
+        entry = await other.get(KEY)
+        await other.close()
+        return entry
+
+    entry = asyncio.run(run())
+    assert entry.state == SubmissionLedger.COMPLETED
+    assert entry.result == RESULT
+
+
+class FakePortal:
+    """Stands in for the browser session: records each run and submits like the real one"""
+
+    def __init__(self, filer, delay: float = 0.0):
+        self.filer = filer
+        self.delay = delay
+        self.runs = 0
+        self.fail_after_begin = False
+
+    async def __call__(self, company_number, company_name, financial_year_end, filing_key, checkpoint, log_progress):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        await self.filer._begin_submission(company_number, financial_year_end, filing_key, checkpoint)
+        if self.fail_after_begin:
+            raise Exception("connection reset after submit")
+        await self.filer._save_checkpoint(
+            filing_key, checkpoint, "submission", filer_module().WorkflowState.SUBMISSION,
+            submission_result={"success": True, "reference": f"AR{self.runs}", "confirmation": f"CN-{self.runs}"},
+            submission_date="2024-06-01T10:00:00"
+        )
+
+
+def filer_module():
+    pytest.importorskip("models")  # models.py ships with the deployment, not this tree
+    import enhanced_cipc_filer
+    return enhanced_cipc_filer
+
+
+@pytest.fixture
+def filer(tmp_path, monkeypatch):
+    module = filer_module()
+    from models import CompanyInfo
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CIPC_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("HTTP_FAST_PATH", "false")
+    filer = module.EnhancedCIPCFiler()
+
+    async def preflight(*args):
+        return None
+
+    async def verification(company_number, log_progress):
+        return CompanyInfo(company_number, "Acme", "Active", "2020-01-01", "02-28")
+
+    async def preparation(*args):
+        return {"documents": [], "form_data": {}}
+
+    filer._step_preflight_checks = preflight
+    filer._step_company_verification = verification
+    filer._step_document_preparation = preparation
+    filer.portal = filer._run_portal_session = FakePortal(filer)
+    return filer
+
+
+def run(filer, scenario):
+    """Run a scenario and close the filer on the same event loop"""
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await filer.close()
+    return asyncio.run(main())
+
+
+def file(filer):
+    return filer.file_annual_returns_comprehensive("2021/123456/07", "Acme", "2024-02-28", "a@b.co.za", "+27821234567")
+
+
+def test_completed_filing_is_answered_without_a_portal_call(filer):
+    async def scenario():
+        first, _ = await file(filer)
+        second, _ = await file(filer)
+        return first, second
+
+    first, second = run(filer, scenario)
+    assert first.success and second.success
+    assert second.filing_reference == first.filing_reference == "AR1"
+    assert filer.portal.runs == 1
+
+
+def test_concurrent_duplicates_share_one_run(filer):
+    filer.portal.delay = 0.2
+
+    async def scenario():
+        return await asyncio.gather(*(file(filer) for _ in range(3)))
+
+    results = [result for result, _ in run(filer, scenario)]
+    assert filer.portal.runs == 1
+    assert {result.filing_reference for result in results} == {"AR1"}
+
+
+def test_in_flight_submission_is_not_refiled(filer):
+    filer.portal.fail_after_begin = True
+
+    async def scenario():
+        first, _ = await file(filer)
+        filer.portal.fail_after_begin = False
+        second, _ = await file(filer)
+        return first, second
+
+    first, second = run(filer, scenario)
+    assert not first.success and not second.success
+    assert "reconcile_filing.py" in second.error_message
+    assert filer.portal.runs == 1
+
+
+def test_reconcile_without_reference_allows_a_new_submission(filer):
+    filer.portal.fail_after_begin = True
+
+    async def scenario():
+        await file(filer)
+        state = await filer.reconcile_filing("2021/123456/07", "2024-02-28")
+        filer.portal.fail_after_begin = False
+        result, _ = await file(filer)
+        return state, result
+
+    state, result = run(filer, scenario)
+    assert state == SubmissionLedger.PENDING
+    assert result.success and result.filing_reference == "AR2"
+    assert filer.portal.runs == 2
+
+
+def test_reconcile_with_reference_records_the_filing(filer):
+    filer.portal.fail_after_begin = True
+
+    async def scenario():
+        await file(filer)
+        state = await filer.reconcile_filing("2021/123456/07", "2024-02-28", reference="AR-PORTAL", confirmation="CN-PORTAL")
+        result, _ = await file(filer)
+        with pytest.raises(Exception, match="already recorded as filed"):
+            await filer.reconcile_filing("2021/123456/07", "2024-02-28")
+        return state, result, await filer.checkpoints.load(FILING_KEY)
+
+    state, result, checkpoint = run(filer, scenario)
+    assert state == SubmissionLedger.COMPLETED
+    assert result.success and result.filing_reference == "AR-PORTAL"
+    assert checkpoint is None
+    assert filer.portal.runs == 1
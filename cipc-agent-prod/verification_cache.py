@@ -0,0 +1,153 @@
+"""
+Verification Cache - Company lookups keyed by registration number
+In-memory LRU in front of a local SQLite store, with status-based TTLs
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from pathlib import Path
+from datetime import timedelta
+from collections import OrderedDict
+
+from models import CompanyInfo
+from filing_queue import model_to_dict
+
+
+# Cached entry: (expires_at epoch seconds, company or None when not found)
+CacheEntry = Tuple[float, Optional[CompanyInfo]]
+
+
+class CompanyVerificationCache:
+    """Two-tier cache of CIPC company search results, including negative results"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_entries: int = 10000,
+        active_ttl: timedelta = timedelta(days=7),
+        inactive_ttl: timedelta = timedelta(days=1),
+        negative_ttl: timedelta = timedelta(hours=1)
+    ):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.active_ttl = active_ttl
+        self.inactive_ttl = inactive_ttl
+        self.negative_ttl = negative_ttl
+
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, company: Optional[CompanyInfo]) -> timedelta:
+        """Active companies change rarely; others may be mid-deregistration or reinstatement"""
+        if company is None:
+            return self.negative_ttl
+        if (company.status or "").lower() == "active":
+            return self.active_ttl
+        return self.inactive_ttl
+
+    async def get_many(self, registration_numbers: Iterable[str]) -> Dict[str, Optional[CompanyInfo]]:
+        """Fresh cached results; numbers missing from the result need a CIPC lookup"""
+        now = time.time()
+        found: Dict[str, Optional[CompanyInfo]] = {}
+        missing = []
+        requested = 0
+
+        for number in registration_numbers:
+            requested += 1
+            entry = self._memory.get(number)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(number)
+                found[number] = entry[1]
+            else:
+                missing.append(number)
+
+        if missing:
+            for number, entry in (await asyncio.to_thread(self._load, missing, now)).items():
+                self._remember(number, entry)
+                found[number] = entry[1]
+
+        self.hits += len(found)
+        self.misses += requested - len(found)
+        return found
+
+    async def put(self, registration_number: str, company: Optional[CompanyInfo]) -> None:
+        """Cache a lookup result; None records that the company was not found"""
+        await self.put_many({registration_number: company})
+
+    async def put_many(self, results: Dict[str, Optional[CompanyInfo]]) -> None:
+        """Cache several lookup results in one write"""
+        now = time.time()
+        entries = {
+            number: (now + self.ttl_for(company).total_seconds(), company)
+            for number, company in results.items()
+        }
+        for number, entry in entries.items():
+            self._remember(number, entry)
+        await asyncio.to_thread(self._store, entries)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+    def _remember(self, number: str, entry: CacheEntry) -> None:
+        self._memory[number] = entry
+        self._memory.move_to_end(number)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS company_verification (
+                    registration_number TEXT PRIMARY KEY,
+                    company TEXT,
+                    expires_at REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    def _load(self, numbers, now: float) -> Dict[str, CacheEntry]:
+        rows = []
+        with self._db_lock:
+            conn = self._connect()
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(numbers), 500):
+                chunk = numbers[start:start + 500]
+                rows.extend(conn.execute(
+                    f"SELECT registration_number, company, expires_at FROM company_verification "
+                    f"WHERE registration_number IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                    (*chunk, now)
+                ).fetchall())
+
+        return {
+            number: (expires_at, CompanyInfo(**json.loads(company)) if company else None)
+            for number, company, expires_at in rows
+        }
+
+    def _store(self, entries: Dict[str, CacheEntry]) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO company_verification (registration_number, company, expires_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (number, json.dumps(model_to_dict(company)) if company else None, expires_at)
+                    for number, (expires_at, company) in entries.items()
+                ]
+            )
+            conn.commit()
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None